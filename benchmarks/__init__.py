@@ -0,0 +1 @@
+"""Mediciones de rendimiento del motor de datos (no se ejecutan con la app)."""
@@ -0,0 +1,74 @@
+"""Compara la asignación vectorizada de departamentos con el ``sjoin`` original.
+
+Genera sismos sintéticos uniformes sobre la caja de Perú (más un margen, para
+que haya puntos fuera) y mide ambos caminos. El camino original (lista de
+``Point`` + ``gpd.sjoin``) solo se ejecuta hasta ``--max-referencia`` sismos,
+porque a 10 millones necesita varios GB; cuando se ejecuta, se verifica que
+los resultados sean idénticos.
+
+Uso::
+
+    python -m benchmarks.bench_departamentos
+    python -m benchmarks.bench_departamentos --tamanos 23000 1000000 --max-referencia 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from sismos.departamentos import AsignadorDepartamentos
+
+
+MARGEN = 5.0
+
+
+def generar_puntos(asignador, cantidad, semilla=0):
+    """Coordenadas lon/lat uniformes sobre la caja de los departamentos."""
+    oeste, sur = asignador.cajas[:, :2].min(axis=0) - MARGEN
+    este, norte = asignador.cajas[:, 2:].max(axis=0) + MARGEN
+    rng = np.random.default_rng(semilla)
+    return rng.uniform(oeste, este, cantidad), rng.uniform(sur, norte, cantidad)
+
+
+def sjoin_original(lon, lat, departamentos):
+    """El camino que usaba ``mapa()``: un ``Point`` por fila y ``gpd.sjoin``."""
+    import geopandas as gpd
+    from shapely.geometry import Point
+
+    geometry = [Point(xy) for xy in zip(lon, lat)]
+    puntos = gpd.GeoDataFrame(geometry=geometry, crs="EPSG:4326")
+    unido = gpd.sjoin(puntos, departamentos, how="inner", predicate="intersects")
+    return unido.index.to_numpy(), unido["index_right"].to_numpy()
+
+
+def medir(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[23_000, 1_000_000, 10_000_000])
+    parser.add_argument("--max-referencia", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    from sismos.enriquecido import leer_departamentos
+
+    asignador = AsignadorDepartamentos.desde_geojson()
+    departamentos = leer_departamentos()
+
+    print(f"{'sismos':>12} {'sjoin (s)':>10} {'motor (s)':>10} {'aceleración':>12}  iguales")
+    for cantidad in args.tamanos:
+        lon, lat = generar_puntos(asignador, cantidad)
+        t_motor, (posiciones, codigos) = medir(asignador.cruzar, lon, lat)
+        if cantidad <= args.max_referencia:
+            t_ref, (pos_ref, cod_ref) = medir(sjoin_original, lon, lat, departamentos)
+            iguales = np.array_equal(posiciones, pos_ref) and np.array_equal(codigos, cod_ref)
+            print(f"{cantidad:>12,} {t_ref:>10.3f} {t_motor:>10.3f} {t_ref / t_motor:>11.1f}x  {iguales}")
+        else:
+            print(f"{cantidad:>12,} {'-':>10} {t_motor:>10.3f} {'-':>12}  -")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Bytes por sismo del catálogo en memoria, con el esquema anterior y con el compacto.
+
+El esquema anterior se reconstruye a partir del actual con los tipos que
+usaba la app: ``FECHA_UTC`` como fecha, ``HORA_UTC`` como objetos
+``datetime.time``, ``AÑO``/``MES``/``DIA`` en int32, ``NOMBDEP`` como texto y,
+en la vista del mapa, ``MES`` con el nombre del mes. Para cada columna se
+informa ``memory_usage(deep=True)`` por sismo y, al final, el tiempo de un
+filtro ``isin`` por departamento y por mes con cada esquema.
+
+Uso::
+
+    python -m benchmarks.bench_esquema
+    python -m benchmarks.bench_esquema --sismos 1000000
+"""
+import argparse
+import os
+import tempfile
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_paginas import generar_catalogo
+
+
+def esquema_anterior(datos, meses_como_texto=False):
+    """``datos`` con los tipos del catálogo antes del esquema compacto."""
+    from sismos.catalogo import MESES
+
+    tiempo = pd.to_datetime(datos["TIEMPO"].to_numpy(), unit="s")
+    anterior = pd.DataFrame({
+        "ID": datos["ID"].to_numpy(),
+        "FECHA_UTC": tiempo.normalize(),
+        "HORA_UTC": tiempo.time,
+    })
+    for columna in ["LATITUD", "LONGITUD", "PROFUNDIDAD", "MAGNITUD"]:
+        anterior[columna] = datos[columna].to_numpy()
+    for columna in ["AÑO", "MES", "DIA"]:
+        anterior[columna] = datos[columna].to_numpy().astype("int32")
+    if meses_como_texto:
+        anterior["MES"] = anterior["MES"].map(dict(enumerate(MESES, start=1))).astype(object)
+    if "NOMBDEP" in datos.columns:
+        anterior["NOMBDEP"] = datos["NOMBDEP"].astype(object).to_numpy()
+    return anterior
+
+
+def bytes_por_sismo(datos):
+    """``{columna: bytes por sismo}`` más el total."""
+    uso = datos.memory_usage(deep=True, index=False) / max(len(datos), 1)
+    return {**uso.to_dict(), "TOTAL": float(uso.sum())}
+
+
+def imprimir(titulo, antes, despues):
+    print(f"\n{titulo}")
+    print(f"{'columna':<14} {'antes (B)':>10} {'después (B)':>12}")
+    for columna in list(dict.fromkeys([*antes, *despues])):
+        previo = f"{antes[columna]:.1f}" if columna in antes else "-"
+        actual = f"{despues[columna]:.1f}" if columna in despues else "-"
+        print(f"{columna:<14} {previo:>10} {actual:>12}")
+
+
+def tiempo_isin(serie, valores, repeticiones=20):
+    return min(timeit.repeat(lambda: serie.isin(valores), number=1, repeat=repeticiones))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sismos", type=int, help="Usar un catálogo sintético de este tamaño en lugar del CSV")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    from sismos.catalogo import RUTA_CSV, RUTA_DEPARTAMENTOS, leer_catalogo, leer_crudo
+    from sismos.departamentos import AsignadorDepartamentos
+    from sismos.enriquecido import unir_departamentos
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_csv = RUTA_CSV
+        if args.sismos:
+            ruta_csv = os.path.join(directorio, "sismos.csv")
+            generar_catalogo(ruta_csv, args.sismos, args.semilla)
+        catalogo = leer_catalogo(ruta_csv)
+        peru = unir_departamentos(leer_crudo(ruta_csv), AsignadorDepartamentos.desde_geojson(RUTA_DEPARTAMENTOS))
+
+    print(f"{len(catalogo):,} sismos en el catálogo, {len(peru):,} filas dentro de Perú")
+    imprimir("Catálogo completo", bytes_por_sismo(esquema_anterior(catalogo)), bytes_por_sismo(catalogo))
+    peru_anterior = esquema_anterior(peru, meses_como_texto=True)
+    imprimir("Vista del mapa (con departamento)", bytes_por_sismo(peru_anterior), bytes_por_sismo(peru))
+
+    departamentos = ["LIMA", "AREQUIPA", "ICA"]
+    print(f"\n{'filtro isin':<28} {'antes (ms)':>10} {'después (ms)':>13}")
+    for nombre, anterior, actual in [
+        ("NOMBDEP en 3 departamentos", tiempo_isin(peru_anterior["NOMBDEP"], departamentos),
+         tiempo_isin(peru["NOMBDEP"], departamentos)),
+        ("MES en 3 meses", tiempo_isin(peru_anterior["MES"], ["Enero", "Febrero", "Marzo"]),
+         tiempo_isin(peru["MES"], np.array([1, 2, 3], dtype="int8"))),
+    ]:
+        print(f"{nombre:<28} {anterior * 1000:>10.3f} {actual * 1000:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
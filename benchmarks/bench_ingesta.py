@@ -0,0 +1,61 @@
+"""Compara la ingesta en serie con la paralela para distintas cantidades de procesos.
+
+Genera un catálogo sintético (ver :mod:`benchmarks.bench_paginas`), construye
+el archivo enriquecido en serie y con cada cantidad de procesos, y verifica
+que todos los resultados sean idénticos al de la ingesta en serie. El
+tiempo de la ingesta paralela incluye el arranque de los procesos.
+
+Uso::
+
+    python -m benchmarks.bench_ingesta
+    python -m benchmarks.bench_ingesta --sismos 10000000 --procesos 1 2 4 8 16
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.bench_paginas import generar_catalogo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sismos", type=int, default=2_000_000)
+    parser.add_argument("--procesos", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    import pyarrow.feather as feather
+    import shapely
+
+    from sismos.departamentos import AsignadorDepartamentos
+    from sismos.enriquecido import _iniciar_proceso, _unir_en_proceso, unir_departamentos
+    from sismos.ingesta import ingerir_csv, ingerir_csv_paralelo
+
+    asignador = AsignadorDepartamentos.desde_geojson()
+    departamentos = (list(asignador.nombres), shapely.to_wkb(asignador.geometrias))
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_csv = os.path.join(directorio, "sismos.csv")
+        generar_catalogo(ruta_csv, args.sismos)
+
+        serie = os.path.join(directorio, "serie.feather")
+        inicio = time.perf_counter()
+        ingerir_csv(ruta_csv, serie, lambda lote: unir_departamentos(lote, asignador))
+        t_serie = time.perf_counter() - inicio
+        referencia = feather.read_table(serie)
+
+        print(f"{'procesos':>8} {'segundos':>9} {'sismos/s':>12} {'aceleración':>12}  idéntico")
+        print(f"{'serie':>8} {t_serie:>9.2f} {args.sismos / t_serie:>12,.0f} {1:>11.2f}x  -")
+        for procesos in args.procesos:
+            destino = os.path.join(directorio, f"paralelo_{procesos}.feather")
+            inicio = time.perf_counter()
+            ingerir_csv_paralelo(ruta_csv, destino, _unir_en_proceso, _iniciar_proceso, departamentos,
+                                 procesos=procesos)
+            segundos = time.perf_counter() - inicio
+            identico = feather.read_table(destino).equals(referencia)
+            print(f"{procesos:>8} {segundos:>9.2f} {args.sismos / segundos:>12,.0f} {t_serie / segundos:>11.2f}x  {identico}")
+            os.remove(destino)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Mide, sin servidor de Streamlit, cada etapa del camino de datos de las páginas.
+
+Genera catálogos sintéticos con el esquema de ``Dataset_1960_2023_sismo.csv``
+y, para cada tamaño, mide por separado las etapas que hacía ``main.py`` (carga
+del CSV, parseo de fechas, construcción de ``Point``, ``sjoin``, cadenas de
+filtros, ``value_counts``, mapa folium y ``pivot_table`` del gráfico apilado)
+junto con las del motor actual (cruce vectorizado, índice de rangos, cubos,
+ingesta por lotes, mapa de densidad). De cada etapa se guarda el tiempo de
+reloj y el pico de RSS.
+
+Cada tamaño se mide en un proceso nuevo, para que la memoria de un tamaño no
+se mezcle con la del siguiente. Las etapas ``puntos`` y ``sjoin`` solo se
+ejecutan hasta ``--max-referencia`` sismos, porque a 10 millones necesitan
+varios GB. Los resultados se escriben en JSON; con ``--comparar`` se imprime
+la relación de tiempos contra una corrida anterior.
+
+Uso::
+
+    python -m benchmarks.bench_paginas
+    python -m benchmarks.bench_paginas --tamanos 10000 100000 --salida antes.json
+    python -m benchmarks.bench_paginas --tamanos 10000 100000 --comparar antes.json
+"""
+import argparse
+import concurrent.futures
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+
+TAMANOS = [10_000, 100_000, 1_000_000, 10_000_000]
+# Caja de Perú con margen, para que haya sismos fuera de los departamentos
+OESTE, SUR, ESTE, NORTE = -86.0, -23.0, -64.0, 4.0
+DIAS = (np.datetime64("2023-12-31") - np.datetime64("1960-01-01")).astype("int64") + 1
+TAMANO_ESCRITURA = 1_000_000
+
+# Combinaciones de filtros de la página del mapa, ``{columna: filtro}`` como en ``main.py``
+FILTROS_MAPA = {
+    "todo": {},
+    "rango_años": {"AÑO": (2000, 2010)},
+    "departamentos": {"NOMBDEP": ["LIMA", "AREQUIPA", "ICA"]},
+    "meses_magnitud": {"MES": [1, 2, 3], "MAGNITUD": (4.5, 6.0)},
+    "completo": {"NOMBDEP": ["AREQUIPA"], "AÑO": (1990, 2020), "MAGNITUD": (4.0, 7.0), "PROFUNDIDAD": (0.0, 70.0)},
+}
+
+
+def generar_catalogo(ruta, cantidad, semilla=0):
+    """Escribe un CSV sintético de ``cantidad`` sismos ordenados por fecha."""
+    rng = np.random.default_rng(semilla)
+    dias = np.sort(rng.integers(0, DIAS, cantidad))
+    with open(ruta, "w", encoding="utf-8", newline="") as archivo:
+        for desde in range(0, cantidad, TAMANO_ESCRITURA):
+            hasta = min(desde + TAMANO_ESCRITURA, cantidad)
+            n = hasta - desde
+            fechas = pd.DatetimeIndex(np.datetime64("1960-01-01") + dias[desde:hasta].astype("timedelta64[D]"))
+            segundos = rng.integers(0, 86_400, n)
+            lote = pd.DataFrame({
+                "ID": np.arange(desde, hasta),
+                "FECHA_UTC": fechas.year * 10_000 + fechas.month * 100 + fechas.day,
+                "HORA_UTC": pd.Series(segundos // 3600 * 10_000 + segundos % 3600 // 60 * 100 + segundos % 60).astype(str).str.zfill(6),
+                "LATITUD": np.round(rng.uniform(SUR, NORTE, n), 3),
+                "LONGITUD": np.round(rng.uniform(OESTE, ESTE, n), 3),
+                "PROFUNDIDAD": np.round(rng.gamma(1.5, 60.0, n)).astype("int64"),
+                "MAGNITUD": np.round(np.minimum(3.0 + rng.exponential(0.6, n), 9.0), 1),
+            })
+            lote.to_csv(archivo, header=desde == 0, index=False, quoting=csv.QUOTE_ALL, lineterminator="\n")
+
+
+class PicoMemoria:
+    """Pico de RSS del proceso mientras dura el bloque ``with``.
+
+    Con ``psutil`` se muestrea el RSS en un hilo; sin él se usa el máximo
+    histórico del proceso (``ru_maxrss``), que nunca baja entre etapas.
+    """
+
+    INTERVALO = 0.005
+
+    def __init__(self):
+        try:
+            import psutil
+        except ImportError:
+            self._proceso = None
+        else:
+            self._proceso = psutil.Process()
+        self.pico = 0
+
+    def _rss(self):
+        if self._proceso is not None:
+            return self._proceso.memory_info().rss
+        import resource
+
+        # En Linux ru_maxrss está en KB
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _muestrear(self):
+        while not self._fin.wait(self.INTERVALO):
+            self.pico = max(self.pico, self._rss())
+
+    def __enter__(self):
+        self.pico = self._rss()
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._fin.set()
+        self._hilo.join()
+        self.pico = max(self.pico, self._rss())
+
+
+def filtrar_mascaras(datos, filtros):
+    """Cadena de máscaras booleanas, como filtraba ``main.py`` antes del índice."""
+    filtrado = datos
+    for columna, filtro in filtros.items():
+        if isinstance(filtro, tuple):
+            filtrado = filtrado[(filtrado[columna] >= filtro[0]) & (filtrado[columna] <= filtro[1])]
+        else:
+            filtrado = filtrado[filtrado[columna].isin(filtro)]
+    return filtrado
+
+
+def medir_tamano(ruta_csv, cantidad, max_referencia):
+    """Ejecuta todas las etapas sobre un catálogo; devuelve una fila por etapa."""
+    import folium
+    import geopandas as gpd
+    from shapely.geometry import Point
+
+    from sismos.capas import LIMITE_MARCADORES_FOLIUM, LIMITE_PUNTOS_PYDECK, capa_sismos_folium, texto_pydeck
+    from sismos.catalogo import MESES, TIPOS_CSV, parsear_catalogo
+    from sismos.cubo import construir_cubos
+    from sismos.densidad import capa_densidad_folium
+    from sismos.departamentos import AsignadorDepartamentos
+    from sismos.enriquecido import leer_departamentos, unir_departamentos
+    from sismos.indice import IndiceRangos
+    from sismos.ingesta import ingerir_csv
+
+    resultados = []
+
+    def etapa(nombre, funcion, *args):
+        with PicoMemoria() as memoria:
+            inicio = time.perf_counter()
+            resultado = funcion(*args)
+            segundos = time.perf_counter() - inicio
+        resultados.append({
+            "sismos": cantidad,
+            "etapa": nombre,
+            "segundos": round(segundos, 6),
+            "pico_rss_mb": round(memoria.pico / 2**20, 1),
+        })
+        return resultado
+
+    departamentos = leer_departamentos()
+    asignador = AsignadorDepartamentos.desde_geojson()
+
+    # Camino original de main.py
+    crudo = etapa("carga_csv", lambda: pd.read_csv(ruta_csv, dtype=TIPOS_CSV))
+    catalogo = etapa("fechas", parsear_catalogo, crudo)
+    if cantidad <= max_referencia:
+        puntos = etapa("puntos", lambda: gpd.GeoDataFrame(
+            crudo, geometry=[Point(xy) for xy in zip(crudo["LONGITUD"], crudo["LATITUD"])], crs="EPSG:4326"))
+        etapa("sjoin", lambda: gpd.sjoin(puntos, departamentos, how="inner", predicate="intersects"))
+        del puntos
+    unido = etapa("cruce_departamentos", unir_departamentos, crudo, asignador)
+    for nombre, filtros in FILTROS_MAPA.items():
+        etapa(f"filtros_mascaras:{nombre}", filtrar_mascaras, unido, filtros)
+    etapa("value_counts", lambda: [
+        filtrar_mascaras(catalogo, {"AÑO": (1990, 2010)})["AÑO"].value_counts().sort_index(),
+        filtrar_mascaras(catalogo, {"AÑO": (2000, 2000)})["MES"].value_counts().sort_index(),
+        filtrar_mascaras(catalogo, {"MAGNITUD": (4.0, 6.0)})["MAGNITUD"].value_counts().sort_index(),
+        filtrar_mascaras(catalogo, {"PROFUNDIDAD": (0.0, 300.0)})["PROFUNDIDAD"].value_counts().sort_index(),
+    ])
+
+    # Motor actual
+    with tempfile.TemporaryDirectory() as directorio:
+        etapa("ingesta_lotes", ingerir_csv, ruta_csv, os.path.join(directorio, "enriquecido.feather"),
+              lambda lote: unir_departamentos(lote, asignador))
+    columnas = ["NOMBDEP", "AÑO", "MES", "MAGNITUD", "PROFUNDIDAD"]
+    indice = etapa("indice", IndiceRangos, unido, columnas)
+    for nombre, filtros in FILTROS_MAPA.items():
+        etapa(f"filtros_indice:{nombre}", indice.filtrar, unido, filtros)
+    codigos = asignador.asignar(crudo["LONGITUD"].to_numpy(), crudo["LATITUD"].to_numpy())
+    cubos = etapa("cubos", construir_cubos, catalogo, codigos, list(asignador.nombres))
+    etapa("histogramas_cubo", lambda: [
+        cubos["magnitud"].histograma("AÑO", {"AÑO": (1990, 2010)}),
+        cubos["magnitud"].histograma("MES", {"AÑO": (2000, 2000)}),
+        cubos["magnitud"].histograma("MAGNITUD", {"MAGNITUD": (4.0, 6.0)}),
+        cubos["profundidad"].histograma("PROFUNDIDAD", {"PROFUNDIDAD": (0.0, 300.0)}),
+    ])
+
+    # Mapa y gráfico apilado sobre la selección más amplia
+    seleccion = indice.filtrar(unido, FILTROS_MAPA["rango_años"])
+    nombres_meses = dict(enumerate(MESES, start=1))
+
+    def mapa_folium(puntos):
+        mapa = folium.Map(location=[-9.19, -73.015], zoom_start=6, prefer_canvas=True)
+        folium.GeoJson(departamentos, name="DEPARTAMENTO").add_to(mapa)
+        capa_sismos_folium(puntos).add_to(mapa)
+        return mapa.get_root().render()
+
+    etapa("mapa_folium", mapa_folium, seleccion.iloc[:LIMITE_MARCADORES_FOLIUM])
+    # Como en la app, desde LIMITE_PUNTOS_PYDECK puntos se muestra la densidad en lugar de deck.gl
+    etapa("mapa_pydeck", texto_pydeck, seleccion.iloc[:LIMITE_PUNTOS_PYDECK], departamentos)
+    etapa("mapa_densidad", lambda: capa_densidad_folium(seleccion, 6)[0].to_json())
+
+    def pivot_table():
+        # Como en main.py: el mes es un número y el nombre se pone al dibujar
+        tabla = seleccion.pivot_table(index="NOMBDEP", columns="MES", values="DIA", aggfunc="count",
+                                      fill_value=0, observed=True)
+        tabla.columns = [nombres_meses[mes] for mes in tabla.columns]
+        return tabla
+
+    etapa("pivot_table", pivot_table)
+    return resultados
+
+
+def versiones():
+    """Versiones de las bibliotecas que más influyen en los tiempos."""
+    from importlib import metadata
+
+    resultado = {"python": platform.python_version()}
+    for paquete in ("numpy", "pandas", "pyarrow", "shapely", "geopandas", "folium"):
+        try:
+            resultado[paquete] = metadata.version(paquete)
+        except metadata.PackageNotFoundError:
+            resultado[paquete] = None
+    return resultado
+
+
+def comparar(resultados, ruta_anterior):
+    """Imprime el tiempo actual dividido por el de una corrida anterior."""
+    with open(ruta_anterior, encoding="utf-8") as archivo:
+        anteriores = {(r["sismos"], r["etapa"]): r for r in json.load(archivo)["resultados"]}
+    print(f"\n{'sismos':>12}  {'etapa':<32} {'antes (s)':>10} {'ahora (s)':>10} {'relación':>9}")
+    for fila in resultados:
+        anterior = anteriores.get((fila["sismos"], fila["etapa"]))
+        if anterior is None or anterior["segundos"] == 0:
+            continue
+        relacion = fila["segundos"] / anterior["segundos"]
+        print(f"{fila['sismos']:>12,}  {fila['etapa']:<32} {anterior['segundos']:>10.4f} {fila['segundos']:>10.4f} {relacion:>8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS)
+    parser.add_argument("--max-referencia", type=int, default=1_000_000)
+    parser.add_argument("--salida", default="bench_paginas.json")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    resultados = []
+    contexto = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directorio:
+        for cantidad in args.tamanos:
+            ruta_csv = os.path.join(directorio, f"sismos_{cantidad}.csv")
+            generar_catalogo(ruta_csv, cantidad, args.semilla)
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=contexto) as proceso:
+                filas = proceso.submit(medir_tamano, ruta_csv, cantidad, args.max_referencia).result()
+            os.remove(ruta_csv)
+            print(f"\n{'sismos':>12}  {'etapa':<32} {'segundos':>10} {'pico RSS (MB)':>14}")
+            for fila in filas:
+                print(f"{fila['sismos']:>12,}  {fila['etapa']:<32} {fila['segundos']:>10.4f} {fila['pico_rss_mb']:>14.1f}")
+            resultados.extend(filas)
+
+    with open(args.salida, "w", encoding="utf-8") as archivo:
+        json.dump({
+            "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "maquina": {"sistema": platform.platform(), "procesador": platform.machine(), "cpus": os.cpu_count()},
+            "versiones": versiones(),
+            "max_referencia": args.max_referencia,
+            "resultados": resultados,
+        }, archivo, indent=2, ensure_ascii=False)
+    print(f"\nResultados en {args.salida}")
+    if args.comparar:
+        comparar(resultados, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,17 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from streamlit_option_menu import option_menu
-import geopandas as gpd
-import folium
-import matplotlib.pyplot as plt
-from shapely.geometry import Point
-from streamlit_folium import st_folium
+from sismos.catalogo import MESES, cargar_catalogo, para_mostrar
+from sismos.consultas import contar_por, sismos_cerca, sismos_en, sismos_en_peru
+from sismos.diagnostico import Registro, activar, desactivar, etapa, medido
+from sismos import precalculo
+from sismos.render import renderizado
 
-
-# Cargar dataset
-file_path = "PA_FINAL/Dataset_1960_2023_sismo.csv"
-data = pd.read_csv(file_path)
-data['FECHA_UTC'] = pd.to_datetime(data['FECHA_UTC'], format='%Y%m%d', errors='coerce').dt.strftime('%Y-%m-%d')
-data['HORA_UTC'] = pd.to_datetime(data['HORA_UTC'], errors='coerce', format='%H%M%S').dt.time
+# plotly, folium, matplotlib y las bibliotecas geoespaciales se importan dentro
+# de la página que las usa, para que abrir "Inicio" no tenga que cargarlas
 
 # Funciones de las páginas
+@medido("pagina.inicio")
 def home_page():
     st.title("Catálogo Sísmico 1960 - 2023")
     st.write("Bienvenido a la aplicación de análisis de sismos.")
@@ -49,13 +45,34 @@ def home_page():
     st.info("🙌La naturaleza puede ser poderosa, pero la valentía y la solidaridad de las personas son indestructibles.🥰")
 
 
+TIPOS_GRAFICO = ["barras", "sector", "lineas"]
+
+
+def sin_replicas():
+    # Interruptor de la barra lateral: todas las páginas usan el catálogo con o sin réplicas
+    return st.session_state.get("sin_replicas", False)
+
+
+def mostrar_figura(pagina, tipo, filtros, construir):
+    # La figura se guarda como JSON en la caché de renders (ver sismos/render.py),
+    # compartida entre sesiones: con los mismos filtros no se vuelve a construir
+    import plotly.io as pio
+
+    filtros = dict(filtros, sin_replicas=sin_replicas())
+    with etapa(f"{pagina}.figura"):
+        figura = renderizado(pagina, tipo, filtros, lambda: construir().to_json())
+    with etapa(f"{pagina}.plotly_chart"):
+        st.plotly_chart(pio.from_json(figura))
+
+
+@medido("pagina.graficos_anos")
 def visualizacion_anos(tipo):
-    st.title("Visualización por Años")
+    import plotly.express as px
 
-    # Convertir fechas a datetime si no están ya en ese formato
-    data["FECHA_UTC"] = pd.to_datetime(data["FECHA_UTC"], errors="coerce")
-    data["AÑO"] = data["FECHA_UTC"].dt.year
-    data["MES"] = data["FECHA_UTC"].dt.month
+    st.title("Visualización por Años")
+    # Catálogo compartido (se parsea una vez por proceso y se reutiliza entre reruns)
+    with etapa("catalogo"):
+        data = cargar_catalogo()
 
     filtro_tipo = st.radio("Selecciona el tipo de filtro:", ["Por rango de años", "Por un solo año"])
     
@@ -63,29 +80,33 @@ def visualizacion_anos(tipo):
         rango_min = st.number_input("Año mínimo:", value=int(data["AÑO"].min()), step=1)
         rango_max = st.number_input("Año máximo:", value=int(data["AÑO"].max()), step=1)
         if rango_min <= rango_max:
-            datos_filtrados = data[(data["AÑO"] >= rango_min) & (data["AÑO"] <= rango_max)]
-            conteo_por_año = datos_filtrados["AÑO"].value_counts().sort_index()
+            with etapa("graficos.conteo"):
+                conteo_por_año = contar_por("AÑO", {"AÑO": (rango_min, rango_max)}, sin_replicas())
             
             if not conteo_por_año.empty:
-                colores = px.colors.qualitative.Set3  # Colores para los gráficos
-                if tipo == "barras":
-                    fig = px.bar(conteo_por_año, x=conteo_por_año.index, y=conteo_por_año.values, 
-                                 color=conteo_por_año.index, 
-                                 color_discrete_sequence=colores,
-                                 labels={"x": "Año", "y": "Cantidad de Sismos"})
-                elif tipo == "sector":
-                    fig = px.pie(values=conteo_por_año.values, names=conteo_por_año.index,
-                                 labels={"names": "Año", "values": "Cantidad de Sismos"})
-                elif tipo == "lineas":
-                    fig = px.line(conteo_por_año, x=conteo_por_año.index, y=conteo_por_año.values, 
-                                  markers=True, 
-                                  labels={"x": "Año", "y": "Cantidad de Sismos"})
-                    fig.update_traces(marker=dict(size=10, color=colores[0]), line=dict(color=colores[1]))
-                else:
+                if tipo not in TIPOS_GRAFICO:
                     st.error("Tipo de gráfico no soportado.")
                     return
-                st.plotly_chart(fig)
-                cantidad = datos_filtrados.shape[0]
+
+                def figura():
+                    colores = px.colors.qualitative.Set3  # Colores para los gráficos
+                    if tipo == "barras":
+                        fig = px.bar(conteo_por_año, x=conteo_por_año.index, y=conteo_por_año.values, 
+                                     color=conteo_por_año.index, 
+                                     color_discrete_sequence=colores,
+                                     labels={"x": "Año", "y": "Cantidad de Sismos"})
+                    elif tipo == "sector":
+                        fig = px.pie(values=conteo_por_año.values, names=conteo_por_año.index,
+                                     labels={"names": "Año", "values": "Cantidad de Sismos"})
+                    else:
+                        fig = px.line(conteo_por_año, x=conteo_por_año.index, y=conteo_por_año.values, 
+                                      markers=True, 
+                                      labels={"x": "Año", "y": "Cantidad de Sismos"})
+                        fig.update_traces(marker=dict(size=10, color=colores[0]), line=dict(color=colores[1]))
+                    return fig
+
+                mostrar_figura("anos", tipo, {"AÑO": (rango_min, rango_max)}, figura)
+                cantidad = int(conteo_por_año.sum())
                 st.write(f"Cantidad de sismos : {cantidad}")
                 
             else:
@@ -95,153 +116,186 @@ def visualizacion_anos(tipo):
 
     elif filtro_tipo == "Por un solo año":
         año = st.number_input("Año:", value=int(data["AÑO"].min()), step=1)
-        datos_filtrados = data[data["AÑO"] == año]
-        conteo_por_mes = datos_filtrados["MES"].value_counts().sort_index()
-
-        if not datos_filtrados.empty and not conteo_por_mes.empty:
-            colores = px.colors.qualitative.Set3
-            if tipo == "barras":
-                fig = px.bar(conteo_por_mes, x=conteo_por_mes.index, y=conteo_por_mes.values,
-                             color=conteo_por_mes.index, color_discrete_sequence=colores,
-                             labels={"x": "Mes", "y": "Cantidad de Sismos"})
-            elif tipo == "sector":
-                fig = px.pie(values=conteo_por_mes.values, names=conteo_por_mes.index,
-                             labels={"names": "Mes", "values": "Cantidad de Sismos"})
-            elif tipo == "lineas":
-                fig = px.line(conteo_por_mes, x=conteo_por_mes.index, y=conteo_por_mes.values,markers=True,
-                              labels={"x": "Mes", "y": "Cantidad de Sismos"})
-                fig.update_traces(marker=dict(size=10, color=colores[0]), line=dict(color=colores[1]))
-            else:
+        with etapa("graficos.conteo"):
+            conteo_por_mes = contar_por("MES", {"AÑO": (año, año)}, sin_replicas())
+
+        if not conteo_por_mes.empty:
+            if tipo not in TIPOS_GRAFICO:
                 st.error("Tipo de gráfico no soportado.")
                 return
-            st.plotly_chart(fig)
-            cantidad = datos_filtrados.shape[0]
+
+            def figura():
+                colores = px.colors.qualitative.Set3
+                if tipo == "barras":
+                    fig = px.bar(conteo_por_mes, x=conteo_por_mes.index, y=conteo_por_mes.values,
+                                 color=conteo_por_mes.index, color_discrete_sequence=colores,
+                                 labels={"x": "Mes", "y": "Cantidad de Sismos"})
+                elif tipo == "sector":
+                    fig = px.pie(values=conteo_por_mes.values, names=conteo_por_mes.index,
+                                 labels={"names": "Mes", "values": "Cantidad de Sismos"})
+                else:
+                    fig = px.line(conteo_por_mes, x=conteo_por_mes.index, y=conteo_por_mes.values,markers=True,
+                                  labels={"x": "Mes", "y": "Cantidad de Sismos"})
+                    fig.update_traces(marker=dict(size=10, color=colores[0]), line=dict(color=colores[1]))
+                return fig
+
+            mostrar_figura("meses", tipo, {"AÑO": (año, año)}, figura)
+            cantidad = int(conteo_por_mes.sum())
             st.write(f"Cantidad de sismos : {cantidad}")
         else:
             st.warning("No hay datos para el año seleccionado.")
 
 
+@medido("pagina.graficos_magnitud")
 def visualizacion_magnitud(tipo):
+    import plotly.express as px
+
     st.title("Visualización por Magnitud")
+    with etapa("catalogo"):
+        data = cargar_catalogo()
     filtro_tipo = st.radio("Selecciona el tipo de filtro:", ["Por rango de magnitudes", "Por magnitud única"])
     colores = px.colors.qualitative.Pastel
     if filtro_tipo == "Por rango de magnitudes":
-        magnitud_min = st.number_input("Magnitud mínima:", value=float(data["MAGNITUD"].min()), step=0.1)
-        magnitud_max = st.number_input("Magnitud máxima:", value=float(data["MAGNITUD"].max()), step=0.1)
+        magnitud_min = st.number_input("Magnitud mínima:", value=round(float(data["MAGNITUD"].min()), 1), step=0.1)
+        magnitud_max = st.number_input("Magnitud máxima:", value=round(float(data["MAGNITUD"].max()), 1), step=0.1)
         if magnitud_min <= magnitud_max:
-            datos_filtrados = data[(data["MAGNITUD"] >= magnitud_min) & (data["MAGNITUD"] <= magnitud_max)]
-            conteo_por_magnitud = datos_filtrados["MAGNITUD"].value_counts().sort_index()
-            if tipo == "barras":
-                fig = px.bar(conteo_por_magnitud, x=conteo_por_magnitud.index, y=conteo_por_magnitud.values, 
-                             color=conteo_por_magnitud.index, 
-                             color_discrete_sequence=colores,
-                             labels={"x": "Magnitud", "y": "Cantidad de Sismos"})
-            elif tipo == "sector":
-                fig = px.pie(values=conteo_por_magnitud.values, names=conteo_por_magnitud.index,
-                             labels={"names": "Magnitud", "values": "Cantidad de Sismos"})
-
-            elif tipo == "lineas":
-                fig = px.line(conteo_por_magnitud, x=conteo_por_magnitud.index, y=conteo_por_magnitud.values, 
-                              markers=True, 
-                              labels={"x": "Magnitud", "y": "Cantidad de Sismos"})
-                fig.update_traces(marker=dict(size=10, color=colores[0]), line=dict(color=colores[1]))
-            else:
+            with etapa("graficos.conteo"):
+                conteo_por_magnitud = contar_por("MAGNITUD", {"MAGNITUD": (magnitud_min, magnitud_max)}, sin_replicas())
+            if tipo not in TIPOS_GRAFICO:
                 st.error("Tipo de gráfico no soportado.")
                 return
-            st.plotly_chart(fig)
-            cantidad = datos_filtrados.shape[0]
+
+            def figura():
+                if tipo == "barras":
+                    fig = px.bar(conteo_por_magnitud, x=conteo_por_magnitud.index, y=conteo_por_magnitud.values, 
+                                 color=conteo_por_magnitud.index, 
+                                 color_discrete_sequence=colores,
+                                 labels={"x": "Magnitud", "y": "Cantidad de Sismos"})
+                elif tipo == "sector":
+                    fig = px.pie(values=conteo_por_magnitud.values, names=conteo_por_magnitud.index,
+                                 labels={"names": "Magnitud", "values": "Cantidad de Sismos"})
+
+                else:
+                    fig = px.line(conteo_por_magnitud, x=conteo_por_magnitud.index, y=conteo_por_magnitud.values, 
+                                  markers=True, 
+                                  labels={"x": "Magnitud", "y": "Cantidad de Sismos"})
+                    fig.update_traces(marker=dict(size=10, color=colores[0]), line=dict(color=colores[1]))
+                return fig
+
+            mostrar_figura("magnitud", tipo, {"MAGNITUD": (magnitud_min, magnitud_max)}, figura)
+            cantidad = int(conteo_por_magnitud.sum())
             st.write(f"Cantidad de sismos : {cantidad}")
         else:
             st.error("La magnitud mínima no puede ser mayor que la máxima.")
     
     elif filtro_tipo == "Por magnitud única":
-        magnitud = st.number_input("Ingresa una magnitud:", value=float(data["MAGNITUD"].min()), step=0.1)
-        datos_filtrados = data[data["MAGNITUD"] == magnitud]
+        magnitud = st.number_input("Ingresa una magnitud:", value=round(float(data["MAGNITUD"].min()), 1), step=0.1)
+        with etapa("graficos.consulta"):
+            datos_filtrados = sismos_en({"MAGNITUD": (magnitud, magnitud)}, sin_replicas())
         if datos_filtrados.empty:
             st.write("No se encontraron datos para la magnitud seleccionada.")
         else:
-            st.dataframe(datos_filtrados)
+            st.dataframe(para_mostrar(datos_filtrados))
             cantidad = datos_filtrados.shape[0]
             st.write(f"Cantidad de sismos : {cantidad}")
 
 
+@medido("pagina.graficos_profundidad")
 def visualizacion_profundidad(tipo):
+    import plotly.express as px
+
     st.title("Visualización por Profundidad")
+    with etapa("catalogo"):
+        data = cargar_catalogo()
     filtro_tipo = st.radio("Selecciona el tipo de filtro:", ["Por rango de profundidad", "Por valor único de profundidad"])
 
     if filtro_tipo == "Por rango de profundidad":
-        profundidad_min = st.number_input("Profundidad mínima (km):", value=float(data["PROFUNDIDAD"].min()), step=0.1)
-        profundidad_max = st.number_input("Profundidad máxima (km):", value=float(data["PROFUNDIDAD"].max()), step=0.1)
+        profundidad_min = st.number_input("Profundidad mínima (km):", value=round(float(data["PROFUNDIDAD"].min()), 1), step=0.1)
+        profundidad_max = st.number_input("Profundidad máxima (km):", value=round(float(data["PROFUNDIDAD"].max()), 1), step=0.1)
         if profundidad_min <= profundidad_max:
-            datos_filtrados = data[(data["PROFUNDIDAD"] >= profundidad_min) & (data["PROFUNDIDAD"] <= profundidad_max)]
-            conteo_por_profundidad = datos_filtrados["PROFUNDIDAD"].value_counts().sort_index()
-            fig = px.bar(conteo_por_profundidad, x=conteo_por_profundidad.index, y=conteo_por_profundidad.values, labels={"x": "Profundidad", "y": "Cantidad de Sismos"})
-            colores = px.colors.qualitative.Set3
-            if tipo == "barras":
-                fig = px.bar(conteo_por_profundidad, x=conteo_por_profundidad.index, y=conteo_por_profundidad.values,
-                             color=conteo_por_profundidad.index, color_discrete_sequence=colores,
-                             labels={"x": "Profundidad", "y": "Cantidad de Sismos"})
-            elif tipo == "sector":
-                fig = px.pie(values=conteo_por_profundidad.values, names=conteo_por_profundidad.index,
-                             labels={"names": "Profundidad", "values": "Cantidad de Sismos"})
-            elif tipo == "lineas":
-                fig = px.line(conteo_por_profundidad, x=conteo_por_profundidad.index, y=conteo_por_profundidad.values,markers=True,
-                              labels={"x": "Profundidad", "y": "Cantidad de Sismos"})
-                fig.update_traces(marker=dict(size=10, color=colores[0]), line=dict(color=colores[1]))
-            else:
+            with etapa("graficos.conteo"):
+                conteo_por_profundidad = contar_por("PROFUNDIDAD", {"PROFUNDIDAD": (profundidad_min, profundidad_max)}, sin_replicas())
+            if tipo not in TIPOS_GRAFICO:
                 st.error("Tipo de gráfico no soportado.")
                 return
-            st.plotly_chart(fig)
-            cantidad = datos_filtrados.shape[0]
+
+            def figura():
+                colores = px.colors.qualitative.Set3
+                if tipo == "barras":
+                    fig = px.bar(conteo_por_profundidad, x=conteo_por_profundidad.index, y=conteo_por_profundidad.values,
+                                 color=conteo_por_profundidad.index, color_discrete_sequence=colores,
+                                 labels={"x": "Profundidad", "y": "Cantidad de Sismos"})
+                elif tipo == "sector":
+                    fig = px.pie(values=conteo_por_profundidad.values, names=conteo_por_profundidad.index,
+                                 labels={"names": "Profundidad", "values": "Cantidad de Sismos"})
+                else:
+                    fig = px.line(conteo_por_profundidad, x=conteo_por_profundidad.index, y=conteo_por_profundidad.values,markers=True,
+                                  labels={"x": "Profundidad", "y": "Cantidad de Sismos"})
+                    fig.update_traces(marker=dict(size=10, color=colores[0]), line=dict(color=colores[1]))
+                return fig
+
+            mostrar_figura("profundidad", tipo, {"PROFUNDIDAD": (profundidad_min, profundidad_max)}, figura)
+            cantidad = int(conteo_por_profundidad.sum())
             st.write(f"Cantidad de sismos : {cantidad}")
         else:
             st.error("La profundidad mínima no puede ser mayor que la máxima.")
 
     elif filtro_tipo == "Por valor único de profundidad":
-        profundidad = st.number_input("Ingresa una profundidad (km):", value=float(data["PROFUNDIDAD"].min()), step=0.1)
-        datos_filtrados = data[data["PROFUNDIDAD"] == profundidad]
+        profundidad = st.number_input("Ingresa una profundidad (km):", value=round(float(data["PROFUNDIDAD"].min()), 1), step=0.1)
+        with etapa("graficos.consulta"):
+            datos_filtrados = sismos_en({"PROFUNDIDAD": (profundidad, profundidad)}, sin_replicas())
         if datos_filtrados.empty:
             st.write("No se encontraron datos para la profundidad seleccionada.")
         else:
-            st.dataframe(datos_filtrados)
+            st.dataframe(para_mostrar(datos_filtrados))
             cantidad = datos_filtrados.shape[0]
             st.write(f"Cantidad de sismos : {cantidad}")
 
 
 # MENU
 # Función mapa
+@medido("pagina.mapa")
 def mapa():
     # Configuración de la página
     """
     st.set_page_config(page_title="Mapa de Sismos en Perú", layout="wide")
     """
-    
+    import io
+    import json
+    import folium
+    import matplotlib.pyplot as plt
+    from streamlit_folium import st_folium
+    from sismos.capas import (CAPA_PYDECK, LIMITE_MARCADORES_FOLIUM, LIMITE_PUNTOS_PYDECK, capa_sismos_folium,
+                              mapa_pydeck, texto_pydeck, texto_sismos)
+    from sismos.densidad import capa_densidad_folium
+    from sismos.limites import capa_limites_folium, cargar_limites
+
     # Título de la aplicación
     st.title("🌎 Mapa Interactivo de Sismos en Perú")
 
-    # Cargar el archivo GeoJSON con los límites de los departamentos de Perú
-    departamentos = gpd.read_file('PA_FINAL/departamentos_perú.geojson')
-    if departamentos.crs is None or departamentos.crs != "EPSG:4326":
-        departamentos = departamentos.to_crs("EPSG:4326")
+    # Límites de los departamentos de Perú, simplificados por zoom (ver sismos/limites.py)
+    with etapa("mapa.limites"):
+        departamentos = cargar_limites()
 
-    
-    # Cargar el dataset de los sismos
-    df = pd.read_csv('PA_FINAL/Dataset_1960_2023_sismo.csv')
+    # Catálogo compartido: Año, Mes y Día ya vienen calculados (el Mes se muestra como texto)
+    with etapa("catalogo"):
+        data = cargar_catalogo()
+    nombres_meses = dict(enumerate(MESES, start=1))
 
-    
-    # Crear nuevas columnas para Año, Mes (como texto) y Día
-    #df['FECHA_UTC'] = pd.to_datetime(df['FECHA_UTC'], format='%Y-%m-%d')
-    df['FECHA_UTC'] = pd.to_datetime(df['FECHA_UTC'], format='%Y%m%d')
-    df['AÑO'] = df['FECHA_UTC'].dt.year
-    df['MES'] = df['FECHA_UTC'].dt.month_name(locale="es_ES")  # Nombres de meses en español
-    df['DIA'] = df['FECHA_UTC'].dt.day
+    # Los sismos con su departamento los prepara el precálculo de fondo (ver sismos/precalculo.py);
+    # si todavía no llegó a esa etapa, esta sesión espera el mismo trabajo que las demás
+    if "enriquecido" not in precalculo.estado()["hechas"] and not precalculo.listo():
+        barra = st.progress(0.0, text="Preparando el catálogo...")
 
-    # Crear geometrías de puntos a partir de LONGITUD y LATITUD
-    geometry = [Point(xy) for xy in zip(df['LONGITUD'], df['LATITUD'])]
-    gdf = gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
+        def avance(actual):
+            texto = f"Preparando el catálogo: {actual['etapa']}"
+            if actual["filas"] is not None:
+                texto += f"... {actual['filas']:,} sismos"
+            barra.progress(actual["fraccion"] or 0.0, text=texto)
 
-    # Realizar el join espacial para filtrar solo datos dentro de Perú
-    joined_gdf = gpd.sjoin(gdf, departamentos, how="inner", predicate="intersects")
+        with etapa("mapa.espera_precalculo"):
+            precalculo.esperar("enriquecido", avance)
+        barra.empty()
 
     # Crear columnas para separar el mapa y los filtros
     col1, col2 = st.columns([3, 1])  # Columna más ancha para el mapa (3), columna más estrecha para los filtros y gráficos (1)
@@ -251,107 +305,304 @@ def mapa():
         st.markdown("### Filtros de Selección")
         
         # Filtro por departamento (con opción de seleccionar múltiples)
-        filtro_departamento = st.multiselect("Selecciona un o más departamentos", options=["Todos"] + departamentos['NOMBDEP'].unique().tolist(), default=["Todos"])
+        filtro_departamento = st.multiselect("Selecciona un o más departamentos", options=["Todos"] + list(dict.fromkeys(departamentos.nombres)), default=["Todos"])
         
         # Filtro por rango de años y año único
-        filtro_año_unico = st.selectbox("Selecciona un año", options=["Todos"] + sorted(df['AÑO'].unique().tolist()), index=0)
-        rango_años = st.slider("Selecciona un rango de años", min_value=int(df['AÑO'].min()), max_value=int(df['AÑO'].max()), value=(int(df['AÑO'].min()), int(df['AÑO'].max())))
+        filtro_año_unico = st.selectbox("Selecciona un año", options=["Todos"] + sorted(data['AÑO'].unique().tolist()), index=0)
+        rango_años = st.slider("Selecciona un rango de años", min_value=int(data['AÑO'].min()), max_value=int(data['AÑO'].max()), value=(int(data['AÑO'].min()), int(data['AÑO'].max())))
         
         # Filtro por mes
-        filtro_mes = st.multiselect("Selecciona el mes", options=df['MES'].unique(), default=[])
+        filtro_mes = st.multiselect("Selecciona el mes", options=[nombres_meses[mes] for mes in data['MES'].unique()], default=[])
         
         # Filtro por rango de magnitudes
-        rango_magnitud = st.slider("Selecciona un rango de magnitudes", min_value=float(df['MAGNITUD'].min()), max_value=float(df['MAGNITUD'].max()), value=(float(df['MAGNITUD'].min()), float(df['MAGNITUD'].max())))
+        rango_magnitud = st.slider("Selecciona un rango de magnitudes", min_value=round(float(data['MAGNITUD'].min()), 1), max_value=round(float(data['MAGNITUD'].max()), 1), value=(round(float(data['MAGNITUD'].min()), 1), round(float(data['MAGNITUD'].max()), 1)))
 
         # Filtro por rango de profundidad
-        rango_profundidad = st.slider("Selecciona un rango de profundidad (km)", min_value=float(df['PROFUNDIDAD'].min()), max_value=float(df['PROFUNDIDAD'].max()), value=(float(df['PROFUNDIDAD'].min()), float(df['PROFUNDIDAD'].max())))
+        rango_profundidad = st.slider("Selecciona un rango de profundidad (km)", min_value=round(float(data['PROFUNDIDAD'].min()), 1), max_value=round(float(data['PROFUNDIDAD'].max()), 1), value=(round(float(data['PROFUNDIDAD'].min()), 1), round(float(data['PROFUNDIDAD'].max()), 1)))
 
-        # Filtrar los datos según los filtros seleccionados
-        filtered_gdf = joined_gdf.copy()
+        # Filtrar los datos según los filtros seleccionados (cada filtro es un rango del índice)
+        filtros = {}
 
         # Filtrar por departamento si no está en "Todos"
         if "Todos" not in filtro_departamento:
-            filtered_gdf = filtered_gdf[filtered_gdf['NOMBDEP'].isin(filtro_departamento)]
-        
-        # Filtrar por año único
+            filtros['NOMBDEP'] = filtro_departamento
+
+        # Filtrar por rango de años y, si se eligió, por año único
+        filtros['AÑO'] = rango_años
         if filtro_año_unico != "Todos":
-            filtered_gdf = filtered_gdf[filtered_gdf['AÑO'] == int(filtro_año_unico)]
-        
-        # Filtrar por rango de años
-        if rango_años:
-            filtered_gdf = filtered_gdf[(filtered_gdf['AÑO'] >= rango_años[0]) & (filtered_gdf['AÑO'] <= rango_años[1])]
-        
+            año = int(filtro_año_unico)
+            filtros['AÑO'] = (max(año, rango_años[0]), min(año, rango_años[1]))
+
         # Filtrar por mes
         if filtro_mes:
-            filtered_gdf = filtered_gdf[filtered_gdf['MES'].isin(filtro_mes)]
-        
-        # Filtrar por magnitud
-        if rango_magnitud:
-            filtered_gdf = filtered_gdf[(filtered_gdf['MAGNITUD'] >= rango_magnitud[0]) & (filtered_gdf['MAGNITUD'] <= rango_magnitud[1])]
-        
-        # Filtrar por profundidad
-        if rango_profundidad:
-            filtered_gdf = filtered_gdf[(filtered_gdf['PROFUNDIDAD'] >= rango_profundidad[0]) & (filtered_gdf['PROFUNDIDAD'] <= rango_profundidad[1])]
+            filtros['MES'] = [MESES.index(mes) + 1 for mes in filtro_mes]
 
-        # Mostrar la cantidad de puntos filtrados
-        st.write(f"Cantidad de puntos filtrados: {len(filtered_gdf)}")
+        # Filtrar por magnitud y profundidad
+        filtros['MAGNITUD'] = rango_magnitud
+        filtros['PROFUNDIDAD'] = rango_profundidad
 
-    # Crear un mapa centrado en Perú
-    mapa_peru = folium.Map(location=[-9.19, -73.015], zoom_start=6)
+        # Solo se materializan las filas que cumplen todos los filtros (ver sismos/consultas.py)
+        with etapa("mapa.consulta"):
+            filtered_gdf = sismos_en_peru(filtros, sin_replicas=sin_replicas())
+        # Las capas y gráficos guardados dependen también del interruptor de réplicas
+        clave_render = dict(filtros, sin_replicas=sin_replicas())
 
-    # Agregar los límites de los departamentos al mapa
-    def estilo_departamento(feature):
-        if feature['properties']['NOMBDEP'] in filtro_departamento or "Todos" in filtro_departamento:
-            return {"fillColor": "#ff7800", "color": "red", "weight": 3, "fillOpacity": 0.5}
-        return {"fillColor": "#14c7c1", "color": "black", "fillOpacity": 0.3}
+        # Mostrar la cantidad de puntos filtrados
+        st.write(f"Cantidad de puntos filtrados: {len(filtered_gdf)}")
 
-    folium.GeoJson(
-        departamentos,
-        name="DEPARTAMENTO",
-        style_function=estilo_departamento
-    ).add_to(mapa_peru)
+        # Tipo de mapa: Leaflet para selecciones moderadas, deck.gl (WebGL) para muchas
+        # y hexágonos agregados en el servidor para ver la densidad
+        tipo_mapa = st.radio("Tipo de mapa", ["Marcadores", "Marcadores GPU (pydeck)", "Densidad (hexágonos)"])
+
+    # Última vista del mapa (zoom y límites) devuelta por st_folium en el rerun anterior
+    estado_mapa = st.session_state.get("mapa_sismos") or {}
+    zoom = estado_mapa.get("zoom") or 6
+    centro = estado_mapa.get("center") or {"lat": -9.19, "lng": -73.015}
+
+    # Crear un mapa centrado en Perú (los círculos se dibujan sobre canvas, no como elementos SVG)
+    mapa_peru = folium.Map(location=[centro["lat"], centro["lng"]], zoom_start=zoom, prefer_canvas=True)
+
+    # Vista actual del mapa (oeste, sur, este, norte), si st_folium ya la devolvió
+    limites = estado_mapa.get("bounds") or {}
+    vista = None
+    if limites.get("_southWest", {}).get("lng") is not None:
+        vista = (limites["_southWest"]["lng"], limites["_southWest"]["lat"],
+                 limites["_northEast"]["lng"], limites["_northEast"]["lat"])
+
+    # Agregar los límites de los departamentos al mapa (los seleccionados se resaltan en el navegador)
+    with etapa("mapa.capa_limites"):
+        capa_limites_folium(zoom, filtro_departamento, vista).add_to(mapa_peru)
+
+    # Sismos cerca del último punto donde se hizo clic en el mapa (ver sismos/cercanos.py)
+    clic = estado_mapa.get("last_clicked")
+    if clic:
+        with col2:
+            st.markdown("### Cerca del punto seleccionado")
+            modo_cercania = st.radio("Buscar", ["En un radio", "Los más cercanos"])
+            if modo_cercania == "En un radio":
+                radio_km = st.slider("Radio (km)", min_value=10, max_value=500, value=100, step=10)
+                cantidad_cercanos = None
+            else:
+                radio_km = None
+                cantidad_cercanos = int(st.number_input("Cantidad de sismos", min_value=1, max_value=500, value=20, step=1))
+        with etapa("mapa.cercanos"):
+            cerca = sismos_cerca(clic["lat"], clic["lng"], radio_km=radio_km, k=cantidad_cercanos, sin_replicas=sin_replicas())
+        alcance_km = radio_km if radio_km is not None else (float(cerca["DISTANCIA_KM"].max()) if len(cerca) else 0.0)
+        folium.Circle([clic["lat"], clic["lng"]], radius=alcance_km * 1000, color="#1199EE", weight=2, fill=False).add_to(mapa_peru)
 
     # **Agregar esta condición para verificar si hay filtros seleccionados**
-    if len(filtro_departamento) > 0 or len(filtro_mes) > 0 or filtro_año_unico != "Todos" or rango_años != (int(df['AÑO'].min()), int(df['AÑO'].max())) or rango_magnitud != (float(df['MAGNITUD'].min()), float(df['MAGNITUD'].max())) or rango_profundidad != (float(df['PROFUNDIDAD'].min()), float(df['PROFUNDIDAD'].max())):
-        # Mostrar los puntos solo si hay al menos un filtro seleccionado
-        if len(filtered_gdf) > 0:
-            for _, row in filtered_gdf.iterrows():
-                folium.CircleMarker(
-                    location=[row['LATITUD'], row['LONGITUD']],
-                    radius=5,
-                    color="red",
-                    fill=True,
-                    fill_color="red",
-                    fill_opacity=0.7,
-                    popup=f"Departamento: {row['NOMBDEP']}<br>Año: {row['AÑO']}<br>Mes: {row['MES']}<br>Día: {row['DIA']}<br>Magnitud: {row['MAGNITUD']}<br>Profundidad: {row['PROFUNDIDAD']} km",
-                ).add_to(mapa_peru)
+    mostrar_puntos = len(filtro_departamento) > 0 or len(filtro_mes) > 0 or filtro_año_unico != "Todos" or rango_años != (int(data['AÑO'].min()), int(data['AÑO'].max())) or rango_magnitud != (round(float(data['MAGNITUD'].min()), 1), round(float(data['MAGNITUD'].max()), 1)) or rango_profundidad != (round(float(data['PROFUNDIDAD'].min()), 1), round(float(data['PROFUNDIDAD'].max()), 1))
+    puntos = filtered_gdf if mostrar_puntos else filtered_gdf.iloc[:0]
+    # Con demasiados puntos ni deck.gl es fluido: se muestra la densidad
+    usar_densidad = tipo_mapa == "Densidad (hexágonos)" or len(puntos) > LIMITE_PUNTOS_PYDECK
+    usar_gpu = not usar_densidad and (tipo_mapa == "Marcadores GPU (pydeck)" or len(puntos) > LIMITE_MARCADORES_FOLIUM)
+
+    if usar_densidad:
+        # Solo se envían las celdas de la vista actual, con tamaño según el zoom
+        with etapa("mapa.capa_densidad"):
+            capa_densidad, celdas = capa_densidad_folium(puntos, zoom, vista)
+        capa_densidad.add_to(mapa_peru)
+    elif len(puntos) > 0 and not usar_gpu:
+        # Mostrar los puntos solo si hay al menos un filtro seleccionado, todos en una sola capa
+        # (su GeoJSON serializado se guarda en la caché de renders)
+        with etapa("mapa.capa_sismos"):
+            capa_sismos_folium(renderizado("mapa", "sismos", clave_render, lambda: texto_sismos(puntos))).add_to(mapa_peru)
 
     # Mostrar el mapa interactivo en la columna izquierda
     with col1:
         st.markdown("### Mapa de sismos en Perú")
-        st_data = st_folium(mapa_peru, width=800, height=500)
+        if usar_densidad and tipo_mapa != "Densidad (hexágonos)":
+            st.info(f"Más de {LIMITE_PUNTOS_PYDECK:,} puntos: se muestra la densidad.")
+        if usar_gpu:
+            if tipo_mapa != "Marcadores GPU (pydeck)":
+                st.info(f"Más de {LIMITE_MARCADORES_FOLIUM:,} puntos: se muestra el mapa GPU.")
+            # El JSON del mapa se guarda en la caché de renders; cada punto lleva solo posición y magnitud
+            with etapa("mapa.pydeck"):
+                texto = renderizado("mapa", "pydeck", clave_render,
+                                    lambda: texto_pydeck(puntos, json.loads(departamentos.geojson(6))))
+                evento = st.pydeck_chart(mapa_pydeck(texto), on_select="rerun", selection_mode="single-object",
+                                         key="mapa_pydeck")
+            # El detalle del sismo elegido sale del servidor: la fila i de la capa es la fila i de puntos
+            seleccionados = [i for i in (evento.selection.get("indices") or {}).get(CAPA_PYDECK, []) if i < len(puntos)]
+            if seleccionados:
+                st.dataframe(para_mostrar(puntos.iloc[seleccionados]))
+        else:
+            with etapa("mapa.st_folium"):
+                st_data = st_folium(mapa_peru, width=800, height=500, key="mapa_sismos")
+
+    if clic:
+        st.markdown(f"### Sismos a {alcance_km:.0f} km o menos de ({clic['lat']:.3f}, {clic['lng']:.3f})")
+        st.write(f"Cantidad de sismos: {len(cerca)}")
+        st.dataframe(para_mostrar(cerca)[["FECHA_UTC", "HORA_UTC", "LATITUD", "LONGITUD", "PROFUNDIDAD", "MAGNITUD", "DISTANCIA_KM"]])
 
     # Generar gráfico apilado por departamento y meses
     st.markdown("### Gráfico de Meses y Días por Departamento")
     if not filtered_gdf.empty:
-        fig, ax = plt.subplots(figsize=(10, 6))
-        pivot_data = filtered_gdf.pivot_table(
-            index='NOMBDEP',
-            columns='MES',
-            values='DIA',
-            aggfunc='count',
-            fill_value=0
-        )
-        pivot_data.plot(kind='bar', stacked=True, ax=ax, colormap='viridis')
-        ax.set_title('Distribución de Días por Departamento y Mes')
-        ax.set_xlabel('Departamento')
-        ax.set_ylabel('Cantidad de Días')
-        plt.xticks(rotation=45)
-        st.pyplot(fig)
+        def grafico_png():
+            fig, ax = plt.subplots(figsize=(10, 6))
+            pivot_data = filtered_gdf.pivot_table(
+                index='NOMBDEP',
+                columns='MES',
+                values='DIA',
+                aggfunc='count',
+                fill_value=0,
+                observed=True
+            )
+            # El catálogo guarda el mes como número; el nombre se pone recién al dibujar
+            pivot_data.columns = [nombres_meses[mes] for mes in pivot_data.columns]
+            pivot_data.plot(kind='bar', stacked=True, ax=ax, colormap='viridis')
+            ax.set_title('Distribución de Días por Departamento y Mes')
+            ax.set_xlabel('Departamento')
+            ax.set_ylabel('Cantidad de Días')
+            plt.xticks(rotation=45)
+            # Mismo formato que st.pyplot; la figura se cierra porque solo se guardan los bytes
+            imagen = io.BytesIO()
+            fig.savefig(imagen, format="png", dpi=200, bbox_inches="tight")
+            plt.close(fig)
+            return imagen.getvalue()
+
+        with etapa("mapa.grafico_meses"):
+            st.image(renderizado("mapa", "meses_departamento", clave_render, grafico_png), use_container_width=True)
     else:
         st.write("No hay datos que coincidan con los filtros seleccionados.")
 
 
+@medido("pagina.analisis")
+def analisis():
+    import plotly.graph_objects as go
+
+    from sismos.cubo import cargar_cubos
+    from sismos.gutenberg_richter import (
+        CORRECCION_MC, TODO_EL_CATALOGO, analisis_catalogo, curva_frecuencia_magnitud, histogramas_por_ventana,
+    )
+
+    st.title("Ley de Gutenberg–Richter")
+    st.markdown("""
+    Valor **b** por máxima verosimilitud (Aki–Utsu) y magnitud de completitud **Mc** por máxima curvatura,
+    por departamento y por ventanas de años. Las incertidumbres salen de remuestrear cada ventana (bootstrap).
+    """)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        ancho = st.number_input("Años por ventana:", min_value=1, max_value=64, value=10, step=1)
+    with col2:
+        paso = st.number_input("Avance entre ventanas (años):", min_value=1, max_value=64, value=5, step=1)
+    with col3:
+        correccion = st.number_input("Corrección de Mc:", min_value=0.0, max_value=1.0, value=CORRECCION_MC, step=0.1)
+
+    with etapa("analisis.gutenberg_richter"):
+        resultados = analisis_catalogo(int(ancho), int(paso), correccion, sin_replicas=sin_replicas())
+    grupos = [TODO_EL_CATALOGO] + sorted(set(resultados["NOMBDEP"]) - {TODO_EL_CATALOGO})
+    departamento = st.selectbox("Selecciona un departamento", options=grupos, index=0)
+    tabla = resultados[resultados["NOMBDEP"] == departamento].reset_index(drop=True)
+    filtros = {"ancho": int(ancho), "paso": int(paso), "correccion": correccion, "departamento": departamento}
+
+    def figura_b():
+        validas = tabla.dropna(subset=["B"])
+        centros = (validas["DESDE"] + validas["HASTA"]) / 2
+        fig = go.Figure(go.Scatter(x=centros, y=validas["B"], mode="lines+markers", name="b",
+                                   error_y=dict(type="data", array=validas["B_BOOT"], visible=True)))
+        fig.update_layout(xaxis_title="Año (centro de la ventana)", yaxis_title="Valor b")
+        return fig
+
+    if tabla["B"].notna().any():
+        mostrar_figura("analisis", "valor_b", filtros, figura_b)
+    else:
+        st.warning("Ninguna ventana tiene suficientes sismos sobre Mc para estimar b.")
+
+    ventanas = [f"{desde} - {hasta}" for desde, hasta in zip(tabla["DESDE"], tabla["HASTA"])]
+    ventana = st.selectbox("Ventana para la curva frecuencia–magnitud", options=ventanas, index=len(ventanas) - 1)
+    fila = tabla.iloc[ventanas.index(ventana)]
+
+    def figura_curva():
+        nombres, _, magnitudes, conteos = histogramas_por_ventana(cargar_cubos(sin_replicas())["magnitud"], int(ancho), int(paso))
+        curva = curva_frecuencia_magnitud(conteos[nombres.index(departamento), ventanas.index(ventana)], magnitudes)
+        curva = curva[curva["N_ACUMULADO"] > 0]
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=curva["MAGNITUD"], y=curva["N_ACUMULADO"], mode="markers", name="N(≥M)"))
+        fig.add_trace(go.Scatter(x=curva["MAGNITUD"], y=curva["N"].where(curva["N"] > 0), mode="markers",
+                                 marker_symbol="triangle-up", name="N por intervalo"))
+        if pd.notna(fila["B"]):
+            ajuste = curva[curva["MAGNITUD"] >= fila["MC"]]["MAGNITUD"]
+            fig.add_trace(go.Scatter(x=ajuste, y=10 ** (fila["A"] - fila["B"] * ajuste), mode="lines",
+                                     name=f"log N = {fila['A']:.2f} - {fila['B']:.2f} M"))
+        fig.add_vline(x=fila["MC"], line_dash="dash", annotation_text=f"Mc = {fila['MC']:.1f}")
+        fig.update_layout(xaxis_title="Magnitud", yaxis_title="Cantidad de sismos", yaxis_type="log")
+        return fig
+
+    mostrar_figura("analisis", "frecuencia_magnitud", dict(filtros, ventana=ventana), figura_curva)
+
+    st.dataframe(tabla.rename(columns={
+        "TOTAL": "Sismos", "N": "Sismos ≥ Mc", "MC": "Mc", "MC_BOOT": "σ Mc (bootstrap)",
+        "B": "b", "B_ERROR": "σ b (Shi–Bolt)", "B_BOOT": "σ b (bootstrap)", "A": "a",
+    }).drop(columns="NOMBDEP"))
+
+
+@medido("pagina.tasa_temporal")
+def tasa_temporal():
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    from sismos.gutenberg_richter import TODO_EL_CATALOGO
+    from sismos.tasas import FONDO_DIAS, UMBRAL_P, cargar_serie, detectar_anomalias
+
+    st.title("Tasa de sismos en el tiempo")
+    st.markdown("""
+    Sismos y energía liberada por ventanas móviles de días, por departamento. Una ventana se marca como
+    anómala (posible enjambre o secuencia) cuando su cantidad de sismos es muy improbable para un proceso
+    de Poisson con la tasa de fondo de los años anteriores.
+    """)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        ancho = st.number_input("Días por ventana:", min_value=1, max_value=3650, value=30, step=1)
+    with col2:
+        fondo = st.number_input("Años de fondo:", min_value=1, max_value=30, value=FONDO_DIAS // 365, step=1)
+    with col3:
+        umbral = st.select_slider("Probabilidad máxima (Poisson):", options=[1e-2, 1e-3, 1e-4, 1e-5, 1e-6],
+                                  value=UMBRAL_P)
+
+    with etapa("tasa.serie_diaria"):
+        serie = cargar_serie(sin_replicas())
+    grupos = [TODO_EL_CATALOGO] + sorted(set(serie.grupos) - {TODO_EL_CATALOGO})
+    departamento = st.selectbox("Selecciona un departamento", options=grupos, index=0)
+    with etapa("tasa.anomalias"):
+        ventanas, episodios = detectar_anomalias(serie, int(ancho), int(fondo) * 365, umbral)
+    tabla = episodios[episodios["NOMBDEP"] == departamento].drop(columns="NOMBDEP").reset_index(drop=True)
+    filtros = {"ancho": int(ancho), "fondo": int(fondo), "umbral": umbral, "departamento": departamento}
+
+    def figura_tasa():
+        _, energia = serie.ventana_movil(int(ancho), departamento)
+        dias = ventanas.index
+        tasa = ventanas["SISMOS"][departamento] / int(ancho)
+        anomalas = ventanas["ANOMALA"][departamento].to_numpy()
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.05)
+        fig.add_trace(go.Scattergl(x=dias, y=tasa, mode="lines", name="Sismos por día"), row=1, col=1)
+        fig.add_trace(go.Scattergl(x=dias, y=ventanas["ESPERADOS"][departamento] / int(ancho), mode="lines",
+                                   line_dash="dot", name="Tasa de fondo"), row=1, col=1)
+        fig.add_trace(go.Scattergl(x=dias[anomalas], y=tasa[anomalas], mode="markers", marker_color="red",
+                                   marker_size=4, name="Ventana anómala"), row=1, col=1)
+        fig.add_trace(go.Scattergl(x=dias, y=energia[:, 0], mode="lines", name="Energía (J)"), row=2, col=1)
+        fig.update_yaxes(title_text=f"Sismos por día ({int(ancho)} días)", row=1, col=1)
+        fig.update_yaxes(title_text="Energía en la ventana (J)", type="log", row=2, col=1)
+        fig.update_xaxes(title_text="Fecha (fin de la ventana)", row=2, col=1)
+        return fig
+
+    mostrar_figura("tasa", "ventana_movil", filtros, figura_tasa)
+
+    st.markdown(f"### Episodios detectados: {len(tabla)}")
+    if tabla.empty:
+        st.write("Ninguna ventana supera la tasa de fondo con esos parámetros.")
+    else:
+        st.dataframe(tabla.rename(columns={
+            "DESDE": "Desde", "HASTA": "Hasta", "DIAS": "Días", "SISMOS": "Sismos",
+            "ENERGIA_J": "Energía (J)", "Z_MAX": "Z máximo", "P_MIN": "P mínima",
+        }))
+    st.caption("Episodios por departamento")
+    st.dataframe(episodios["NOMBDEP"].value_counts().rename("Episodios").rename_axis("Departamento"))
+
+
+@medido("pagina.conclusion")
 def conclusion():
     st.title("Catálogo Sísmico 1960 - 2023")
     # Conclusión  al tema
@@ -392,6 +643,7 @@ def conclusion():
     st.info("🙌La naturaleza puede ser poderosa, pero la valentía y la solidaridad de las personas son indestructibles.🥰")
 
 
+@medido("pagina.sobre_nosotros")
 def foto():
     personas = [
         {"nombre": "", "info": "", "imagen": "img/noemi.png"},
@@ -430,7 +682,52 @@ def foto():
         st.write(personas[3]["info"])
 
 
+def mostrar_diagnostico():
+    from sismos.diagnostico import PROCESO, a_json, a_prometheus
+    from sismos.render import estadisticas
+
+    registros = {"sesion": st.session_state["registro_diagnostico"], "proceso": PROCESO}
+    cache = estadisticas()
+    with st.sidebar:
+        st.markdown("### Diagnóstico")
+        for alcance, titulo in [("sesion", "Esta sesión"), ("proceso", "Todas las sesiones")]:
+            st.caption(titulo)
+            tabla = pd.DataFrame.from_dict(registros[alcance].resumen(), orient="index")
+            if tabla.empty:
+                st.write("Sin mediciones todavía.")
+            else:
+                st.dataframe(tabla.rename(columns={
+                    "llamadas": "Llamadas", "segundos": "Total (s)", "ultimo": "Última (s)",
+                    "maximo": "Máxima (s)", "bytes_pico": "Memoria pico (B)",
+                }))
+        st.caption(f"Caché de renders: {cache['entradas']} entradas, {cache['bytes'] / 2**20:.1f} MB, "
+                   f"{cache['aciertos']} aciertos, {cache['fallos']} fallos")
+        extra = {f"sismos_cache_render_{clave}": valor for clave, valor in cache.items()}
+        st.download_button("Exportar JSON", a_json(registros), file_name="diagnostico.json", mime="application/json")
+        st.download_button("Exportar Prometheus", a_prometheus(registros, extra), file_name="diagnostico.prom",
+                           mime="text/plain")
+        if st.button("Reiniciar mediciones de la sesión"):
+            registros["sesion"].limpiar()
+
+
 # MENÚ - ENCABEZADO
+# Interruptor común a todas las páginas: catálogo completo o sin réplicas (ver sismos/desagrupamiento.py)
+with st.sidebar:
+    st.toggle("Quitar réplicas (Gardner–Knopoff)", key="sin_replicas",
+              help="Cuenta solo los sismos principales: se descartan los que caen en la ventana de "
+                   "distancia y tiempo de un sismo de mayor magnitud.")
+    # Diagnóstico de rendimiento (ver sismos/diagnostico.py): sin activarlo, las etapas no miden nada
+    if st.toggle("Diagnóstico de rendimiento", key="diagnostico"):
+        activar(st.session_state.setdefault("registro_diagnostico", Registro()),
+                memoria=st.checkbox("Medir memoria (tracemalloc, más lento)", key="diagnostico_memoria"))
+    else:
+        # La sesión deja de pedir memoria; tracemalloc se apaga si ninguna otra la pide
+        desactivar(st.session_state.get("registro_diagnostico"))
+    # Precálculo compartido por todas las sesiones: se lanza una vez por versión de los datos
+    precalculo.iniciar()
+    if not precalculo.listo():
+        st.caption(f"⏳ Preparando datos en segundo plano: {precalculo.estado()['etapa']}...")
+
 with st.container():
     col1, col2 = st.columns([1, 5])
     with col1:
@@ -439,7 +736,7 @@ with st.container():
         # Crear el menú de navegación principal
         selected = option_menu(
             menu_title=None,  # Oculta el título del menú
-            options=["Inicio", "Gráficos", "Mapa","Conclusión","Sobre nosotros"],  # Cambié a "Gráficos" como una opción principal
+            options=["Inicio", "Gráficos", "Mapa", "Análisis", "Conclusión","Sobre nosotros"],  # Cambié a "Gráficos" como una opción principal
             icons=["house", "filter", "bar-chart-line"],  # Íconos para cada opción
             menu_icon="cast",  # Ícono del menú
             default_index=0,  # Página predeterminada
@@ -532,7 +829,36 @@ elif selected == "Inicio":
     home_page()
 elif selected == "Mapa":
     mapa()  
+elif selected == "Análisis":
+    selected_analisis = option_menu(
+        menu_title="Análisis",
+        options=["Gutenberg–Richter", "Tasa temporal"],
+        icons=["graph-down", "activity"],
+        menu_icon="cast",
+        default_index=0,
+        orientation="horizontal",
+        styles={
+            "container": {"padding": "0!important", "background-color": "#333"},
+            "icon": {"color": "orange", "font-size": "14px"},
+            "nav-link": {
+                "font-size": "14px",
+                "text-align": "center",
+                "margin": "0px",
+                "padding": "10px",
+                "--hover-color": "#444",
+            },
+            "nav-link-selected": {"background-color": "#1199EE"},
+        },
+    )
+    if selected_analisis == "Gutenberg–Richter":
+        analisis()
+    elif selected_analisis == "Tasa temporal":
+        tasa_temporal()
 elif selected == "Conclusión":
     conclusion()
 elif selected == "Sobre nosotros":
     foto()
+
+# Panel de diagnóstico al final, cuando ya se midieron las etapas de la página
+if st.session_state.get("diagnostico"):
+    mostrar_diagnostico()
@@ -0,0 +1 @@
+"""Motor de datos del catálogo sísmico (carga, caché y consultas)."""
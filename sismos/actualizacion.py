@@ -0,0 +1,50 @@
+"""Agregado de sismos nuevos al final del catálogo.
+
+Las filas de un CSV con las mismas columnas que el catálogo se escriben al
+final de ``Dataset_1960_2023_sismo.csv`` sin tocar las existentes. Como el
+archivo anterior queda como prefijo del nuevo, los cargadores detectan la
+extensión y procesan solo las filas agregadas (catálogo, índices, archivo
+enriquecido y cubos). Uso::
+
+    python -m sismos.actualizacion nuevos.csv
+"""
+import csv
+import os
+import sys
+
+import pandas as pd
+
+from sismos.catalogo import RUTA_CSV
+
+
+def agregar_delta(ruta_delta, ruta_csv=RUTA_CSV):
+    """Agrega al CSV las filas de ``ruta_delta`` con ``ID`` mayor al último.
+
+    Devuelve la cantidad de filas agregadas. Los valores se copian como
+    texto, con el mismo entrecomillado que el archivo original.
+    """
+    columnas = list(pd.read_csv(ruta_csv, nrows=0).columns)
+    ultimo_id = pd.read_csv(ruta_csv, usecols=["ID"])["ID"].max()
+    nuevas = pd.read_csv(ruta_delta, dtype=str)[columnas]
+    nuevas = nuevas[nuevas["ID"].astype("int64") > ultimo_id]
+    if nuevas.empty:
+        return 0
+
+    with open(ruta_csv, "rb+") as archivo:
+        archivo.seek(0, os.SEEK_END)
+        if archivo.tell() > 0:
+            archivo.seek(-1, os.SEEK_END)
+            if archivo.read(1) != b"\n":
+                archivo.write(b"\n")
+    with open(ruta_csv, "a", encoding="utf-8", newline="") as archivo:
+        nuevas.to_csv(archivo, header=False, index=False, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    return len(nuevas)
+
+
+if __name__ == "__main__":
+    from sismos.catalogo import cargar_catalogo
+    from sismos.enriquecido import construir_enriquecido
+
+    print(f"{agregar_delta(sys.argv[1]):,} sismos agregados")
+    cargar_catalogo()
+    print(construir_enriquecido())
@@ -0,0 +1,189 @@
+"""Capas de mapa construidas a partir de columnas, sin recorrer filas.
+
+En lugar de un ``folium.CircleMarker`` por sismo (un objeto DOM y un popup
+HTML por fila), los sismos filtrados se envían como una sola capa:
+
+* ``capa_sismos_folium``: una única capa GeoJSON dibujada sobre canvas, con
+  un popup que arma su contenido al hacer clic. Recibe también el texto ya
+  serializado (``texto_sismos``), que se inserta tal cual en el HTML, así que
+  una capa guardada en la caché de renders no se vuelve a serializar.
+* ``capa_sismos_pydeck``: un ``ScatterplotLayer`` de deck.gl (WebGL), para
+  selecciones demasiado grandes para Leaflet. Solo lleva la posición y la
+  magnitud de cada sismo; el resto de los datos se muestra en el servidor
+  cuando se selecciona un punto. Como con Leaflet, el mapa se puede
+  serializar una vez (``texto_pydeck``) y guardar en la caché de renders.
+  Desde ``LIMITE_PUNTOS_PYDECK`` puntos ni eso es fluido y el mapa pasa a la
+  densidad por hexágonos.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from sismos.catalogo import MESES
+
+
+# A partir de aquí Leaflet deja de ser fluido y conviene deck.gl
+LIMITE_MARCADORES_FOLIUM = 50_000
+# A partir de aquí el JSON de deck.gl pasa de unos 10 MB y se muestra la densidad
+LIMITE_PUNTOS_PYDECK = 250_000
+# Nombre de la capa de sismos de deck.gl, con el que se leen los puntos seleccionados
+CAPA_PYDECK = "sismos"
+
+CAMPOS_POPUP = ["NOMBDEP", "AÑO", "MES", "DIA", "MAGNITUD", "PROFUNDIDAD"]
+ETIQUETAS_POPUP = ["Departamento", "Año", "Mes", "Día", "Magnitud", "Profundidad (km)"]
+
+
+def _columnas_popup(datos):
+    """Columnas del popup como listas de Python listas para serializar."""
+    columnas = []
+    for campo in CAMPOS_POPUP:
+        valores = datos[campo].to_numpy()
+        if campo == "MES":
+            # El catálogo guarda el número de mes; el popup muestra el nombre
+            valores = np.asarray(MESES, dtype=object)[valores.astype("int64") - 1]
+        elif valores.dtype.kind == "f":
+            # Las medidas son float32: se redondean para no mostrar 4.300000190734863
+            valores = np.round(valores.astype("float64"), 1)
+        columnas.append(valores.tolist())
+    return columnas
+
+
+def geojson_sismos(datos):
+    """FeatureCollection de puntos armada desde columnas (sin ``iterrows``)."""
+    lon = np.round(datos["LONGITUD"].to_numpy().astype("float64"), 4).tolist()
+    lat = np.round(datos["LATITUD"].to_numpy().astype("float64"), 4).tolist()
+    propiedades = [dict(zip(CAMPOS_POPUP, fila)) for fila in zip(*_columnas_popup(datos))]
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [x, y]}, "properties": p}
+            for x, y, p in zip(lon, lat, propiedades)
+        ],
+    }
+
+
+def texto_sismos(datos):
+    """``geojson_sismos`` serializado, listo para insertar en un ``<script>``."""
+    texto = json.dumps(geojson_sismos(datos), ensure_ascii=False, separators=(",", ":"))
+    # "</" cerraría el <script>; dentro de un texto JSON equivale a "<\/"
+    return texto.replace("</", "<\\/")
+
+
+def capa_sismos_folium(datos):
+    """Una sola capa de círculos; requiere ``folium.Map(prefer_canvas=True)``.
+
+    ``datos`` es el DataFrame de sismos o su texto de :func:`texto_sismos`.
+    """
+    from branca.element import MacroElement
+    from jinja2 import Template
+
+    class CapaSismos(MacroElement):
+        _template = Template("""
+            {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.geoJson({{ this.datos }}, {
+                pointToLayer: function(feature, latlng) {
+                    return L.circleMarker(latlng, {radius: 5, color: "red", fill: true, fillColor: "red", fillOpacity: 0.7});
+                },
+                onEachFeature: function(feature, layer) {
+                    layer.bindPopup(function() {
+                        var campos = {{ this.campos }}, etiquetas = {{ this.etiquetas }}, filas = "";
+                        for (var i = 0; i < campos.length; i++) {
+                            filas += "<tr><th>" + etiquetas[i] + "</th><td>" + feature.properties[campos[i]] + "</td></tr>";
+                        }
+                        return "<table>" + filas + "</table>";
+                    });
+                }
+            }).addTo({{ this._parent.get_name() }});
+            {% endmacro %}
+        """)
+
+        def __init__(self, texto):
+            super().__init__()
+            self._name = "SISMOS"
+            self.datos = texto
+            self.campos = json.dumps(CAMPOS_POPUP)
+            self.etiquetas = json.dumps(ETIQUETAS_POPUP, ensure_ascii=False)
+
+    return CapaSismos(datos if isinstance(datos, str) else texto_sismos(datos))
+
+
+def _compactos(datos):
+    """Columnas cortas de la capa deck.gl: posición (``x``, ``y``) y magnitud (``m``)."""
+    return {
+        "x": np.round(datos["LONGITUD"].to_numpy().astype("float64"), 3).tolist(),
+        "y": np.round(datos["LATITUD"].to_numpy().astype("float64"), 3).tolist(),
+        "m": np.round(datos["MAGNITUD"].to_numpy().astype("float64"), 1).tolist(),
+    }
+
+
+def capa_sismos_pydeck(datos):
+    """``ScatterplotLayer`` de deck.gl con la posición y la magnitud de los sismos.
+
+    La fila ``i`` de la capa es la fila ``i`` de ``datos``.
+    """
+    import pydeck as pdk
+
+    return pdk.Layer(
+        "ScatterplotLayer",
+        id=CAPA_PYDECK,
+        data=pd.DataFrame(_compactos(datos)),
+        get_position=["x", "y"],
+        get_fill_color=[255, 0, 0, 180],
+        get_radius=4,
+        radius_units="pixels",
+        pickable=True,
+    )
+
+
+TOOLTIP_PYDECK = {"html": "Magnitud: {m}<br>Clic para ver el detalle"}
+
+
+def mapa_pydeck(datos, departamentos=None):
+    """Mapa deck.gl con los límites de los departamentos y los sismos.
+
+    ``departamentos`` es una FeatureCollection (dict) o cualquier objeto con
+    ``__geo_interface__``, como un GeoDataFrame. ``datos`` es el DataFrame de
+    sismos o el texto de :func:`texto_pydeck`; en ese caso el mapa ya está
+    completo y no se vuelve a serializar.
+    """
+    import pydeck as pdk
+
+    if isinstance(datos, str):
+        class MapaSerializado(pdk.Deck):
+            def to_json(self):
+                return datos
+
+        return MapaSerializado(tooltip=TOOLTIP_PYDECK, map_style=None)
+
+    limites = pdk.Layer(
+        "GeoJsonLayer",
+        id="departamentos",
+        data=getattr(departamentos, "__geo_interface__", departamentos),
+        stroked=True,
+        filled=True,
+        get_fill_color=[20, 199, 193, 60],
+        get_line_color=[0, 0, 0],
+        line_width_min_pixels=1,
+    )
+    return pdk.Deck(
+        layers=[limites, capa_sismos_pydeck(datos)],
+        initial_view_state=pdk.ViewState(latitude=-9.19, longitude=-73.015, zoom=4.5),
+        tooltip=TOOLTIP_PYDECK,
+        map_style=None,
+    )
+
+
+def texto_pydeck(datos, departamentos):
+    """JSON del mapa de :func:`mapa_pydeck`, sin espacios.
+
+    pydeck serializa con sangría, lo que obliga a ``json`` a usar su
+    codificador en Python, puntos por punto; aquí se serializa el mapa sin
+    sismos y los puntos se agregan con el codificador en C.
+    """
+    mapa = json.loads(mapa_pydeck(datos.iloc[:0], departamentos).to_json())
+    columnas = _compactos(datos)
+    for capa in mapa["layers"]:
+        if capa.get("id") == CAPA_PYDECK:
+            capa["data"] = [{"x": x, "y": y, "m": m} for x, y, m in zip(columnas["x"], columnas["y"], columnas["m"])]
+    return json.dumps(mapa, ensure_ascii=False, separators=(",", ":"))
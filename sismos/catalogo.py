@@ -0,0 +1,264 @@
+"""Carga del catálogo sísmico compartida por todas las páginas.
+
+Streamlit vuelve a ejecutar ``main.py`` en cada interacción, por lo que el CSV
+se lee y se parsea una sola vez por proceso y se guarda en una caché indexada
+por la fecha de modificación y el tamaño del archivo. Si el archivo cambia en
+disco, la siguiente llamada reconstruye el catálogo automáticamente; si solo
+se le agregaron filas al final, se parsean únicamente esas filas. El CSV se
+lee por lotes (ver :mod:`sismos.ingesta`), así que las filas crudas nunca
+están todas en memoria a la vez.
+
+En el mismo recorrido se calcula el código de departamento de cada sismo
+con las coordenadas originales en float64, antes de pasarlas a float32. Ese
+arreglo se guarda junto al catálogo (ver :func:`cargar_codigos`) en lugar de
+en una segunda copia del DataFrame.
+
+El catálogo en memoria usa tipos compactos: el instante del sismo es
+``TIEMPO`` (segundos desde 1970, UTC, int64), ``AÑO``/``MES``/``DIA`` son
+enteros chicos, las medidas son float32 y los departamentos son
+categóricos. Las etiquetas para el usuario (fecha y hora como texto, nombre
+del mes) se generan solo al mostrar los datos, con :func:`para_mostrar`.
+"""
+import hashlib
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+DIRECTORIO_BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_CSV = os.path.join(DIRECTORIO_BASE, "Dataset_1960_2023_sismo.csv")
+RUTA_DEPARTAMENTOS = os.path.join(DIRECTORIO_BASE, "departamentos_perú.geojson")
+
+MESES = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio",
+         "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+
+# Fecha y hora se leen como texto para no perder los ceros a la izquierda
+TIPOS_CSV = {"FECHA_UTC": str, "HORA_UTC": str}
+
+# Tipos de las columnas numéricas del catálogo ya procesado
+TIPOS_MEDIDAS = {
+    "LATITUD": "float32",
+    "LONGITUD": "float32",
+    "PROFUNDIDAD": "float32",
+    "MAGNITUD": "float32",
+}
+TIPOS_FECHA = {
+    "AÑO": "int16",
+    "MES": "int8",
+    "DIA": "int8",
+}
+
+_cache = {}
+_huellas = {}
+_lock = threading.Lock()
+
+
+def version_archivo(ruta):
+    """Devuelve la clave de versión ``(mtime_ns, tamaño)`` de un archivo."""
+    info = os.stat(ruta)
+    return (info.st_mtime_ns, info.st_size)
+
+
+def huella_prefijo(ruta, tamano):
+    """SHA-256 de los primeros ``tamano`` bytes de un archivo."""
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as archivo:
+        restante = tamano
+        while restante > 0:
+            bloque = archivo.read(min(restante, 1 << 20))
+            if not bloque:
+                break
+            sha.update(bloque)
+            restante -= len(bloque)
+    return sha.hexdigest()
+
+
+def huella_archivo(ruta):
+    """SHA-256 del contenido de un archivo, memorizado por ``(mtime, tamaño)``."""
+    ruta = os.path.abspath(ruta)
+    version = version_archivo(ruta)
+    entrada = _huellas.get(ruta)
+    if entrada is None or entrada[0] != version:
+        entrada = (version, huella_prefijo(ruta, version[1]))
+        _huellas[ruta] = entrada
+    return entrada[1]
+
+
+def es_extension(ruta, tamano_previo, huella_previa):
+    """Indica si el archivo actual es el anterior con filas agregadas al final."""
+    return os.path.getsize(ruta) > tamano_previo and huella_prefijo(ruta, tamano_previo) == huella_previa
+
+
+def leer_agregadas(ruta, desde_byte, ultimo_id):
+    """Filas crudas escritas a partir de ``desde_byte`` con ``ID`` mayor a ``ultimo_id``."""
+    with open(ruta, "rb") as archivo:
+        encabezado = archivo.readline()
+        archivo.seek(desde_byte)
+        cola = archivo.read()
+    crudo = pd.read_csv(io.BytesIO(encabezado + cola), dtype=TIPOS_CSV)
+    return crudo[crudo["ID"] > ultimo_id].reset_index(drop=True)
+
+
+def parsear_catalogo(df):
+    """Convierte las columnas crudas del CSV a sus tipos definitivos.
+
+    Se descartan las filas cuya fecha no se pueda interpretar, ya que no
+    pueden ubicarse en ningún año ni mes; una hora ilegible cuenta como
+    medianoche. ``FECHA_UTC`` y ``HORA_UTC`` se reemplazan por ``TIEMPO``. Las
+    columnas que no forman parte del CSV original (por ejemplo ``NOMBDEP``)
+    se copian sin cambios.
+    """
+    fecha = pd.to_datetime(df["FECHA_UTC"], format="%Y%m%d", errors="coerce")
+    hora = pd.to_datetime(df["HORA_UTC"].str.zfill(6), format="%H%M%S", errors="coerce")
+    validas = fecha.notna().to_numpy()
+    fecha, hora = fecha[validas], hora[validas]
+    segundos = (hora - hora.dt.normalize()).dt.total_seconds().fillna(0).to_numpy().astype("int64")
+
+    datos = pd.DataFrame({
+        "ID": df["ID"].to_numpy()[validas],
+        "TIEMPO": fecha.to_numpy().astype("datetime64[s]").astype("int64") + segundos,
+    })
+    for columna, tipo in TIPOS_MEDIDAS.items():
+        datos[columna] = df[columna].to_numpy()[validas].astype(tipo)
+    datos["AÑO"] = fecha.dt.year.to_numpy().astype(TIPOS_FECHA["AÑO"])
+    datos["MES"] = fecha.dt.month.to_numpy().astype(TIPOS_FECHA["MES"])
+    datos["DIA"] = fecha.dt.day.to_numpy().astype(TIPOS_FECHA["DIA"])
+    for columna in df.columns:
+        if columna not in datos.columns and columna not in TIPOS_CSV:
+            # .array conserva el tipo de las columnas categóricas
+            datos[columna] = df[columna].array[validas]
+    return datos
+
+
+def para_mostrar(datos):
+    """Copia de ``datos`` con etiquetas legibles, para tablas y popups.
+
+    ``TIEMPO`` se muestra como ``FECHA_UTC`` y ``HORA_UTC`` (texto), ``MES``
+    como nombre y las columnas categóricas como texto.
+    """
+    tiempo = pd.to_datetime(datos["TIEMPO"].to_numpy(), unit="s")
+    mostrados = pd.DataFrame({
+        "FECHA_UTC": tiempo.strftime("%Y-%m-%d"),
+        "HORA_UTC": tiempo.strftime("%H:%M:%S"),
+    }, index=datos.index)
+    for columna in datos.columns:
+        if columna == "TIEMPO":
+            continue
+        valores = datos[columna]
+        if columna == "MES":
+            valores = valores.map(dict(enumerate(MESES, start=1)))
+        elif isinstance(valores.dtype, pd.CategoricalDtype):
+            valores = valores.astype(str)
+        mostrados[columna] = valores
+    return mostrados
+
+
+def leer_crudo(ruta=RUTA_CSV):
+    """Lee el CSV tal cual, con las coordenadas en float64."""
+    return pd.read_csv(ruta, dtype=TIPOS_CSV)
+
+
+def leer_catalogo(ruta=RUTA_CSV):
+    """Lee y parsea el CSV sin pasar por la caché."""
+    return parsear_catalogo(leer_crudo(ruta))
+
+
+def _parsear_con_codigos(crudo, asignador):
+    """``(catálogo, códigos de departamento)`` de unas filas crudas.
+
+    Los códigos se calculan con las coordenadas crudas en float64 y quedan
+    alineados con las filas que conserva :func:`parsear_catalogo`.
+    """
+    crudo["CODDEP"] = asignador.asignar(crudo["LONGITUD"].to_numpy(), crudo["LATITUD"].to_numpy())
+    datos = parsear_catalogo(crudo)
+    return datos, datos.pop("CODDEP").to_numpy()
+
+
+def _leer_con_codigos(ruta, asignador):
+    """Como :func:`_parsear_con_codigos` para todo el CSV, leído por lotes."""
+    from sismos.ingesta import leer_por_lotes
+
+    partes = [_parsear_con_codigos(lote, asignador) for lote, _ in leer_por_lotes(ruta)]
+    if not partes:
+        return _parsear_con_codigos(leer_crudo(ruta), asignador)
+    datos = pd.concat([datos for datos, _ in partes], ignore_index=True)
+    return datos, np.concatenate([codigos for _, codigos in partes])
+
+
+def _cargar(ruta, ruta_geojson=None):
+    """Entrada de la caché del CSV; la construye o la extiende si el archivo cambió.
+
+    Con ``ruta_geojson`` los códigos de la entrada deben corresponder a esos
+    departamentos; sin él sirve cualquier entrada vigente del CSV, y una
+    nueva se construye con los departamentos por defecto.
+    """
+    from sismos.departamentos import AsignadorDepartamentos
+    from sismos.indice import extender_indices
+
+    ruta = os.path.abspath(ruta)
+    version = version_archivo(ruta)
+    # El candado evita que dos sesiones simultáneas parseen el mismo archivo
+    with _lock:
+        entrada = _cache.get(ruta)
+        huella_geojson = huella_archivo(ruta_geojson) if ruta_geojson is not None else None
+        if entrada is not None and huella_geojson not in (None, entrada["huella_geojson"]):
+            entrada = None
+        if entrada is not None and entrada["version"] == version:
+            return entrada
+        if ruta_geojson is None:
+            ruta_geojson = entrada["ruta_geojson"] if entrada is not None else RUTA_DEPARTAMENTOS
+            huella_geojson = huella_archivo(ruta_geojson)
+        asignador = AsignadorDepartamentos.desde_geojson(ruta_geojson)
+        huella = huella_archivo(ruta)
+        base = None
+        if (entrada is not None and entrada["huella_geojson"] == huella_geojson
+                and es_extension(ruta, entrada["bytes"], entrada["huella"])):
+            # Solo se agregaron filas: se parsean las nuevas y se extienden los índices
+            previos = entrada["datos"]
+            ultimo_id = int(previos["ID"].max()) if len(previos) else -1
+            nuevos, codigos = _parsear_con_codigos(leer_agregadas(ruta, entrada["bytes"], ultimo_id), asignador)
+            datos = pd.concat([previos, nuevos], ignore_index=True)
+            codigos = np.concatenate([entrada["codigos"], codigos])
+            extender_indices(previos, datos)
+            base = (entrada["huella"], len(previos))
+        else:
+            datos, codigos = _leer_con_codigos(ruta, asignador)
+        entrada = {
+            "version": version,
+            "bytes": version[1],
+            "huella": huella,
+            "datos": datos,
+            "ruta_geojson": ruta_geojson,
+            "huella_geojson": huella_geojson,
+            "codigos": codigos,
+            "nombres": list(asignador.nombres),
+            "base": base,
+        }
+        _cache[ruta] = entrada
+        return entrada
+
+
+def cargar_catalogo(ruta=RUTA_CSV):
+    """Devuelve el catálogo tipado, leyéndolo solo si el archivo cambió.
+
+    El DataFrame devuelto se comparte entre sesiones: las páginas deben
+    filtrarlo o copiarlo, nunca modificarlo en el sitio.
+    """
+    return _cargar(ruta)["datos"]
+
+
+def cargar_codigos(ruta=RUTA_CSV, ruta_geojson=RUTA_DEPARTAMENTOS):
+    """Catálogo de :func:`cargar_catalogo` con el departamento de cada sismo.
+
+    Devuelve ``(catálogo, códigos, nombres, huella del CSV, base)``. Los
+    códigos son posiciones en ``nombres`` (-1 fuera de Perú); en un límite
+    compartido se queda el primer departamento (ver
+    :meth:`~sismos.departamentos.AsignadorDepartamentos.asignar`). ``base``
+    es ``(huella anterior, filas anteriores)`` si el catálogo se obtuvo
+    agregando filas al de la versión anterior, o ``None``.
+    """
+    entrada = _cargar(ruta, ruta_geojson)
+    return entrada["datos"], entrada["codigos"], entrada["nombres"], entrada["huella"], entrada["base"]
@@ -0,0 +1,80 @@
+"""Búsqueda de sismos por distancia a un punto.
+
+Un ``BallTree`` de scikit-learn con métrica haversine sobre ``LATITUD`` y
+``LONGITUD`` (en radianes) responde tanto "todo lo que ocurrió a menos de
+X km" como "los k sismos más cercanos" sin recorrer el catálogo; las
+distancias son de círculo máximo, en km. El árbol se construye una vez por
+objeto DataFrame, igual que los índices de rangos (ver
+:mod:`sismos.indice`), así que se comparte entre reruns y sesiones.
+"""
+import threading
+
+import numpy as np
+
+from sismos.desagrupamiento import RADIO_TIERRA_KM
+
+
+class IndiceEspacial:
+    """``BallTree`` haversine sobre las coordenadas de un catálogo."""
+
+    def __init__(self, latitudes, longitudes):
+        from sklearn.neighbors import BallTree
+
+        coordenadas = np.radians(np.column_stack([latitudes, longitudes]).astype("float64"))
+        self.filas = len(coordenadas)
+        self.arbol = BallTree(coordenadas, metric="haversine")
+
+    @staticmethod
+    def _punto(latitud, longitud):
+        return np.radians([[float(latitud), float(longitud)]])
+
+    def en_radio(self, latitud, longitud, radio_km):
+        """Posiciones y distancias (km) de los puntos a ``radio_km`` o menos, de cerca a lejos."""
+        posiciones, distancias = self.arbol.query_radius(
+            self._punto(latitud, longitud), r=radio_km / RADIO_TIERRA_KM, return_distance=True, sort_results=True)
+        return posiciones[0], distancias[0] * RADIO_TIERRA_KM
+
+    def mas_cercanos(self, latitud, longitud, k):
+        """Posiciones y distancias (km) de los ``k`` puntos más cercanos, de cerca a lejos."""
+        k = min(int(k), self.filas)
+        if k <= 0:
+            return np.empty(0, dtype="int64"), np.empty(0)
+        distancias, posiciones = self.arbol.query(self._punto(latitud, longitud), k=k)
+        return posiciones[0], distancias[0] * RADIO_TIERRA_KM
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def indice_espacial(datos):
+    """Índice espacial de ``datos``, construido una sola vez por objeto DataFrame."""
+    with _lock:
+        entrada = _cache.get(id(datos))
+        if entrada is None or entrada[0] is not datos:
+            entrada = (datos, IndiceEspacial(datos["LATITUD"].to_numpy(), datos["LONGITUD"].to_numpy()))
+            if len(_cache) >= 8:
+                _cache.pop(next(iter(_cache)))
+            _cache[id(datos)] = entrada
+        return entrada[1]
+
+
+def cercanos(datos, latitud, longitud, radio_km=None, k=None):
+    """Filas de ``datos`` cerca del punto, ordenadas por distancia.
+
+    Con ``radio_km`` se devuelven las que están a esa distancia o menos; con
+    ``k``, las ``k`` más cercanas; con ambos, las ``k`` más cercanas dentro
+    del radio. Se agrega la columna ``DISTANCIA_KM``.
+    """
+    if radio_km is None and k is None:
+        raise ValueError("Se necesita radio_km, k o ambos.")
+    indice = indice_espacial(datos)
+    if radio_km is not None:
+        posiciones, distancias = indice.en_radio(latitud, longitud, radio_km)
+        if k is not None:
+            posiciones, distancias = posiciones[:k], distancias[:k]
+    else:
+        posiciones, distancias = indice.mas_cercanos(latitud, longitud, k)
+    resultado = datos.take(posiciones)
+    resultado.insert(len(resultado.columns), "DISTANCIA_KM", distancias.astype("float32"))
+    return resultado
@@ -0,0 +1,129 @@
+"""Consultas al catálogo sin dependencias de la interfaz.
+
+Reúne el catálogo, los índices de rangos y los cubos de conteos en unas
+pocas funciones que sirven igual para la app, para scripts y para trabajos
+por lotes::
+
+    from sismos.consultas import contar_por, sismos_en
+    contar_por("AÑO", {"MAGNITUD": (6.0, None)})
+    sismos_en({"AÑO": (2007, 2007), "MES": [8]})
+    sismos_cerca(-12.05, -77.04, radio_km=100)
+
+Los filtros son ``{columna: filtro}``, con ``(mínimo, máximo)`` (extremos
+incluidos, ``None`` para no acotar) o una lista de valores admitidos. Este
+módulo solo importa pandas y NumPy; shapely, geopandas y pyarrow se cargan
+la primera vez que una consulta necesita los departamentos.
+
+Con ``sin_replicas=True`` las consultas usan el catálogo desagrupado, sin
+las réplicas que marca :mod:`sismos.desagrupamiento`.
+"""
+import numpy as np
+import pandas as pd
+
+from sismos.catalogo import cargar_catalogo
+from sismos.indice import indice_para
+
+
+COLUMNAS = ["AÑO", "MES", "MAGNITUD", "PROFUNDIDAD"]
+COLUMNAS_PERU = ["NOMBDEP"] + COLUMNAS
+
+
+def _validar(filtros, columnas, eje=None):
+    """``ValueError`` si el eje o algún filtro no es una de ``columnas``."""
+    desconocidas = [columna for columna in ([eje] if eje is not None else []) + list(filtros)
+                    if columna not in columnas]
+    if desconocidas:
+        raise ValueError(f"Columnas no admitidas: {', '.join(map(str, desconocidas))}. "
+                         f"Se puede usar: {', '.join(columnas)}.")
+
+
+def contar_por(eje, filtros=None, sin_replicas=False):
+    """Cantidad de sismos por intervalo de ``eje`` que cumplen los filtros.
+
+    ``eje`` es ``AÑO``, ``MES``, ``MAGNITUD`` (pasos de 0.1), ``PROFUNDIDAD``
+    (pasos de 1 km) o ``NOMBDEP``. Se cuenta sobre el catálogo completo; los
+    sismos fuera de Perú tienen el departamento ``FUERA DE PERÚ``. Se
+    responde con un cubo si alguno tiene el eje y todas las columnas
+    filtradas; si no, se filtra con el índice y se cuenta con los mismos
+    intervalos. Devuelve una Serie sin los intervalos vacíos.
+
+    Los filtros admiten las mismas columnas que ``eje``; con otra columna
+    se lanza ``ValueError``.
+    """
+    from sismos.cubo import cargar_cubos
+
+    filtros = filtros or {}
+    _validar(filtros, COLUMNAS_PERU, eje)
+    cubos = cargar_cubos(sin_replicas)
+    for cubo in cubos.values():
+        if {eje, *filtros} <= set(cubo.posicion):
+            return cubo.histograma(eje, filtros)
+
+    from sismos.cubo import FUERA_DE_PERU
+    from sismos.enriquecido import catalogo_con_departamento
+
+    catalogo, nombres, _, _ = catalogo_con_departamento()
+    if sin_replicas:
+        from sismos.desagrupamiento import quitar_replicas
+
+        catalogo = quitar_replicas(catalogo)
+    filtros = dict(filtros)
+    if "NOMBDEP" in filtros:
+        codigos = {nombre: codigo for codigo, nombre in enumerate(nombres)}
+        codigos[FUERA_DE_PERU] = -1
+        filtros["CODDEP"] = [codigos[nombre] for nombre in filtros.pop("NOMBDEP") if nombre in codigos]
+    seleccion = indice_para(catalogo, ["CODDEP"] + COLUMNAS).filtrar(catalogo, filtros)
+
+    intervalos = next(cubo.ejes[cubo.posicion[eje]] for cubo in cubos.values() if eje in cubo.posicion)
+    if eje == "NOMBDEP":
+        valores = np.where(seleccion["CODDEP"] < 0, len(nombres), seleccion["CODDEP"])
+    else:
+        valores = seleccion[eje].to_numpy()
+    valores = valores[intervalos.con_valor(valores)]
+    conteos = np.bincount(intervalos.indices(valores), minlength=len(intervalos))
+    serie = pd.Series(conteos, index=pd.Index(intervalos.etiquetas, name=eje), name="count")
+    return serie[serie > 0]
+
+
+def sismos_en(filtros=None, sin_replicas=False):
+    """Sismos del catálogo completo que cumplen filtros sobre ``COLUMNAS``."""
+    _validar(filtros or {}, COLUMNAS)
+    datos = cargar_catalogo()
+    if sin_replicas:
+        from sismos.desagrupamiento import quitar_replicas
+
+        datos = quitar_replicas(datos)
+    return indice_para(datos, COLUMNAS).filtrar(datos, filtros or {})
+
+
+def sismos_en_peru(filtros=None, progreso=None, sin_replicas=False):
+    """Sismos dentro de Perú, con ``NOMBDEP``, que cumplen filtros sobre ``COLUMNAS_PERU``.
+
+    Un sismo en el límite entre dos departamentos aparece una vez por cada
+    uno. ``progreso`` se pasa a la construcción del catálogo enriquecido si
+    todavía no está en disco.
+    """
+    from sismos.enriquecido import cargar_enriquecido
+
+    _validar(filtros or {}, COLUMNAS_PERU)
+    datos = cargar_enriquecido(progreso=progreso)
+    if sin_replicas:
+        from sismos.desagrupamiento import quitar_replicas
+
+        datos = quitar_replicas(datos)
+    return indice_para(datos, COLUMNAS_PERU).filtrar(datos, filtros or {})
+
+
+def sismos_cerca(latitud, longitud, radio_km=None, k=None, sin_replicas=False):
+    """Sismos del catálogo completo cerca de un punto, con ``DISTANCIA_KM``.
+
+    ``radio_km`` y ``k`` se interpretan como en :func:`sismos.cercanos.cercanos`.
+    """
+    from sismos.cercanos import cercanos
+
+    datos = cargar_catalogo()
+    if sin_replicas:
+        from sismos.desagrupamiento import quitar_replicas
+
+        datos = quitar_replicas(datos)
+    return cercanos(datos, latitud, longitud, radio_km=radio_km, k=k)
@@ -0,0 +1,271 @@
+"""Cubos de conteos preagregados para las páginas de gráficos.
+
+Cada cubo es un arreglo NumPy denso con la cantidad de sismos por
+combinación de intervalos (año, mes, magnitud en pasos de 0.1, profundidad
+en pasos de 1 km, departamento) y su tabla de sumas de prefijos. Un filtro
+por rangos se resuelve con la fórmula de inclusión-exclusión sobre los
+prefijos, así que el costo de un gráfico depende del número de barras y no
+del número de sismos.
+
+Un único cubo de cinco ejes ocuparía cientos de millones de celdas, y
+ninguna página cruza magnitud con profundidad, así que se guardan dos:
+``magnitud`` (año × mes × magnitud × departamento) y ``profundidad``
+(año × profundidad × departamento), de unos pocos MB cada uno.
+
+Cuando al catálogo se le agregan sismos, los cubos se actualizan sumando
+solo la contribución de los nuevos (ver :meth:`CuboConteos.agregado`).
+Un cubo no se modifica después de construido: la actualización devuelve
+uno nuevo, así que una consulta en curso sigue leyendo el anterior.
+"""
+import itertools
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+# Margen, en fracción de intervalo, para absorber el redondeo de float32
+TOLERANCIA = 1e-3
+FUERA_DE_PERU = "FUERA DE PERÚ"
+
+
+class Eje:
+    """Eje del cubo: intervalos regulares ``inicio + i * ancho`` o categorías."""
+
+    def __init__(self, nombre, etiquetas, inicio=None, ancho=None, decimales=0):
+        self.nombre = nombre
+        self.etiquetas = np.asarray(etiquetas)
+        self.inicio = inicio
+        self.ancho = ancho
+        self.decimales = decimales
+
+    @classmethod
+    def regular(cls, nombre, valores, ancho, decimales=0):
+        # Un valor faltante (NaN) no amplía el eje; esos sismos no se cuentan
+        inicio = np.floor(np.nanmin(valores) / ancho + TOLERANCIA) * ancho
+        fin = np.floor(np.nanmax(valores) / ancho + TOLERANCIA) * ancho
+        cantidad = int(round((fin - inicio) / ancho)) + 1
+        return cls(nombre, cls._etiquetas(inicio, ancho, cantidad, decimales), float(inicio), float(ancho), decimales)
+
+    @staticmethod
+    def _etiquetas(inicio, ancho, cantidad, decimales):
+        etiquetas = np.round(inicio + ancho * np.arange(cantidad), decimales)
+        if decimales == 0:
+            etiquetas = etiquetas.astype("int64")
+        return etiquetas
+
+    def ampliado(self, antes, despues):
+        """Mismo eje regular con ``antes`` intervalos más al inicio y ``despues`` al final."""
+        inicio = self.inicio - antes * self.ancho
+        cantidad = len(self) + antes + despues
+        etiquetas = self._etiquetas(inicio, self.ancho, cantidad, self.decimales)
+        return Eje(self.nombre, etiquetas, inicio, self.ancho, self.decimales)
+
+    def __len__(self):
+        return len(self.etiquetas)
+
+    def con_valor(self, valores):
+        """Máscara de los valores que no faltan (no son NaN)."""
+        if self.inicio is None:
+            return np.ones(len(valores), dtype=bool)
+        return ~np.isnan(np.asarray(valores, dtype="float64"))
+
+    def indices(self, valores):
+        """Intervalo al que pertenece cada valor.
+
+        En un eje de categorías los valores ya son las posiciones. Los
+        valores deben estar presentes (ver :meth:`con_valor`).
+        """
+        if self.inicio is None:
+            return np.asarray(valores, dtype="int64")
+        valores = np.asarray(valores, dtype="float64")
+        return np.floor((valores - self.inicio) / self.ancho + TOLERANCIA).astype("int64")
+
+    def limites(self, filtro):
+        """Índices ``[desde, hasta)`` cubiertos por un filtro ``(mínimo, máximo)``.
+
+        En un eje de categorías el filtro es una lista de etiquetas y se
+        devuelve una lista de rangos de un elemento.
+        """
+        if self.inicio is None:
+            posiciones = np.flatnonzero(np.isin(self.etiquetas, list(filtro)))
+            return [(int(p), int(p) + 1) for p in posiciones]
+        minimo, maximo = filtro
+        desde = 0 if minimo is None else int(np.ceil((minimo - self.inicio) / self.ancho - TOLERANCIA))
+        hasta = len(self) if maximo is None else int(np.floor((maximo - self.inicio) / self.ancho + TOLERANCIA)) + 1
+        desde, hasta = max(desde, 0), min(hasta, len(self))
+        return [(desde, hasta)] if desde < hasta else []
+
+
+def _prefijos(conteo):
+    """Tabla de sumas de prefijos: ``acumulado[i, j, ...] = conteo[:i, :j, ...].sum()``."""
+    acumulado = np.zeros(tuple(n + 1 for n in conteo.shape), dtype="int64")
+    acumulado[tuple(slice(1, None) for _ in conteo.shape)] = conteo
+    for eje in range(conteo.ndim):
+        np.cumsum(acumulado, axis=eje, out=acumulado)
+    return acumulado
+
+
+class CuboConteos:
+    """Conteos densos por combinación de intervalos más sus sumas de prefijos."""
+
+    def __init__(self, ejes, conteo, acumulado=None):
+        self.ejes = list(ejes)
+        self.posicion = {eje.nombre: i for i, eje in enumerate(self.ejes)}
+        self.conteo = conteo
+        self.acumulado = _prefijos(conteo) if acumulado is None else acumulado
+
+    @staticmethod
+    def _contar(ejes, valores):
+        """Conteos de los sismos dados; los que no tienen valor en algún eje se omiten."""
+        forma = tuple(len(eje) for eje in ejes)
+        presentes = np.logical_and.reduce([eje.con_valor(valores[eje.nombre]) for eje in ejes])
+        plano = np.ravel_multi_index(
+            tuple(eje.indices(np.asarray(valores[eje.nombre])[presentes]) for eje in ejes), forma
+        )
+        return np.bincount(plano, minlength=int(np.prod(forma))).reshape(forma).astype("int32")
+
+    @classmethod
+    def construir(cls, ejes, valores):
+        """Cuenta los sismos dados sus valores ``{eje: arreglo}`` en cada eje."""
+        return cls(ejes, cls._contar(ejes, valores))
+
+    def agregado(self, valores):
+        """Cubo nuevo con los sismos dados por sus valores en cada eje sumados a este.
+
+        Solo se cuentan los sismos nuevos; sus prefijos se suman a los ya
+        calculados. Si algún valor cae fuera de un eje regular (por ejemplo,
+        un año nuevo), el eje se amplía y los prefijos se recalculan a partir
+        de los conteos, sin volver a recorrer el catálogo. Este cubo no
+        cambia, así que quien lo esté consultando no ve ejes nuevos con
+        arreglos viejos.
+        """
+        ejes, relleno = list(self.ejes), []
+        for posicion, eje in enumerate(ejes):
+            presentes = np.asarray(valores[eje.nombre])[eje.con_valor(valores[eje.nombre])]
+            if eje.inicio is None or len(presentes) == 0:
+                relleno.append((0, 0))
+                continue
+            indices = eje.indices(presentes)
+            antes, despues = max(0, -int(indices.min())), max(0, int(indices.max()) - len(eje) + 1)
+            relleno.append((antes, despues))
+            if antes or despues:
+                ejes[posicion] = eje.ampliado(antes, despues)
+        delta = self._contar(ejes, valores)
+        if any(antes or despues for antes, despues in relleno):
+            return CuboConteos(ejes, np.pad(self.conteo, relleno) + delta)
+        return CuboConteos(ejes, self.conteo + delta, self.acumulado + _prefijos(delta))
+
+    def _rangos(self, filtros):
+        """Lista de rangos ``[desde, hasta)`` por eje; todo el eje si no hay filtro."""
+        rangos = []
+        for eje in self.ejes:
+            if eje.nombre in filtros:
+                rangos.append(eje.limites(filtros[eje.nombre]))
+            else:
+                rangos.append([(0, len(eje))])
+        return rangos
+
+    def _suma_caja(self, caja, libre=None):
+        """Suma sobre una caja por inclusión-exclusión.
+
+        Si ``libre`` es un eje, devuelve los prefijos a lo largo de ese eje
+        (un vector) en lugar de un total.
+        """
+        total = 0
+        otros = [i for i in range(len(self.ejes)) if i != libre]
+        for esquinas in itertools.product((0, 1), repeat=len(otros)):
+            indice = [slice(None)] * len(self.ejes)
+            signo = 1
+            for eje, esquina in zip(otros, esquinas):
+                desde, hasta = caja[eje]
+                indice[eje] = hasta if esquina else desde
+                signo = -signo if not esquina else signo
+            if libre is not None:
+                desde, hasta = caja[libre]
+                indice[libre] = slice(desde, hasta + 1)
+            total = total + signo * self.acumulado[tuple(indice)]
+        return total
+
+    def total(self, filtros=None):
+        """Cantidad de sismos que cumplen los filtros ``{eje: filtro}``."""
+        rangos = self._rangos(filtros or {})
+        return int(sum(self._suma_caja(caja) for caja in itertools.product(*rangos)))
+
+    def histograma(self, nombre, filtros=None, incluir_ceros=False):
+        """Conteo por intervalo del eje ``nombre`` bajo los filtros dados.
+
+        Devuelve una Serie indexada por las etiquetas del eje; por defecto se
+        omiten los intervalos vacíos, como hace ``value_counts``.
+        """
+        libre = self.posicion[nombre]
+        rangos = self._rangos(filtros or {})
+        conteos = np.zeros(len(self.ejes[libre]), dtype="int64")
+        for caja in itertools.product(*rangos):
+            desde, hasta = caja[libre]
+            conteos[desde:hasta] += np.diff(self._suma_caja(caja, libre))
+        serie = pd.Series(conteos, index=pd.Index(self.ejes[libre].etiquetas, name=nombre), name="count")
+        return serie if incluir_ceros else serie[serie > 0]
+
+
+def construir_cubos(catalogo, codigos, departamentos):
+    """Construye los cubos ``magnitud`` y ``profundidad`` de un catálogo.
+
+    ``codigos`` es el código de departamento de cada fila (posición en
+    ``departamentos``, -1 fuera de Perú).
+    """
+    año = Eje.regular("AÑO", catalogo["AÑO"].to_numpy(), 1)
+    mes = Eje("MES", np.arange(1, 13), inicio=1.0, ancho=1.0)
+    magnitud = Eje.regular("MAGNITUD", catalogo["MAGNITUD"].to_numpy(), 0.1, decimales=1)
+    profundidad = Eje.regular("PROFUNDIDAD", catalogo["PROFUNDIDAD"].to_numpy(), 1.0)
+    departamento = Eje("NOMBDEP", list(departamentos) + [FUERA_DE_PERU])
+
+    valores = _valores_cubos(catalogo, codigos, departamentos)
+    return {
+        "magnitud": CuboConteos.construir([año, mes, magnitud, departamento], valores),
+        "profundidad": CuboConteos.construir([año, profundidad, departamento], valores),
+    }
+
+
+def _valores_cubos(catalogo, codigos, departamentos):
+    """Valores de cada eje de los cubos; el departamento como posición."""
+    valores = {columna: catalogo[columna].to_numpy() for columna in ("AÑO", "MES", "MAGNITUD", "PROFUNDIDAD")}
+    valores["NOMBDEP"] = np.where(codigos < 0, len(departamentos), codigos)
+    return valores
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def cargar_cubos(sin_replicas=False):
+    """Cubos del catálogo actual, construidos una vez por versión de los datos.
+
+    Si la versión nueva solo agrega sismos a la anterior, se suman esos
+    sismos a los cubos anteriores (que no se modifican) en lugar de
+    recorrer todo el catálogo. Con ``sin_replicas`` se cuentan solo los
+    sismos principales (ver :mod:`sismos.desagrupamiento`); esos cubos
+    siempre se construyen completos, porque un sismo nuevo puede cambiar la
+    clasificación de los anteriores.
+    """
+    from sismos.enriquecido import catalogo_con_departamento
+
+    catalogo, nombres, version, base = catalogo_con_departamento()
+    if sin_replicas:
+        from sismos.desagrupamiento import quitar_replicas
+
+        catalogo = quitar_replicas(catalogo)
+    with _lock:
+        cubos = _cache.get((version, sin_replicas))
+        if cubos is None:
+            cubos = _cache.get((base[0], sin_replicas)) if base is not None and not sin_replicas else None
+            if cubos is not None:
+                nuevos = catalogo.iloc[base[1]:]
+                valores = _valores_cubos(nuevos, nuevos["CODDEP"].to_numpy(), nombres)
+                cubos = {nombre: cubo.agregado(valores) for nombre, cubo in cubos.items()}
+            else:
+                cubos = construir_cubos(catalogo, catalogo["CODDEP"].to_numpy(), nombres)
+            for clave in [clave for clave in _cache if clave[0] != version]:
+                del _cache[clave]
+            _cache[(version, sin_replicas)] = cubos
+        return cubos
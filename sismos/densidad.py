@@ -0,0 +1,157 @@
+"""Agregación espacial de sismos en una malla hexagonal.
+
+Para mapas con muchos sismos se envía al navegador una celda por hexágono
+(conteo, magnitud máxima y profundidad media) en lugar de un punto por
+sismo, así que el tamaño del mapa depende del número de celdas y no del
+tamaño del catálogo. Todo el binning se hace con NumPy.
+
+Los hexágonos se definen en grados (lon/lat) con orientación "punta arriba";
+``tamano`` es la distancia del centro a un vértice.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Tamaño aproximado de un hexágono en pantalla
+PIXELES_CELDA = 24
+RAIZ3 = np.sqrt(3.0)
+
+
+def tamano_para_zoom(zoom):
+    """Tamaño de celda en grados para que los hexágonos midan ~``PIXELES_CELDA`` px."""
+    # Un tile de 256 px cubre 360 / 2**zoom grados de longitud
+    return 360.0 / 2 ** float(zoom) * PIXELES_CELDA / 256.0
+
+
+def _hexagono_de(lon, lat, tamano):
+    """Coordenadas axiales (q, r) del hexágono que contiene cada punto."""
+    q = (RAIZ3 / 3.0 * lon - lat / 3.0) / tamano
+    r = (2.0 / 3.0 * lat) / tamano
+    # Redondeo en coordenadas cúbicas: se corrige la componente con mayor error
+    x, z = q, r
+    y = -x - z
+    rx, ry, rz = np.round(x), np.round(y), np.round(z)
+    dx, dy, dz = np.abs(rx - x), np.abs(ry - y), np.abs(rz - z)
+    corregir_x = (dx > dy) & (dx > dz)
+    corregir_z = ~corregir_x & (dz >= dy)
+    rx = np.where(corregir_x, -ry - rz, rx)
+    rz = np.where(corregir_z, -rx - ry, rz)
+    return rx.astype("int64"), rz.astype("int64")
+
+
+def _centro_de(q, r, tamano):
+    lon = tamano * RAIZ3 * (q + r / 2.0)
+    lat = tamano * 1.5 * r
+    return lon, lat
+
+
+def agregar_hexagonos(datos, tamano):
+    """Agrupa los sismos por hexágono.
+
+    Devuelve un DataFrame con una fila por celda ocupada y las columnas
+    ``q``, ``r``, ``LONGITUD``, ``LATITUD`` (centro), ``CONTEO``,
+    ``MAGNITUD_MAX`` y ``PROFUNDIDAD_MEDIA``.
+    """
+    lon = datos["LONGITUD"].to_numpy().astype("float64")
+    lat = datos["LATITUD"].to_numpy().astype("float64")
+    magnitud = datos["MAGNITUD"].to_numpy().astype("float64")
+    profundidad = datos["PROFUNDIDAD"].to_numpy().astype("float64")
+    if lon.size == 0:
+        return pd.DataFrame(columns=["q", "r", "LONGITUD", "LATITUD", "CONTEO",
+                                     "MAGNITUD_MAX", "PROFUNDIDAD_MEDIA"])
+
+    q, r = _hexagono_de(lon, lat, tamano)
+    # Clave entera por celda dentro del rectángulo (q, r) ocupado
+    q0, r0 = q.min(), r.min()
+    ancho = int(r.max() - r0) + 1
+    clave = (q - q0) * ancho + (r - r0)
+    total = int(clave.max()) + 1
+    if total <= max(4 * clave.size, 1 << 20):
+        # Malla pequeña: conteo directo y compactación de las celdas ocupadas
+        ocupadas = np.flatnonzero(np.bincount(clave, minlength=total))
+        celda = np.searchsorted(ocupadas, clave)
+    else:
+        ocupadas, celda = np.unique(clave, return_inverse=True)
+    q_celda, r_celda = ocupadas // ancho + q0, ocupadas % ancho + r0
+
+    conteo = np.bincount(celda, minlength=len(ocupadas))
+    profundidad_media = np.bincount(celda, weights=profundidad, minlength=len(ocupadas)) / conteo
+    # Máximo por celda: se ordena por celda y se reduce cada tramo
+    orden = np.argsort(celda, kind="stable")
+    inicios = np.concatenate([[0], np.cumsum(conteo)[:-1]])
+    magnitud_max = np.maximum.reduceat(magnitud[orden], inicios)
+
+    centro_lon, centro_lat = _centro_de(q_celda, r_celda, tamano)
+    return pd.DataFrame({
+        "q": q_celda,
+        "r": r_celda,
+        "LONGITUD": centro_lon,
+        "LATITUD": centro_lat,
+        "CONTEO": conteo,
+        "MAGNITUD_MAX": np.round(magnitud_max, 1),
+        "PROFUNDIDAD_MEDIA": np.round(profundidad_media, 1),
+    })
+
+
+def vertices_hexagonos(celdas, tamano):
+    """Anillos cerrados (n, 7, 2) de los hexágonos, en lon/lat."""
+    angulos = np.deg2rad(60.0 * np.arange(6) + 30.0)
+    desplazamientos = tamano * np.stack([np.cos(angulos), np.sin(angulos)], axis=1)
+    centros = celdas[["LONGITUD", "LATITUD"]].to_numpy()[:, None, :]
+    anillos = centros + desplazamientos[None, :, :]
+    return np.concatenate([anillos, anillos[:, :1]], axis=1)
+
+
+def geojson_hexagonos(celdas, tamano, colores):
+    """FeatureCollection de hexágonos con el color de cada celda en sus propiedades."""
+    anillos = np.round(vertices_hexagonos(celdas, tamano), 5).tolist()
+    propiedades = celdas[["CONTEO", "MAGNITUD_MAX", "PROFUNDIDAD_MEDIA"]].to_dict("records")
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Polygon", "coordinates": [anillo]},
+                "properties": dict(p, color=color),
+            }
+            for anillo, p, color in zip(anillos, propiedades, colores)
+        ],
+    }
+
+
+def capa_densidad_folium(datos, zoom, limites=None):
+    """Capa GeoJson de hexágonos coloreados por cantidad de sismos (escala log).
+
+    ``limites`` es la vista actual ``(oeste, sur, este, norte)``; si se da,
+    solo se agregan los sismos visibles (más un margen), con lo que el número
+    de celdas queda acotado por el tamaño de la pantalla.
+    """
+    import branca.colormap as cm
+    import folium
+
+    tamano = tamano_para_zoom(zoom)
+    if limites is not None:
+        oeste, sur, este, norte = limites
+        lon = datos["LONGITUD"].to_numpy()
+        lat = datos["LATITUD"].to_numpy()
+        visibles = ((lon >= oeste - tamano) & (lon <= este + tamano)
+                    & (lat >= sur - tamano) & (lat <= norte + tamano))
+        datos = datos[visibles]
+    celdas = agregar_hexagonos(datos, tamano)
+    maximo = int(celdas["CONTEO"].max()) if len(celdas) else 1
+    escala = cm.linear.YlOrRd_09.scale(0, np.log10(max(maximo, 10)))
+    colores = [escala(v) for v in np.log10(celdas["CONTEO"].to_numpy().astype("float64"))]
+
+    capa = folium.GeoJson(
+        geojson_hexagonos(celdas, tamano, colores),
+        name="DENSIDAD",
+        style_function=lambda f: {"fillColor": f["properties"]["color"], "color": "#555",
+                                  "weight": 0.5, "fillOpacity": 0.7},
+        tooltip=folium.GeoJsonTooltip(
+            fields=["CONTEO", "MAGNITUD_MAX", "PROFUNDIDAD_MEDIA"],
+            aliases=["Sismos", "Magnitud máxima", "Profundidad media (km)"],
+        ),
+        zoom_on_click=False,
+        control=False,
+    )
+    return capa, celdas
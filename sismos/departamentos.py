@@ -0,0 +1,102 @@
+"""Asignación vectorizada de sismos a departamentos.
+
+Sustituye la lista de ``shapely.Point`` y el ``gpd.sjoin`` por pruebas sobre
+arreglos NumPy: para cada polígono se descartan primero los puntos fuera de
+su caja envolvente y solo los candidatos pasan por
+``shapely.intersects_xy`` con el polígono preparado. El predicado es el mismo
+que usaba el ``sjoin`` (``intersects``), por lo que los puntos sobre un
+límite compartido pertenecen a ambos departamentos, igual que antes.
+
+Para esos pocos puntos de límite, el orden de los departamentos se toma de
+un ``STRtree`` construido igual que el índice espacial de geopandas, de modo
+que el resultado coincide bit a bit con el del ``sjoin``.
+"""
+import json
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+from sismos.catalogo import RUTA_DEPARTAMENTOS
+
+
+SIN_DEPARTAMENTO = -1
+
+
+class AsignadorDepartamentos:
+    """Clasifica coordenadas lon/lat en los polígonos de los departamentos.
+
+    Los códigos devueltos son posiciones en ``nombres`` (el orden de las
+    entidades en el GeoJSON).
+    """
+
+    def __init__(self, nombres, geometrias):
+        self.nombres = np.asarray(nombres, dtype=object)
+        self.geometrias = np.asarray(geometrias, dtype=object)
+        self.cajas = shapely.bounds(self.geometrias)
+        self.arbol = shapely.STRtree(self.geometrias)
+        shapely.prepare(self.geometrias)
+
+    @classmethod
+    def desde_geojson(cls, ruta=RUTA_DEPARTAMENTOS):
+        with open(ruta, encoding="utf-8") as archivo:
+            entidades = json.load(archivo)["features"]
+        nombres = [entidad["properties"]["NOMBDEP"] for entidad in entidades]
+        geometrias = [shape(entidad["geometry"]) for entidad in entidades]
+        return cls(nombres, geometrias)
+
+    def cruzar(self, lon, lat):
+        """Devuelve los pares ``(posición del sismo, código)`` que se intersecan.
+
+        Equivale a ``gpd.sjoin(..., how="inner", predicate="intersects")``: un
+        sismo sobre un límite aparece una vez por departamento y los pares
+        salen ordenados por sismo.
+        """
+        lon = np.asarray(lon, dtype="float64")
+        lat = np.asarray(lat, dtype="float64")
+        posiciones = []
+        codigos = []
+        for codigo, (geometria, caja) in enumerate(zip(self.geometrias, self.cajas)):
+            candidatos = np.flatnonzero(
+                (lon >= caja[0]) & (lon <= caja[2]) & (lat >= caja[1]) & (lat <= caja[3])
+            )
+            if candidatos.size == 0:
+                continue
+            dentro = candidatos[shapely.intersects_xy(geometria, lon[candidatos], lat[candidatos])]
+            posiciones.append(dentro)
+            codigos.append(np.full(dentro.size, codigo, dtype="int16"))
+
+        if not posiciones:
+            return np.empty(0, dtype="int64"), np.empty(0, dtype="int16")
+        posiciones = np.concatenate(posiciones)
+        codigos = np.concatenate(codigos)
+        orden = np.lexsort((codigos, posiciones))
+        posiciones = posiciones[orden]
+        codigos = codigos[orden]
+
+        # Sismos en más de un departamento: el sjoin los devuelve en el orden
+        # de recorrido del STRtree, que se reproduce consultando solo esos puntos
+        repetidos = np.flatnonzero(np.diff(posiciones) == 0)
+        if repetidos.size:
+            multiples = np.unique(posiciones[repetidos])
+            izquierda, derecha = self.arbol.query(
+                shapely.points(lon[multiples], lat[multiples]), predicate="intersects"
+            )
+            en_arbol = derecha[np.argsort(izquierda, kind="stable")]
+            codigos[np.isin(posiciones, multiples)] = en_arbol
+        return posiciones, codigos
+
+    def asignar(self, lon, lat):
+        """Código de departamento por sismo (``SIN_DEPARTAMENTO`` si cae fuera).
+
+        Si un sismo está sobre un límite compartido se queda con el primer
+        departamento en el orden del ``sjoin`` (el de recorrido del
+        ``STRtree``, no necesariamente el código más bajo); para conservar
+        los duplicados usar :meth:`cruzar`.
+        """
+        codigos = np.full(len(lon), SIN_DEPARTAMENTO, dtype="int16")
+        posiciones, encontrados = self.cruzar(lon, lat)
+        # Los pares salen agrupados por sismo: se toma el primero de cada uno
+        unicas, primeros = np.unique(posiciones, return_index=True)
+        codigos[unicas] = encontrados[primeros]
+        return codigos
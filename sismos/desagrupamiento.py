@@ -0,0 +1,172 @@
+"""Desagrupamiento del catálogo (eliminación de réplicas) con ventanas de Gardner–Knopoff.
+
+Cada sismo define una ventana de distancia ``L(M)`` y de tiempo ``T(M)``
+(Gardner y Knopoff, 1974). Recorriendo los sismos de mayor a menor
+magnitud, un sismo que todavía no fue marcado es principal y marca como
+réplicas a los sismos de menor o igual magnitud (que se recorren después)
+dentro de su ventana, antes o después de él; un sismo marcado ya no marca
+a otros.
+
+Compararlo todo contra todo es O(n²). Aquí los vecinos candidatos salen de
+un ``cKDTree`` sobre ``(x, y, z, t·escala)``: la posición en la esfera
+terrestre en km y el tiempo en días convertido a km. Una consulta de caja
+(``p=inf``) con semiancho ``max(L, escala·T)`` encierra el cilindro de la
+ventana. ``T/L`` cambia con la magnitud (crece hasta M6.5 y luego decrece),
+así que las magnitudes se agrupan por ese cociente y cada grupo consulta un
+árbol con su propia escala, para que la caja no sea mucho más grande que la
+ventana; cada árbol contiene todos los sismos sin marcar, de cualquier
+grupo. Las magnitudes se procesan en un único orden de mayor a menor y solo
+consultan el árbol los sismos que siguen sin marcar; los candidatos se
+filtran con la distancia exacta, y el recorrido secuencial solo hace falta
+entre sismos de la misma magnitud.
+
+El resultado se guarda por versión del CSV como el conjunto de ``ID`` de las
+réplicas, así que sirve para cualquier DataFrame del catálogo (el crudo, el
+que tiene ``CODDEP`` o el enriquecido).
+"""
+import threading
+
+import numpy as np
+
+from sismos.catalogo import RUTA_CSV, cargar_catalogo, huella_archivo
+
+
+RADIO_TIERRA_KM = 6371.0
+
+
+def ventana_gardner_knopoff(magnitudes):
+    """Distancia (km) y duración (días) de la ventana de cada magnitud."""
+    magnitudes = np.asarray(magnitudes, dtype="float64")
+    distancia = 10 ** (0.1238 * magnitudes + 0.983)
+    duracion = np.where(magnitudes >= 6.5,
+                        10 ** (0.032 * magnitudes + 2.7389),
+                        10 ** (0.5409 * magnitudes - 0.547))
+    return distancia, duracion
+
+
+def _posiciones(latitudes, longitudes):
+    """Coordenadas cartesianas (km) de puntos sobre la esfera terrestre."""
+    latitud = np.radians(np.asarray(latitudes, dtype="float64"))
+    longitud = np.radians(np.asarray(longitudes, dtype="float64"))
+    return RADIO_TIERRA_KM * np.column_stack([
+        np.cos(latitud) * np.cos(longitud),
+        np.cos(latitud) * np.sin(longitud),
+        np.sin(latitud),
+    ])
+
+
+def marcar_replicas(dias, latitudes, longitudes, magnitudes):
+    """Máscara de réplicas (``True``) según las ventanas de Gardner–Knopoff.
+
+    ``dias`` es el instante de cada sismo en días desde cualquier origen.
+    """
+    from scipy.spatial import cKDTree
+
+    dias = np.asarray(dias, dtype="float64")
+    magnitudes = np.asarray(magnitudes, dtype="float64")
+    replicas = np.zeros(len(dias), dtype=bool)
+    if not len(dias):
+        return replicas
+
+    posiciones = _posiciones(latitudes, longitudes)
+    distancia, duracion = ventana_gardner_knopoff(magnitudes)
+    # Orden de recorrido: mayor magnitud primero y, a igual magnitud, el más antiguo
+    orden = np.lexsort((dias, -magnitudes))
+    rango = np.empty(len(dias), dtype="int64")
+    rango[orden] = np.arange(len(dias))
+
+    # Con la escala de su grupo, escala·T queda entre L/√2 y L·√2
+    grupos = np.floor(np.log2(duracion / distancia)).astype("int64")
+    arboles = {}
+
+    def arbol_del_grupo(grupo):
+        """Árbol con la escala de ``grupo`` sobre los sismos sin marcar.
+
+        Se reconstruye cuando más de la mitad de los sismos que contiene ya
+        fueron marcados, para que las consultas no devuelvan sobre todo
+        candidatos descartados.
+        """
+        escala = 2.0 ** -(grupo + 0.5)
+        entrada = arboles.get(grupo)
+        if entrada is None or len(entrada[0]) > 2 * np.count_nonzero(~replicas):
+            candidatos = np.flatnonzero(~replicas)
+            arbol = cKDTree(np.column_stack([posiciones[candidatos], dias[candidatos] * escala]))
+            entrada = arboles[grupo] = (candidatos, arbol)
+        return entrada[0], entrada[1], escala
+
+    for magnitud in np.unique(magnitudes)[::-1]:
+        # Los sismos marcados por uno mayor ya no marcan a otros
+        principales = np.flatnonzero((magnitudes == magnitud) & ~replicas)
+        if not len(principales):
+            continue
+        candidatos, arbol, escala = arbol_del_grupo(int(grupos[principales[0]]))
+        semiancho = max(distancia[principales[0]], escala * duracion[principales[0]])
+        vecinos = arbol.query_ball_point(np.column_stack([posiciones[principales], dias[principales] * escala]),
+                                         semiancho, p=np.inf, return_sorted=False)
+        cantidades = np.fromiter(map(len, vecinos), dtype="int64", count=len(vecinos))
+        if not cantidades.any():
+            continue
+        i = np.repeat(principales, cantidades)
+        j = candidatos[np.concatenate([v for v in vecinos if v]).astype("int64")]
+        cuerda = np.linalg.norm(posiciones[i] - posiciones[j], axis=1)
+        arco = 2 * RADIO_TIERRA_KM * np.arcsin(np.minimum(cuerda / (2 * RADIO_TIERRA_KM), 1.0))
+        dentro = ((rango[j] > rango[i]) & (arco <= distancia[i])
+                  & (np.abs(dias[j] - dias[i]) <= duracion[i]) & ~replicas[j])
+        i, j = i[dentro], j[dentro]
+        if not (magnitudes[j] == magnitud).any():
+            # Ningún principal de esta magnitud puede ser marcado por otro
+            replicas[j] = True
+            continue
+        # Entre sismos de la misma magnitud el recorrido es secuencial
+        por_rango = np.argsort(rango[i], kind="stable")
+        i, j = i[por_rango], j[por_rango]
+        inicios = np.flatnonzero(np.r_[True, i[1:] != i[:-1]])
+        finales = np.r_[inicios[1:], len(i)]
+        for inicio, final in zip(inicios.tolist(), finales.tolist()):
+            if not replicas[i[inicio]]:
+                replicas[j[inicio:final]] = True
+    return replicas
+
+
+def dias_desde_1970(datos):
+    """Instante de cada sismo (``TIEMPO``) en días desde 1970."""
+    return datos["TIEMPO"].to_numpy() / 86400.0
+
+
+_replicas = {}
+_filtrados = {}
+_lock = threading.Lock()
+
+
+def ids_replicas(ruta=RUTA_CSV):
+    """``ID`` (ordenados) de las réplicas del catálogo, calculados una vez por versión del CSV."""
+    version = huella_archivo(ruta)
+    with _lock:
+        ids = _replicas.get(version)
+        if ids is None:
+            datos = cargar_catalogo(ruta)
+            replicas = marcar_replicas(dias_desde_1970(datos), datos["LATITUD"].to_numpy(),
+                                       datos["LONGITUD"].to_numpy(), datos["MAGNITUD"].to_numpy())
+            ids = np.sort(datos["ID"].to_numpy()[replicas])
+            _replicas.clear()
+            _replicas[version] = ids
+        return ids
+
+
+def quitar_replicas(datos, ruta=RUTA_CSV):
+    """Las filas de ``datos`` que no son réplicas.
+
+    Se devuelve el mismo objeto mientras ``datos`` y el CSV no cambien, así
+    que los índices de rangos construidos sobre él se reutilizan.
+    """
+    ids = ids_replicas(ruta)
+    clave = id(datos)
+    with _lock:
+        entrada = _filtrados.get(clave)
+        if entrada is None or entrada[0] is not datos or entrada[1] is not ids:
+            principales = datos[~np.isin(datos["ID"].to_numpy(), ids)].reset_index(drop=True)
+            entrada = (datos, ids, principales)
+            if len(_filtrados) >= 8:
+                _filtrados.pop(next(iter(_filtrados)))
+            _filtrados[clave] = entrada
+        return entrada[2]
@@ -0,0 +1,191 @@
+"""Medición de tiempo y memoria por etapa de las páginas.
+
+Cada etapa se envuelve en ``with etapa("mapa.consulta"):``. Mientras el
+diagnóstico no esté activo en la ejecución actual, ``etapa`` solo consulta
+una variable de contexto y no mide nada. Al activarlo (ver :func:`activar`)
+cada etapa suma su duración en el registro de la sesión y en el del
+proceso; si además se pide memoria, se usa ``tracemalloc`` y se guarda el
+pico de memoria asignada por la etapa, contando las etapas anidadas.
+
+Los registros se exportan como JSON o como texto de Prometheus.
+"""
+import contextvars
+import functools
+import json
+import threading
+import time
+import tracemalloc
+import weakref
+
+
+class Registro:
+    """Acumulado por etapa: llamadas, segundos (total, último, máximo) y pico de memoria."""
+
+    def __init__(self):
+        self.etapas = {}
+        self._lock = threading.Lock()
+
+    def agregar(self, nombre, segundos, bytes_pico=None):
+        with self._lock:
+            datos = self.etapas.get(nombre)
+            if datos is None:
+                datos = self.etapas[nombre] = {"llamadas": 0, "segundos": 0.0, "ultimo": 0.0,
+                                               "maximo": 0.0, "bytes_pico": None}
+            datos["llamadas"] += 1
+            datos["segundos"] += segundos
+            datos["ultimo"] = segundos
+            datos["maximo"] = max(datos["maximo"], segundos)
+            if bytes_pico is not None:
+                datos["bytes_pico"] = max(datos["bytes_pico"] or 0, bytes_pico)
+
+    def resumen(self):
+        """Copia de las etapas, ordenadas por tiempo total."""
+        with self._lock:
+            etapas = {nombre: dict(datos) for nombre, datos in self.etapas.items()}
+        return dict(sorted(etapas.items(), key=lambda item: -item[1]["segundos"]))
+
+    def limpiar(self):
+        with self._lock:
+            self.etapas.clear()
+
+
+PROCESO = Registro()
+# (registro, medir memoria) de la ejecución actual, o None si el diagnóstico está apagado
+_activo = contextvars.ContextVar("registro_diagnostico", default=None)
+# Registros de las sesiones que pidieron medir memoria; tracemalloc corre mientras haya alguno
+_con_memoria = weakref.WeakSet()
+_lock_memoria = threading.Lock()
+# Picos de las etapas abiertas, para que una etapa incluya el de sus etapas anidadas
+_abiertas = contextvars.ContextVar("etapas_abiertas", default=())
+
+
+def _actualizar_tracemalloc():
+    if len(_con_memoria) and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not len(_con_memoria) and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def activar(sesion, memoria=False):
+    """Mide las etapas de la ejecución actual en ``sesion`` (y en ``PROCESO``).
+
+    ``tracemalloc`` es global al proceso: se enciende mientras alguna sesión
+    pida ``memoria`` y se apaga cuando ya ninguna lo pide. Las sesiones que
+    no la pidieron no registran memoria aunque esté encendido.
+    """
+    with _lock_memoria:
+        if memoria:
+            _con_memoria.add(sesion)
+        else:
+            _con_memoria.discard(sesion)
+        _actualizar_tracemalloc()
+    _activo.set((sesion, memoria))
+
+
+def desactivar(sesion=None):
+    """Deja de medir en la ejecución actual.
+
+    ``sesion`` (por defecto, la activa en esta ejecución) deja de contar
+    entre las que piden medir memoria.
+    """
+    activo = _activo.get()
+    if sesion is None and activo is not None:
+        sesion = activo[0]
+    _activo.set(None)
+    with _lock_memoria:
+        if sesion is not None:
+            _con_memoria.discard(sesion)
+        _actualizar_tracemalloc()
+
+
+class etapa:
+    """Contexto que mide una etapa si el diagnóstico está activo."""
+
+    __slots__ = ("nombre", "registro", "inicio", "memoria_inicial", "pico_anidadas")
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __enter__(self):
+        activo = _activo.get()
+        if activo is None:
+            self.registro = None
+            return self
+        self.registro, memoria = activo
+        self.memoria_inicial = None
+        if memoria and tracemalloc.is_tracing():
+            actual, pico = tracemalloc.get_traced_memory()
+            # El pico que llevaba la etapa que nos contiene no se pierde al reiniciarlo
+            for abierta in _abiertas.get():
+                abierta.pico_anidadas = max(abierta.pico_anidadas, pico)
+            tracemalloc.reset_peak()
+            self.memoria_inicial = actual
+            self.pico_anidadas = 0
+            _abiertas.set(_abiertas.get() + (self,))
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        if self.registro is None:
+            return False
+        segundos = time.perf_counter() - self.inicio
+        bytes_pico = None
+        if self.memoria_inicial is not None and tracemalloc.is_tracing():
+            pico = max(tracemalloc.get_traced_memory()[1], self.pico_anidadas)
+            bytes_pico = max(pico - self.memoria_inicial, 0)
+            abiertas = _abiertas.get()
+            _abiertas.set(abiertas[:-1] if abiertas and abiertas[-1] is self else abiertas)
+            for abierta in _abiertas.get():
+                abierta.pico_anidadas = max(abierta.pico_anidadas, pico)
+        self.registro.agregar(self.nombre, segundos, bytes_pico)
+        if self.registro is not PROCESO:
+            PROCESO.agregar(self.nombre, segundos, bytes_pico)
+        return False
+
+
+def medido(nombre):
+    """Decorador que mide cada llamada a la función como la etapa ``nombre``."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envuelta(*args, **kwargs):
+            with etapa(nombre):
+                return funcion(*args, **kwargs)
+        return envuelta
+    return decorador
+
+
+def a_json(registros):
+    """Texto JSON de ``{alcance: resumen}``."""
+    return json.dumps({alcance: registro.resumen() for alcance, registro in registros.items()},
+                      ensure_ascii=False, indent=2)
+
+
+def _etiquetas(**valores):
+    return ",".join('%s="%s"' % (clave, str(valor).replace("\\", "\\\\").replace('"', '\\"'))
+                    for clave, valor in valores.items())
+
+
+def a_prometheus(registros, extra=None):
+    """Texto en el formato de exposición de Prometheus.
+
+    ``registros`` es ``{alcance: Registro}``; ``extra`` son valores sueltos
+    ``{nombre: número}`` que se exportan como ``gauge`` (por ejemplo las
+    estadísticas de la caché de renders).
+    """
+    metricas = [
+        ("sismos_etapa_llamadas_total", "counter", "Veces que se ejecutó la etapa.", "llamadas"),
+        ("sismos_etapa_segundos_total", "counter", "Segundos acumulados en la etapa.", "segundos"),
+        ("sismos_etapa_segundos_max", "gauge", "Duración máxima de la etapa en segundos.", "maximo"),
+        ("sismos_etapa_bytes_pico", "gauge", "Pico de memoria asignada por la etapa (tracemalloc).", "bytes_pico"),
+    ]
+    resumenes = {alcance: registro.resumen() for alcance, registro in registros.items()}
+    lineas = []
+    for nombre, tipo, ayuda, campo in metricas:
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+        for alcance, etapas in resumenes.items():
+            for nombre_etapa, datos in etapas.items():
+                if datos[campo] is not None:
+                    lineas.append(f"{nombre}{{{_etiquetas(alcance=alcance, etapa=nombre_etapa)}}} {datos[campo]}")
+    for nombre, valor in (extra or {}).items():
+        lineas += [f"# TYPE {nombre} gauge", f"{nombre} {valor}"]
+    return "\n".join(lineas) + "\n"
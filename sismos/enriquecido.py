@@ -0,0 +1,266 @@
+"""Catálogo enriquecido con el departamento de cada sismo.
+
+La asignación de sismos a departamentos no cambia mientras no cambien el CSV
+ni el GeoJSON, así que se calcula una sola vez y se guarda en archivos
+Feather (Arrow sin compresión) bajo ``datos_procesados/``. Cada versión de
+los datos tiene un manifiesto JSON cuyo nombre incluye la versión del
+esquema y las huellas SHA-256 del CSV y del GeoJSON, y que lista los
+segmentos Feather que la componen. El
+mapa abre esos segmentos con ``memory_map`` en lugar de repetir la
+construcción de puntos y el ``sjoin``.
+
+El primer segmento se construye por lotes (ver :mod:`sismos.ingesta`), de
+modo que la memoria necesaria no crece con el tamaño del CSV; con un CSV
+grande los lotes se reparten entre varios procesos. Si después al
+CSV solo se le agregan filas al final, la nueva versión reutiliza los
+segmentos anteriores y agrega uno con las filas nuevas. Se puede generar por
+adelantado con::
+
+    python -m sismos.enriquecido [--procesos N]
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+
+import shapely
+
+from sismos.catalogo import (DIRECTORIO_BASE, RUTA_CSV, RUTA_DEPARTAMENTOS, cargar_codigos, es_extension,
+                             huella_archivo, leer_agregadas, parsear_catalogo)
+from sismos.departamentos import AsignadorDepartamentos
+
+
+DIRECTORIO_PROCESADOS = os.path.join(DIRECTORIO_BASE, "datos_procesados")
+PREFIJO = "catalogo_enriquecido"
+# Cambia cuando cambian las columnas o sus tipos; los archivos de otra versión se regeneran
+VERSION_ESQUEMA = 2
+# Con más segmentos que estos, se reescriben en uno solo
+MAX_SEGMENTOS = 16
+# Desde este tamaño de CSV la primera ingesta usa varios procesos
+MIN_BYTES_PARALELO = 64 * 2**20
+
+_cache = {}
+_codificados = {}
+_lock = threading.Lock()
+
+
+def ruta_enriquecido(ruta_csv=RUTA_CSV, ruta_geojson=RUTA_DEPARTAMENTOS):
+    """Ruta del manifiesto correspondiente a la versión actual de los datos."""
+    nombre = f"{PREFIJO}_v{VERSION_ESQUEMA}_{huella_archivo(ruta_csv)[:16]}_{huella_archivo(ruta_geojson)[:16]}.json"
+    return os.path.join(DIRECTORIO_PROCESADOS, nombre)
+
+
+def leer_departamentos(ruta_geojson=RUTA_DEPARTAMENTOS):
+    """Lee los polígonos de los departamentos en EPSG:4326."""
+    import geopandas as gpd
+
+    departamentos = gpd.read_file(ruta_geojson)
+    if departamentos.crs is None or departamentos.crs != "EPSG:4326":
+        departamentos = departamentos.to_crs("EPSG:4326")
+    return departamentos
+
+
+def unir_departamentos(crudo, asignador):
+    """Añade la columna ``NOMBDEP`` conservando solo los sismos dentro de Perú.
+
+    Recibe las filas crudas del CSV para hacer el cruce con las coordenadas
+    originales en float64; el resultado es el mismo que el del ``sjoin`` que
+    hacía el mapa (ver :mod:`sismos.departamentos`).
+    """
+    import pandas as pd
+
+    posiciones, codigos = asignador.cruzar(crudo["LONGITUD"].to_numpy(), crudo["LATITUD"].to_numpy())
+    seleccion = crudo.iloc[posiciones].reset_index(drop=True)
+    # Categórica con todos los departamentos, así todos los lotes comparten el diccionario
+    seleccion["NOMBDEP"] = pd.Categorical(asignador.nombres[codigos], categories=list(dict.fromkeys(asignador.nombres)))
+    return parsear_catalogo(seleccion)
+
+
+# Asignador de cada proceso de la ingesta paralela (ver _iniciar_proceso)
+_asignador_proceso = None
+
+
+def _iniciar_proceso(nombres, wkb):
+    """Recibe los departamentos, como WKB, una sola vez por proceso."""
+    global _asignador_proceso
+    _asignador_proceso = AsignadorDepartamentos(nombres, shapely.from_wkb(wkb))
+
+
+def _unir_en_proceso(crudo):
+    return unir_departamentos(crudo, _asignador_proceso)
+
+
+def _leer_manifiesto(ruta):
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+
+def _escribir_manifiesto(ruta, manifiesto):
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(manifiesto, archivo, indent=2)
+    os.replace(temporal, ruta)
+
+
+def _manifiesto_base(ruta_csv, huella_geojson):
+    """Manifiesto de una versión anterior de la que el CSV actual es extensión."""
+    for ruta in glob.glob(os.path.join(DIRECTORIO_PROCESADOS, f"{PREFIJO}_v{VERSION_ESQUEMA}_*_{huella_geojson[:16]}.json")):
+        manifiesto = _leer_manifiesto(ruta)
+        if (manifiesto["huella_geojson"] == huella_geojson
+                and es_extension(ruta_csv, manifiesto["bytes_csv"], manifiesto["huella_csv"])):
+            return manifiesto
+    return None
+
+
+def _leer_segmentos(segmentos):
+    """Tabla Arrow con los segmentos dados, mapeados en memoria."""
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    return pa.concat_tables(
+        feather.read_table(os.path.join(DIRECTORIO_PROCESADOS, segmento), memory_map=True)
+        for segmento in segmentos
+    )
+
+
+def construir_enriquecido(ruta_csv=RUTA_CSV, ruta_geojson=RUTA_DEPARTAMENTOS, progreso=None, procesos=None):
+    """Genera los archivos de la versión actual y borra los que ya no se usan.
+
+    Si existe una versión anterior de la que el CSV es extensión, solo se
+    procesan las filas agregadas (con ``ID`` mayor al último ingerido).
+    ``progreso(fracción, filas)`` se llama después de cada lote procesado.
+    ``procesos`` fija cuántos procesos usa la ingesta completa; por defecto
+    se usan todos los núcleos si el CSV pasa de ``MIN_BYTES_PARALELO``. El
+    resultado es el mismo con cualquier cantidad de procesos.
+    """
+    from sismos.ingesta import escribir_lotes, ingerir_csv, ingerir_csv_paralelo
+
+    destino = ruta_enriquecido(ruta_csv, ruta_geojson)
+    huella_csv = huella_archivo(ruta_csv)
+    huella_geojson = huella_archivo(ruta_geojson)
+    asignador = AsignadorDepartamentos.desde_geojson(ruta_geojson)
+    os.makedirs(DIRECTORIO_PROCESADOS, exist_ok=True)
+
+    segmento = os.path.splitext(destino)[0] + ".feather"
+    temporal = segmento + ".tmp"
+    base = _manifiesto_base(ruta_csv, huella_geojson)
+    if procesos is None:
+        procesos = (os.cpu_count() or 1) if os.path.getsize(ruta_csv) >= MIN_BYTES_PARALELO else 1
+    if base is None:
+        if procesos > 1:
+            departamentos = (list(asignador.nombres), shapely.to_wkb(asignador.geometrias))
+            _, ultimo_id = ingerir_csv_paralelo(ruta_csv, temporal, _unir_en_proceso, _iniciar_proceso, departamentos,
+                                                procesos=procesos, progreso=progreso)
+        else:
+            _, ultimo_id = ingerir_csv(ruta_csv, temporal, lambda lote: unir_departamentos(lote, asignador),
+                                       progreso=progreso)
+        segmentos = []
+    else:
+        crudo = leer_agregadas(ruta_csv, base["bytes_csv"], base["ultimo_id"])
+        escribir_lotes([unir_departamentos(crudo, asignador)], temporal)
+        segmentos = list(base["segmentos"])
+        ultimo_id = max(base["ultimo_id"], int(crudo["ID"].max()) if len(crudo) else -1)
+        if progreso is not None:
+            progreso(1.0, len(crudo))
+    os.replace(temporal, segmento)
+    segmentos.append(os.path.basename(segmento))
+
+    if len(segmentos) > MAX_SEGMENTOS:
+        import pyarrow.feather as feather
+
+        feather.write_feather(_leer_segmentos(segmentos), temporal, compression="uncompressed")
+        os.replace(temporal, segmento)
+        segmentos = [os.path.basename(segmento)]
+
+    _escribir_manifiesto(destino, {
+        "huella_csv": huella_csv,
+        "huella_geojson": huella_geojson,
+        "bytes_csv": os.path.getsize(ruta_csv),
+        "ultimo_id": ultimo_id,
+        "segmentos": segmentos,
+    })
+
+    vigentes = {os.path.basename(destino), *segmentos}
+    for viejo in glob.glob(os.path.join(DIRECTORIO_PROCESADOS, PREFIJO + "_*")):
+        if os.path.basename(viejo) not in vigentes:
+            os.remove(viejo)
+    return destino
+
+
+def enriquecido_disponible(ruta_csv=RUTA_CSV, ruta_geojson=RUTA_DEPARTAMENTOS):
+    """Indica si los archivos enriquecidos de la versión actual ya están en disco."""
+    return os.path.exists(ruta_enriquecido(ruta_csv, ruta_geojson))
+
+
+def cargar_enriquecido(ruta_csv=RUTA_CSV, ruta_geojson=RUTA_DEPARTAMENTOS, progreso=None):
+    """Devuelve el catálogo con ``NOMBDEP``, reconstruyéndolo solo si hace falta.
+
+    Si la versión nueva solo agrega un segmento a la que está en memoria, se
+    lee ese segmento y se extienden los índices ya construidos.
+    """
+    import pandas as pd
+
+    from sismos.indice import extender_indices
+
+    destino = ruta_enriquecido(ruta_csv, ruta_geojson)
+    with _lock:
+        entrada = _cache.get(destino)
+        if entrada is None:
+            if not os.path.exists(destino):
+                construir_enriquecido(ruta_csv, ruta_geojson, progreso=progreso)
+            segmentos = _leer_manifiesto(destino)["segmentos"]
+            previa = next(iter(_cache.values()), None)
+            if previa is not None and previa[0] == segmentos[:-1]:
+                nuevos = _leer_segmentos(segmentos[-1:]).to_pandas()
+                datos = pd.concat([previa[1], nuevos], ignore_index=True)
+                extender_indices(previa[1], datos)
+            else:
+                datos = _leer_segmentos(segmentos).to_pandas()
+            entrada = (segmentos, datos)
+            _cache.clear()
+            _cache[destino] = entrada
+        return entrada[1]
+
+
+def catalogo_con_departamento(ruta_csv=RUTA_CSV, ruta_geojson=RUTA_DEPARTAMENTOS):
+    """Catálogo completo (también fuera de Perú) con el código ``CODDEP``.
+
+    A diferencia del archivo enriquecido, cada sismo aparece una sola vez:
+    en un límite compartido se queda con el primer departamento, y fuera de
+    Perú el código es -1. Devuelve ``(catálogo, nombres, versión, base)``;
+    ``base`` es ``(versión anterior, filas anteriores)`` cuando el catálogo
+    se obtuvo agregando filas nuevas al de la versión anterior, o ``None``.
+
+    Los códigos se calculan al parsear el catálogo compartido (ver
+    :func:`sismos.catalogo.cargar_codigos`); el DataFrame devuelto comparte
+    las columnas de ese catálogo y solo agrega ``CODDEP``.
+    """
+    from sismos.indice import extender_indices
+
+    datos, codigos, nombres, huella_csv, base = cargar_codigos(ruta_csv, ruta_geojson)
+    huella_geojson = huella_archivo(ruta_geojson)
+    version = (huella_csv, huella_geojson)
+    if base is not None:
+        base = ((base[0], huella_geojson), base[1])
+    with _lock:
+        entrada = _codificados.get(version)
+        if entrada is None or entrada["datos"] is not datos:
+            # Copia superficial: las columnas son las del catálogo compartido
+            catalogo = datos.copy(deep=False)
+            catalogo["CODDEP"] = codigos
+            previa = _codificados.get(base[0]) if base is not None else None
+            if previa is not None:
+                extender_indices(previa["catalogo"], catalogo)
+            entrada = {"datos": datos, "catalogo": catalogo, "nombres": nombres, "base": base}
+            _codificados.clear()
+            _codificados[version] = entrada
+        return entrada["catalogo"], entrada["nombres"], version, entrada["base"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera el catálogo enriquecido con departamentos.")
+    parser.add_argument("--procesos", type=int, help="procesos de la ingesta (por defecto, según el tamaño del CSV)")
+    args = parser.parse_args()
+    print(construir_enriquecido(progreso=lambda fraccion, filas: print(f"{fraccion:6.1%}  {filas:,} sismos"),
+                                procesos=args.procesos))
@@ -0,0 +1,175 @@
+"""Ley de Gutenberg–Richter y magnitud de completitud, vectorizadas.
+
+Todo se calcula sobre histogramas de magnitud en intervalos de 0.1 (la
+resolución del catálogo), tomados del cubo ``magnitud`` (ver
+:mod:`sismos.cubo`): sumando el eje de meses se obtiene un arreglo
+año × magnitud × departamento, y con sus sumas acumuladas a lo largo de los
+años salen los histogramas de todas las ventanas de tiempo a la vez. Cada
+rutina recibe histogramas de forma ``(..., K)`` y opera sobre todos los
+grupos (departamento × ventana) juntos:
+
+* Mc por máxima curvatura (Wiemer y Wyss, 2000) más una corrección.
+* Valor b por máxima verosimilitud (Aki, 1965; Utsu, 1966) con la
+  corrección por intervalos de ΔM/2, su error de Shi y Bolt (1982) y el
+  valor a.
+* Bootstrap: cada remuestreo de un catálogo de ``n`` sismos equivale a una
+  muestra multinomial de su histograma, así que todos los remuestreos de
+  todos los grupos se sacan con una sola llamada a ``multinomial`` y en
+  cada uno se vuelven a estimar Mc y b.
+"""
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+DELTA_M = 0.1
+CORRECCION_MC = 0.2
+MIN_EVENTOS = 50
+REMUESTREOS = 200
+# Celdas (remuestreo × grupo × intervalo) por bloque del bootstrap, para acotar la memoria
+CELDAS_POR_BLOQUE = 2_000_000
+TODO_EL_CATALOGO = "TODO EL CATÁLOGO"
+
+
+def mc_maxima_curvatura(conteos, magnitudes, correccion=CORRECCION_MC):
+    """Mc de cada histograma: el intervalo con más sismos más ``correccion``."""
+    return magnitudes[np.argmax(conteos, axis=-1)] + correccion
+
+
+def valor_b(conteos, magnitudes, mc):
+    """``(n, b, error de b, a)`` de cada histograma, con los sismos de magnitud ≥ Mc.
+
+    Los grupos con menos de ``MIN_EVENTOS`` sismos sobre Mc dan ``NaN``.
+    """
+    # Medio intervalo de margen para no depender del redondeo de 0.1
+    completos = conteos * (magnitudes >= np.asarray(mc)[..., None] - DELTA_M / 2)
+    n = completos.sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        media = (completos * magnitudes).sum(axis=-1) / n
+        b = np.log10(np.e) / (media - (mc - DELTA_M / 2))
+        varianza = (completos * (magnitudes - media[..., None]) ** 2).sum(axis=-1) / (n * (n - 1))
+        error = 2.3 * b ** 2 * np.sqrt(varianza)
+        a = np.log10(n) + b * mc
+    validos = n >= MIN_EVENTOS
+    return n, np.where(validos, b, np.nan), np.where(validos, error, np.nan), np.where(validos, a, np.nan)
+
+
+def bootstrap(conteos, magnitudes, remuestreos=REMUESTREOS, correccion=CORRECCION_MC, semilla=0):
+    """Desviación estándar de Mc y de b entre ``remuestreos`` remuestreos de cada grupo.
+
+    Los remuestreos se sacan por bloques de unas ``CELDAS_POR_BLOQUE``
+    celdas; de cada bloque solo se guardan Mc y b, así que la memoria no
+    crece con la cantidad de ventanas.
+    """
+    rng = np.random.default_rng(semilla)
+    n = conteos.sum(axis=-1)
+    # Un grupo vacío se remuestrea con n = 0; sus probabilidades solo deben ser válidas
+    probabilidades = np.where(n[..., None] > 0, conteos / np.maximum(n, 1)[..., None], 1.0 / conteos.shape[-1])
+    por_bloque = max(1, CELDAS_POR_BLOQUE // max(conteos.size, 1))
+    mc, b = [], []
+    for inicio in range(0, remuestreos, por_bloque):
+        muestras = rng.multinomial(n, probabilidades, size=(min(por_bloque, remuestreos - inicio),) + n.shape)
+        mc.append(mc_maxima_curvatura(muestras, magnitudes, correccion))
+        b.append(valor_b(muestras, magnitudes, mc[-1])[1])
+        del muestras
+    mc, b = np.concatenate(mc), np.concatenate(b)
+    with warnings.catch_warnings():
+        # Grupos sin ningún remuestreo válido: su desviación de b queda en NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.std(mc, axis=0), np.nanstd(b, axis=0)
+
+
+def ventanas(años, ancho, paso):
+    """Ventanas ``(desde, hasta)`` de ``ancho`` años que avanzan de a ``paso``.
+
+    La última ventana termina en el último año; si el periodo es más corto
+    que ``ancho``, hay una sola ventana con todo el periodo.
+    """
+    primero, ultimo = int(años[0]), int(años[-1])
+    inicios = list(range(primero, max(ultimo - ancho + 1, primero) + 1, paso))
+    if inicios[-1] + ancho - 1 < ultimo:
+        inicios.append(ultimo - ancho + 1)
+    return [(inicio, min(inicio + ancho - 1, ultimo)) for inicio in inicios]
+
+
+def histogramas_por_ventana(cubo, ancho=10, paso=5):
+    """Histogramas de magnitud de cada departamento en cada ventana de años.
+
+    Devuelve ``(grupos, ventanas, magnitudes, conteos)``, con ``conteos`` de
+    forma ``(grupos, ventanas, K)``. Los grupos son los departamentos del
+    cubo, ``FUERA DE PERÚ`` y ``TODO EL CATÁLOGO``.
+    """
+    ejes = {eje.nombre: eje for eje in cubo.ejes}
+    por_año = cubo.conteo.sum(axis=cubo.posicion["MES"], dtype="int64")  # año × magnitud × departamento
+    acumulado = np.concatenate([np.zeros((1,) + por_año.shape[1:], dtype="int64"), np.cumsum(por_año, axis=0)])
+
+    años = ejes["AÑO"].etiquetas
+    lista = ventanas(años, ancho, paso)
+    desde = np.array([d - int(años[0]) for d, _ in lista])
+    hasta = np.array([h - int(años[0]) + 1 for _, h in lista])
+    por_ventana = acumulado[hasta] - acumulado[desde]  # ventana × magnitud × departamento
+    conteos = np.concatenate([por_ventana, por_ventana.sum(axis=2, keepdims=True)], axis=2).transpose(2, 0, 1)
+
+    grupos = list(ejes["NOMBDEP"].etiquetas) + [TODO_EL_CATALOGO]
+    magnitudes = ejes["MAGNITUD"].etiquetas.astype("float64")
+    return grupos, lista, magnitudes, conteos
+
+
+def analizar(cubo, ancho=10, paso=5, remuestreos=REMUESTREOS, correccion=CORRECCION_MC, semilla=0):
+    """Mc, b y sus incertidumbres para todos los departamentos × ventanas.
+
+    Devuelve un DataFrame con una fila por grupo y ventana; ``N`` es la
+    cantidad de sismos con magnitud ≥ Mc.
+    """
+    grupos, lista, magnitudes, conteos = histogramas_por_ventana(cubo, ancho, paso)
+    mc = mc_maxima_curvatura(conteos, magnitudes, correccion)
+    n, b, error, a = valor_b(conteos, magnitudes, mc)
+    mc_boot, b_boot = bootstrap(conteos, magnitudes, remuestreos, correccion, semilla)
+    return pd.DataFrame({
+        "NOMBDEP": np.repeat(grupos, len(lista)),
+        "DESDE": np.tile([d for d, _ in lista], len(grupos)),
+        "HASTA": np.tile([h for _, h in lista], len(grupos)),
+        "TOTAL": conteos.sum(axis=-1).ravel(),
+        "N": n.ravel(),
+        "MC": np.round(mc.ravel(), 1),
+        "MC_BOOT": np.round(mc_boot.ravel(), 4),
+        "B": b.ravel(),
+        "B_ERROR": error.ravel(),
+        "B_BOOT": b_boot.ravel(),
+        "A": a.ravel(),
+    })
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def analisis_catalogo(ancho=10, paso=5, correccion=CORRECCION_MC, remuestreos=REMUESTREOS, sin_replicas=False):
+    """:func:`analizar` sobre el cubo actual, calculado una vez por versión de los datos.
+
+    Con ``sin_replicas`` se analiza el catálogo desagrupado.
+    """
+    from sismos.cubo import cargar_cubos
+    from sismos.render import version_datos
+
+    clave = (version_datos(), ancho, paso, round(float(correccion), 6), remuestreos, sin_replicas)
+    with _lock:
+        resultado = _cache.get(clave)
+        if resultado is None:
+            resultado = analizar(cargar_cubos(sin_replicas)["magnitud"], ancho, paso, remuestreos, correccion)
+            if len(_cache) >= 8:
+                _cache.pop(next(iter(_cache)))
+            _cache[clave] = resultado
+        return resultado
+
+
+def curva_frecuencia_magnitud(conteos, magnitudes):
+    """Frecuencia por intervalo y acumulada (sismos con magnitud ≥ M) de un histograma."""
+    return pd.DataFrame({
+        "MAGNITUD": np.round(magnitudes, 1),
+        "N": conteos,
+        "N_ACUMULADO": np.cumsum(conteos[::-1])[::-1],
+    })
+
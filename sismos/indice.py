@@ -0,0 +1,175 @@
+"""Índice de rangos sobre columnas ordenadas.
+
+Para cada columna filtrable se guarda la permutación que la ordena y los
+valores ya ordenados; un filtro por rango se resuelve con dos
+``np.searchsorted`` y devuelve un tramo de posiciones, sin recorrer el
+catálogo. Varios filtros se combinan partiendo del más selectivo y
+comprobando los demás solo sobre esas filas, y únicamente las filas que
+sobreviven se materializan en un DataFrame nuevo.
+
+Cuando al catálogo se le agregan filas al final, el índice se extiende
+insertando solo los valores nuevos en los arreglos ya ordenados.
+
+Las columnas categóricas (como ``NOMBDEP``) se indexan por su código; los
+filtros por lista de nombres se traducen a códigos antes de buscar.
+"""
+import threading
+
+import numpy as np
+
+
+def _como_columna(valor, tipo):
+    """Convierte un extremo del filtro al tipo de la columna.
+
+    Así ``MAGNITUD == 5.8`` sobre float32 compara contra ``float32(5.8)``,
+    igual que hace pandas con un ``float`` de Python.
+    """
+    if valor is None or tipo.kind != "f":
+        return valor
+    return tipo.type(valor)
+
+
+def _valores_columna(datos, columna):
+    """``(valores, categorías)``: las columnas categóricas se indexan por su código."""
+    serie = datos[columna]
+    if serie.dtype.name == "category":
+        return serie.cat.codes.to_numpy(), serie.cat.categories
+    return serie.to_numpy(), None
+
+
+class IndiceRangos:
+    """Permutaciones ordenadas de varias columnas de un DataFrame."""
+
+    def __init__(self, datos, columnas):
+        self.filas = len(datos)
+        self.valores = {}
+        self.orden = {}
+        self.ordenados = {}
+        self.categorias = {}
+        for columna in columnas:
+            valores, self.categorias[columna] = _valores_columna(datos, columna)
+            orden = np.argsort(valores, kind="stable")
+            self.valores[columna] = valores
+            self.orden[columna] = orden
+            self.ordenados[columna] = valores[orden]
+
+    def _tramos(self, columna, filtro):
+        """Tramos ``[desde, hasta)`` del orden de ``columna`` que cumplen el filtro.
+
+        El filtro es ``(mínimo, máximo)`` (extremos incluidos, ``None`` para
+        no acotar) o una lista de valores admitidos.
+        """
+        ordenados = self.ordenados[columna]
+        if isinstance(filtro, tuple):
+            minimo, maximo = (_como_columna(v, ordenados.dtype) for v in filtro)
+            desde = 0 if minimo is None else np.searchsorted(ordenados, minimo, side="left")
+            hasta = len(ordenados) if maximo is None else np.searchsorted(ordenados, maximo, side="right")
+            return [(int(desde), int(hasta))] if desde < hasta else []
+        valores = np.unique(np.asarray(list(filtro), dtype=ordenados.dtype))
+        desde = np.searchsorted(ordenados, valores, side="left")
+        hasta = np.searchsorted(ordenados, valores, side="right")
+        return [(int(d), int(h)) for d, h in zip(desde, hasta) if d < h]
+
+    def _cumple(self, columna, filtro, posiciones):
+        """Máscara de las posiciones dadas que cumplen el filtro."""
+        valores = self.valores[columna][posiciones]
+        if isinstance(filtro, tuple):
+            minimo, maximo = (_como_columna(v, valores.dtype) for v in filtro)
+            mascara = np.ones(len(posiciones), dtype=bool)
+            if minimo is not None:
+                mascara &= valores >= minimo
+            if maximo is not None:
+                mascara &= valores <= maximo
+            return mascara
+        return np.isin(valores, np.asarray(list(filtro), dtype=valores.dtype))
+
+    def _como_codigos(self, columna, filtro):
+        """Filtro por lista de nombres de una columna categórica, como lista de códigos."""
+        categorias = self.categorias.get(columna)
+        if categorias is None or isinstance(filtro, tuple):
+            return filtro
+        codigos = categorias.get_indexer(list(filtro))
+        return codigos[codigos >= 0].tolist()
+
+    def posiciones(self, filtros):
+        """Posiciones (ordenadas) de las filas que cumplen todos los filtros."""
+        if not filtros:
+            return np.arange(self.filas)
+        filtros = {columna: self._como_codigos(columna, filtro) for columna, filtro in filtros.items()}
+        tramos = {columna: self._tramos(columna, filtro) for columna, filtro in filtros.items()}
+        tamanos = {columna: sum(h - d for d, h in t) for columna, t in tramos.items()}
+        inicial = min(tamanos, key=tamanos.get)
+        orden = self.orden[inicial]
+        seleccion = np.concatenate([orden[d:h] for d, h in tramos[inicial]] or [np.empty(0, dtype=orden.dtype)])
+        for columna in sorted(filtros, key=tamanos.get):
+            if columna == inicial or len(seleccion) == 0:
+                continue
+            if tamanos[columna] == self.filas:
+                # El filtro no descarta nada
+                continue
+            seleccion = seleccion[self._cumple(columna, filtros[columna], seleccion)]
+        return np.sort(seleccion)
+
+    def extendido(self, datos):
+        """Índice de ``datos``, que son las filas indexadas más otras al final.
+
+        Los valores nuevos se ordenan y se insertan con ``np.searchsorted``;
+        el resultado es el mismo que ordenar todo de nuevo.
+        """
+        nuevo = IndiceRangos.__new__(IndiceRangos)
+        nuevo.filas = len(datos)
+        nuevo.valores, nuevo.orden, nuevo.ordenados = {}, {}, {}
+        nuevo.categorias = dict(self.categorias)
+        for columna, ordenados in self.ordenados.items():
+            valores, _ = _valores_columna(datos, columna)
+            agregados = valores[self.filas:]
+            orden = np.argsort(agregados, kind="stable")
+            # side="right": ante empates, las filas viejas quedan antes, como en un orden estable
+            lugares = np.searchsorted(ordenados, agregados[orden], side="right")
+            nuevo.valores[columna] = valores
+            nuevo.orden[columna] = np.insert(self.orden[columna], lugares, orden + self.filas)
+            nuevo.ordenados[columna] = np.insert(ordenados, lugares, agregados[orden])
+        return nuevo
+
+    def filtrar(self, datos, filtros):
+        """Solo las filas de ``datos`` que cumplen los filtros."""
+        return datos.take(self.posiciones(filtros))
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def indice_para(datos, columnas):
+    """Índice de ``datos`` construido una sola vez por objeto DataFrame.
+
+    Los cargadores del catálogo devuelven el mismo objeto mientras los datos
+    no cambien, así que el índice se reutiliza entre reruns y sesiones.
+    """
+    clave = (id(datos), tuple(columnas))
+    with _lock:
+        entrada = _cache.get(clave)
+        if entrada is None or entrada[0] is not datos:
+            entrada = (datos, IndiceRangos(datos, columnas))
+            # Se conservan pocas versiones para no retener catálogos viejos
+            if len(_cache) >= 8:
+                _cache.pop(next(iter(_cache)))
+            _cache[clave] = entrada
+        return entrada[1]
+
+
+def extender_indices(previos, datos):
+    """Registra para ``datos`` los índices de ``previos`` extendidos con las filas nuevas.
+
+    ``datos`` debe ser ``previos`` con filas agregadas al final.
+    """
+    with _lock:
+        extendidos = [
+            (columnas, indice.extendido(datos))
+            for (_, columnas), (indexados, indice) in list(_cache.items())
+            if indexados is previos
+        ]
+        for columnas, indice in extendidos:
+            if len(_cache) >= 8:
+                _cache.pop(next(iter(_cache)))
+            _cache[(id(datos), columnas)] = (datos, indice)
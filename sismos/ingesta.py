@@ -0,0 +1,207 @@
+"""Ingesta por lotes de catálogos sísmicos grandes.
+
+El CSV se lee en lotes de tamaño fijo; cada lote se transforma (parseo de
+fechas y números, asignación de departamento) y se agrega como un
+``RecordBatch`` a un archivo Arrow IPC (Feather v2 sin compresión) en
+disco. En memoria solo hay un lote a la vez, así que el consumo máximo no
+depende del tamaño del catálogo. El resultado se puede abrir con
+``pyarrow.feather.read_table(..., memory_map=True)``.
+
+Para catálogos grandes, :func:`ingerir_csv_paralelo` reparte el CSV en
+tramos de bytes que terminan en un salto de línea y procesa cada tramo en un
+``ProcessPoolExecutor``. Cada proceso lee su tramo directamente del archivo
+y devuelve el resultado como un flujo Arrow IPC, que el proceso principal
+escribe sin convertirlo de nuevo a pandas. Los tramos se escriben en el
+orden del archivo, así que el resultado es el mismo que el de la ingesta en
+serie.
+"""
+import collections
+import concurrent.futures
+import io
+import multiprocessing
+import os
+
+import pandas as pd
+
+from sismos.catalogo import TIPOS_CSV
+
+
+TAMANO_LOTE = 200_000
+# Bytes del CSV por tarea en la ingesta paralela (unas 200 mil filas)
+BYTES_POR_TAREA = 16 * 2**20
+
+
+def leer_por_lotes(ruta_csv, tamano_lote=TAMANO_LOTE):
+    """Genera ``(lote, fracción leída)`` con las filas crudas del CSV."""
+    total = os.path.getsize(ruta_csv) or 1
+    with open(ruta_csv, "rb") as archivo:
+        for lote in pd.read_csv(archivo, dtype=TIPOS_CSV, chunksize=tamano_lote):
+            yield lote, min(archivo.tell() / total, 1.0)
+
+
+def escribir_lotes(lotes, destino):
+    """Escribe DataFrames con el mismo esquema como un archivo Arrow IPC.
+
+    Devuelve la cantidad de filas escritas.
+    """
+    import pyarrow as pa
+
+    def tablas():
+        esquema = None
+        for lote in lotes:
+            if esquema is None:
+                esquema = pa.Schema.from_pandas(lote, preserve_index=False)
+            yield pa.Table.from_pandas(lote, schema=esquema, preserve_index=False)
+
+    return escribir_tablas(tablas(), destino)
+
+
+def escribir_tablas(tablas, destino):
+    """Escribe tablas Arrow como un archivo Arrow IPC.
+
+    El esquema es el de la primera tabla con filas (una tabla vacía puede
+    tener columnas sin tipo). Devuelve la cantidad de filas escritas.
+    """
+    import pyarrow as pa
+
+    escritor = None
+    esquema = None
+    primera = None
+    filas = 0
+    try:
+        with pa.OSFile(destino, "wb") as salida:
+            for tabla in tablas:
+                if primera is None:
+                    primera = tabla.schema
+                if not tabla.num_rows:
+                    continue
+                if escritor is None:
+                    esquema = tabla.schema
+                    escritor = pa.ipc.new_file(salida, esquema)
+                escritor.write_table(tabla.cast(esquema))
+                filas += tabla.num_rows
+            if escritor is None and primera is not None:
+                escritor = pa.ipc.new_file(salida, primera)
+            if escritor is not None:
+                escritor.close()
+    except BaseException:
+        if os.path.exists(destino):
+            os.remove(destino)
+        raise
+    return filas
+
+
+def ingerir_csv(ruta_csv, destino, transformar, tamano_lote=TAMANO_LOTE, progreso=None):
+    """Lee ``ruta_csv`` por lotes, aplica ``transformar`` y guarda en ``destino``.
+
+    ``transformar`` recibe las filas crudas de un lote y devuelve el
+    DataFrame a guardar. ``progreso(fracción, filas)`` se llama tras cada
+    lote, por ejemplo para actualizar un ``st.progress``. Devuelve
+    ``(filas escritas, mayor ID leído)``; el ID sirve para reconocer
+    después las filas agregadas al CSV.
+    """
+    filas = [0]
+    ultimo_id = [-1]
+
+    def transformados():
+        for lote, fraccion in leer_por_lotes(ruta_csv, tamano_lote):
+            if len(lote):
+                ultimo_id[0] = max(ultimo_id[0], int(lote["ID"].max()))
+            resultado = transformar(lote)
+            yield resultado
+            filas[0] += len(resultado)
+            if progreso is not None:
+                progreso(fraccion, filas[0])
+
+    escribir_lotes(transformados(), destino)
+    return filas[0], ultimo_id[0]
+
+
+def tramos_csv(ruta_csv, bytes_por_tramo=BYTES_POR_TAREA):
+    """Tramos ``(desde, hasta)`` de bytes del CSV, sin el encabezado.
+
+    Cada tramo empieza al inicio de una línea y termina después de un salto
+    de línea (o al final del archivo).
+    """
+    total = os.path.getsize(ruta_csv)
+    tramos = []
+    with open(ruta_csv, "rb") as archivo:
+        archivo.readline()
+        desde = archivo.tell()
+        while desde < total:
+            archivo.seek(min(desde + bytes_por_tramo, total))
+            if archivo.tell() < total:
+                archivo.readline()
+            hasta = archivo.tell()
+            tramos.append((desde, hasta))
+            desde = hasta
+    return tramos
+
+
+def leer_tramo(ruta_csv, desde, hasta):
+    """Filas crudas de un tramo de bytes del CSV."""
+    with open(ruta_csv, "rb") as archivo:
+        encabezado = archivo.readline()
+        archivo.seek(desde)
+        contenido = archivo.read(hasta - desde)
+    return pd.read_csv(io.BytesIO(encabezado + contenido), dtype=TIPOS_CSV)
+
+
+def _procesar_tramo(transformar, ruta_csv, desde, hasta):
+    """Tarea de un proceso: devuelve ``(flujo Arrow IPC, mayor ID leído)``."""
+    import pyarrow as pa
+
+    crudo = leer_tramo(ruta_csv, desde, hasta)
+    tabla = pa.Table.from_pandas(transformar(crudo), preserve_index=False)
+    salida = pa.BufferOutputStream()
+    with pa.ipc.new_stream(salida, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    return salida.getvalue().to_pybytes(), int(crudo["ID"].max()) if len(crudo) else -1
+
+
+def ingerir_csv_paralelo(ruta_csv, destino, transformar, inicializar=None, argumentos=(),
+                         procesos=None, bytes_por_tramo=BYTES_POR_TAREA, progreso=None):
+    """Como :func:`ingerir_csv`, pero repartiendo los tramos entre procesos.
+
+    ``transformar`` debe ser una función de nivel de módulo (se envía por
+    referencia a los procesos). ``inicializar(*argumentos)`` se ejecuta una
+    vez en cada proceso antes de la primera tarea, por ejemplo para recibir
+    los polígonos de los departamentos. Como mucho hay dos tareas en curso
+    por proceso, así que la memoria no crece con el tamaño del CSV.
+    """
+    import pyarrow as pa
+
+    procesos = procesos or os.cpu_count() or 1
+    tramos = tramos_csv(ruta_csv, bytes_por_tramo)
+    total = tramos[-1][1] if tramos else 1
+    filas = [0]
+    ultimo_id = [-1]
+
+    def tablas(ejecutor):
+        pendientes = collections.deque()
+        siguientes = iter(tramos)
+
+        def enviar():
+            for desde, hasta in siguientes:
+                pendientes.append((hasta, ejecutor.submit(_procesar_tramo, transformar, ruta_csv, desde, hasta)))
+                return
+
+        for _ in range(2 * procesos):
+            enviar()
+        while pendientes:
+            hasta, futuro = pendientes.popleft()
+            enviar()
+            flujo, mayor_id = futuro.result()
+            tabla = pa.ipc.open_stream(flujo).read_all()
+            ultimo_id[0] = max(ultimo_id[0], mayor_id)
+            yield tabla
+            filas[0] += tabla.num_rows
+            if progreso is not None:
+                progreso(min(hasta / total, 1.0), filas[0])
+
+    # spawn y no fork: la app corre en un servidor con varios hilos
+    contexto = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(procesos, mp_context=contexto, initializer=inicializar,
+                                                initargs=argumentos) as ejecutor:
+        escribir_tablas(tablas(ejecutor), destino)
+    return filas[0], ultimo_id[0]
@@ -0,0 +1,145 @@
+"""Capa de límites departamentales simplificada según el zoom.
+
+El GeoJSON de los departamentos se simplifica a varios niveles con
+``shapely.coverage_simplify``, que trata los polígonos como una cobertura:
+los límites compartidos se simplifican una sola vez, así que entre
+departamentos vecinos no aparecen huecos ni solapamientos (requiere
+Shapely 2.1 con GEOS 3.12; con versiones anteriores se simplifica cada
+polígono por separado con ``shapely.simplify``). Cada nivel se
+serializa una sola vez por versión del archivo (un texto GeoJSON por
+departamento, con las coordenadas redondeadas) y la capa se arma
+concatenando esos textos. Con zoom alto solo se envían los departamentos
+que tocan la vista.
+
+El estilo se resuelve en el navegador con una función de JavaScript que
+recibe la lista de departamentos seleccionados, en lugar de llamar a una
+función de Python por cada entidad.
+"""
+import json
+import threading
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+from sismos.catalogo import RUTA_DEPARTAMENTOS, huella_archivo
+
+
+# (zoom máximo, tolerancia de coverage_simplify en grados, decimales de las coordenadas)
+NIVELES = [
+    (5, 0.12, 3),
+    (7, 0.05, 3),
+    (9, 0.02, 4),
+    (None, 0.0, 5),
+]
+# Desde este zoom solo se envían los departamentos visibles
+ZOOM_RECORTE = 8
+
+ESTILO_SELECCIONADO = {"fillColor": "#ff7800", "color": "red", "weight": 3, "fillOpacity": 0.5}
+ESTILO_NORMAL = {"fillColor": "#14c7c1", "color": "black", "fillOpacity": 0.3}
+
+
+def _simplificar(geometrias, tolerancia):
+    """``coverage_simplify`` si está disponible; si no, ``simplify`` polígono por polígono.
+
+    El segundo no comparte los límites entre vecinos, así que con
+    tolerancias grandes pueden verse pequeños huecos entre departamentos.
+    """
+    if hasattr(shapely, "coverage_simplify") and shapely.geos_version >= (3, 12, 0):
+        return shapely.coverage_simplify(geometrias, tolerancia)
+    return shapely.simplify(geometrias, tolerancia, preserve_topology=True)
+
+
+def nivel_para_zoom(zoom):
+    """Posición en ``NIVELES`` del nivel de detalle para un zoom de Leaflet."""
+    for posicion, (zoom_maximo, _, _) in enumerate(NIVELES):
+        if zoom_maximo is None or zoom <= zoom_maximo:
+            return posicion
+    return len(NIVELES) - 1
+
+
+class LimitesDepartamentos:
+    """Textos GeoJSON de cada departamento en cada nivel de detalle."""
+
+    def __init__(self, nombres, geometrias):
+        self.nombres = list(nombres)
+        geometrias = np.asarray(geometrias, dtype=object)
+        self.cajas = shapely.bounds(geometrias)
+        self.niveles = []
+        for _, tolerancia, decimales in NIVELES:
+            simplificadas = _simplificar(geometrias, tolerancia) if tolerancia else geometrias
+            redondeadas = shapely.transform(simplificadas, lambda xy, d=decimales: np.round(xy, d))
+            self.niveles.append([
+                '{"type":"Feature","properties":{"NOMBDEP":%s},"geometry":%s}' % (json.dumps(nombre), geometria)
+                for nombre, geometria in zip(self.nombres, shapely.to_geojson(redondeadas))
+            ])
+
+    @classmethod
+    def desde_geojson(cls, ruta=RUTA_DEPARTAMENTOS):
+        with open(ruta, encoding="utf-8") as archivo:
+            entidades = json.load(archivo)["features"]
+        nombres = [entidad["properties"]["NOMBDEP"] for entidad in entidades]
+        return cls(nombres, [shape(entidad["geometry"]) for entidad in entidades])
+
+    def geojson(self, zoom, limites=None):
+        """FeatureCollection (texto) para un zoom y, opcionalmente, una vista.
+
+        ``limites`` es la vista ``(oeste, sur, este, norte)``; solo se usa
+        desde ``ZOOM_RECORTE``, donde los polígonos tienen todo su detalle.
+        """
+        entidades = self.niveles[nivel_para_zoom(zoom)]
+        if limites is not None and zoom >= ZOOM_RECORTE:
+            oeste, sur, este, norte = limites
+            visibles = ((self.cajas[:, 0] <= este) & (self.cajas[:, 2] >= oeste)
+                        & (self.cajas[:, 1] <= norte) & (self.cajas[:, 3] >= sur))
+            entidades = [entidad for entidad, visible in zip(entidades, visibles) if visible]
+        return '{"type":"FeatureCollection","features":[%s]}' % ",".join(entidades)
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def cargar_limites(ruta=RUTA_DEPARTAMENTOS):
+    """Límites simplificados, calculados una vez por versión del GeoJSON."""
+    version = huella_archivo(ruta)
+    with _lock:
+        limites = _cache.get(version)
+        if limites is None:
+            limites = LimitesDepartamentos.desde_geojson(ruta)
+            _cache.clear()
+            _cache[version] = limites
+        return limites
+
+
+def capa_limites_folium(zoom, seleccion, limites=None, ruta=RUTA_DEPARTAMENTOS):
+    """Capa de Leaflet con los límites para el zoom (y la vista) actuales.
+
+    ``seleccion`` son los nombres de los departamentos resaltados; si
+    incluye ``"Todos"`` se resaltan todos.
+    """
+    from branca.element import MacroElement
+    from jinja2 import Template
+
+    class CapaLimites(MacroElement):
+        _template = Template("""
+            {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.geoJson({{ this.datos }}, {
+                style: function(feature) {
+                    var resaltado = {{ this.todos }} || {{ this.seleccion }}.indexOf(feature.properties.NOMBDEP) >= 0;
+                    return resaltado ? {{ this.estilo_seleccionado }} : {{ this.estilo_normal }};
+                }
+            }).addTo({{ this._parent.get_name() }});
+            {% endmacro %}
+        """)
+
+        def __init__(self, datos):
+            super().__init__()
+            self._name = "DEPARTAMENTO"
+            self.datos = datos
+            self.todos = json.dumps("Todos" in seleccion)
+            self.seleccion = json.dumps(list(seleccion), ensure_ascii=False)
+            self.estilo_seleccionado = json.dumps(ESTILO_SELECCIONADO)
+            self.estilo_normal = json.dumps(ESTILO_NORMAL)
+
+    return CapaLimites(cargar_limites(ruta).geojson(zoom, limites))
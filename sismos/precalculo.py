@@ -0,0 +1,129 @@
+"""Precálculo en segundo plano de lo que necesitan las páginas.
+
+Al arrancar, la app llama a :func:`iniciar`, que lanza en un hilo de fondo
+la carga de los límites, del catálogo, del catálogo enriquecido (lo más
+caro: el ``sjoin`` la primera vez con cada versión de los datos), de los
+índices de rangos, de los cubos y del índice espacial. Cada etapa llena las
+mismas cachés de proceso que usan las páginas, así que al terminar todas
+las sesiones las encuentran listas.
+
+Hay un solo trabajo por versión de los datos: las sesiones que llegan
+mientras corre reciben el mismo ``Future`` y pueden esperarlo (ver
+:func:`esperar`) o consultar su avance con :func:`estado` en lugar de
+repetir el trabajo. Si una página pide algo antes de que el trabajo llegue
+a esa etapa, lo calcula ella y el trabajo lo encuentra hecho; los candados
+de cada caché evitan que se calcule dos veces.
+"""
+import concurrent.futures
+import threading
+import time
+
+from sismos.diagnostico import PROCESO
+
+
+_ejecutor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="precalculo")
+_trabajos = {}
+_estado = {}
+_lock = threading.Lock()
+
+
+def _avanzar(version, **cambios):
+    with _lock:
+        _estado.setdefault(version, {"etapa": "En cola", "fraccion": None, "filas": None, "hechas": set()})
+        _estado[version].update(cambios)
+
+
+def _etapas():
+    """``(clave, descripción, función)`` de cada etapa, en el orden en que se ejecutan.
+
+    Cada función recibe ``avance(fracción, filas)`` para informar su progreso.
+    """
+    from sismos.catalogo import cargar_catalogo
+    from sismos.cercanos import indice_espacial
+    from sismos.consultas import COLUMNAS, COLUMNAS_PERU
+    from sismos.cubo import cargar_cubos
+    from sismos.enriquecido import cargar_enriquecido, catalogo_con_departamento
+    from sismos.indice import indice_para
+    from sismos.limites import cargar_limites
+
+    def catalogo(avance):
+        datos = cargar_catalogo()
+        indice_para(datos, COLUMNAS)
+        indice_espacial(datos)
+
+    def enriquecido(avance):
+        indice_para(cargar_enriquecido(progreso=avance), COLUMNAS_PERU)
+
+    return [
+        ("limites", "Límites de los departamentos", lambda avance: cargar_limites()),
+        ("catalogo", "Catálogo e índices", catalogo),
+        ("enriquecido", "Sismos por departamento", enriquecido),
+        ("cubos", "Cubos de conteos", lambda avance: (catalogo_con_departamento(), cargar_cubos())),
+    ]
+
+
+def _precalcular(version):
+    # El hilo de fondo no hereda el diagnóstico de ninguna sesión: se registra solo en el del proceso
+    for clave, descripcion, funcion in _etapas():
+        _avanzar(version, etapa=descripcion, fraccion=None, filas=None)
+        inicio = time.perf_counter()
+        funcion(lambda fraccion, filas: _avanzar(version, fraccion=fraccion, filas=filas))
+        PROCESO.agregar(f"precalculo.{clave}", time.perf_counter() - inicio)
+        with _lock:
+            _estado[version]["hechas"].add(clave)
+    _avanzar(version, etapa="Listo", fraccion=1.0)
+    return version
+
+
+def iniciar():
+    """``Future`` del precálculo de la versión actual de los datos, lanzándolo si hace falta.
+
+    Se puede llamar en cada ejecución de la app: mientras el trabajo de esta
+    versión esté en curso o haya terminado bien, se devuelve el mismo. Uno
+    que terminó con error se vuelve a lanzar.
+    """
+    from sismos.render import version_datos
+
+    version = version_datos()
+    with _lock:
+        futuro = _trabajos.get(version)
+        if futuro is None or (futuro.done() and futuro.exception() is not None):
+            _trabajos.clear()
+            _estado.pop(version, None)
+            futuro = _trabajos[version] = _ejecutor.submit(_precalcular, version)
+        return futuro
+
+
+def listo():
+    """Indica si el precálculo de la versión actual ya terminó sin errores."""
+    futuro = iniciar()
+    return futuro.done() and futuro.exception() is None
+
+
+def estado():
+    """Avance del precálculo actual.
+
+    ``{"etapa", "fraccion", "filas", "hechas"}``: la descripción de la etapa
+    en curso, su avance si lo informa (o ``None``) y las claves de las
+    etapas terminadas.
+    """
+    from sismos.render import version_datos
+
+    with _lock:
+        actual = _estado.get(version_datos(), {"etapa": "En cola", "fraccion": None, "filas": None, "hechas": set()})
+        return dict(actual, hechas=set(actual["hechas"]))
+
+
+def esperar(hasta=None, avance=None, intervalo=0.25):
+    """Espera a que termine el precálculo de la versión actual, o solo la etapa ``hasta``.
+
+    ``avance(estado)`` se llama cada ``intervalo`` segundos mientras tanto,
+    para mostrar el progreso. Si el precálculo falló, se relanza su error.
+    """
+    futuro = iniciar()
+    while not futuro.done() and (hasta is None or hasta not in estado()["hechas"]):
+        if avance is not None:
+            avance(estado())
+        concurrent.futures.wait([futuro], timeout=intervalo)
+    if futuro.done():
+        futuro.result()
@@ -0,0 +1,105 @@
+"""Caché de renders compartida entre sesiones.
+
+Guarda el resultado serializado de un gráfico o de una capa de mapa (JSON de
+Plotly, texto GeoJSON, bytes PNG) bajo una clave formada por la página, el
+tipo de gráfico, los filtros normalizados y la versión de los datos. Vive a
+nivel de proceso, así que una vista que ya pidió otra sesión se sirve sin
+volver a construir la figura. Se descartan primero las entradas usadas hace
+más tiempo (LRU) cuando el total pasa del presupuesto de memoria.
+"""
+import collections
+import numbers
+import threading
+
+from sismos.catalogo import RUTA_CSV, RUTA_DEPARTAMENTOS, huella_archivo
+
+
+PRESUPUESTO_BYTES = 256 * 2**20
+
+
+def normalizar(valor):
+    """Forma canónica y hashable de un filtro.
+
+    Las listas se tratan como conjuntos (sin orden ni repetidos), los
+    diccionarios se ordenan por clave y los números se comparan como
+    ``float``, de modo que ``[2, 1]`` y ``[1, 2, 2]`` o ``5`` y ``5.0`` dan la
+    misma clave.
+    """
+    if isinstance(valor, dict):
+        return tuple(sorted((clave, normalizar(v)) for clave, v in valor.items()))
+    if isinstance(valor, (list, set, frozenset)):
+        return tuple(sorted({normalizar(v) for v in valor}, key=repr))
+    if isinstance(valor, tuple):
+        return tuple(normalizar(v) for v in valor)
+    if isinstance(valor, numbers.Number) and not isinstance(valor, bool):
+        return round(float(valor), 6)
+    return valor
+
+
+def version_datos():
+    """Versión del CSV y del GeoJSON; cambia la clave cuando cambian los datos."""
+    return (huella_archivo(RUTA_CSV)[:16], huella_archivo(RUTA_DEPARTAMENTOS)[:16])
+
+
+class CacheRender:
+    """LRU de valores ``bytes`` o ``str`` con un límite de memoria total."""
+
+    def __init__(self, presupuesto=PRESUPUESTO_BYTES):
+        self.presupuesto = presupuesto
+        self.entradas = collections.OrderedDict()
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, construir):
+        """Valor guardado para ``clave``; si no está, lo construye y lo guarda.
+
+        La construcción ocurre fuera del candado, para no frenar a las demás
+        sesiones; si dos sesiones piden a la vez la misma vista, ambas la
+        construyen y se guarda una.
+        """
+        with self._lock:
+            valor = self.entradas.get(clave)
+            if valor is not None:
+                self.entradas.move_to_end(clave)
+                self.aciertos += 1
+                return valor
+            self.fallos += 1
+        valor = construir()
+        tamano = len(valor)
+        with self._lock:
+            if clave not in self.entradas and tamano <= self.presupuesto:
+                self.entradas[clave] = valor
+                self.bytes += tamano
+                while self.bytes > self.presupuesto:
+                    _, viejo = self.entradas.popitem(last=False)
+                    self.bytes -= len(viejo)
+        return valor
+
+    def estadisticas(self):
+        with self._lock:
+            return {"entradas": len(self.entradas), "bytes": self.bytes,
+                    "aciertos": self.aciertos, "fallos": self.fallos}
+
+    def limpiar(self):
+        with self._lock:
+            self.entradas.clear()
+            self.bytes = 0
+
+
+_cache = CacheRender()
+
+
+def renderizado(pagina, tipo, filtros, construir):
+    """Render de ``(página, tipo, filtros)`` para la versión actual de los datos.
+
+    ``construir()`` debe devolver el render ya serializado (``str`` o ``bytes``).
+    """
+    clave = (pagina, tipo, normalizar(filtros), version_datos())
+    return _cache.obtener(clave, construir)
+
+
+def estadisticas():
+    """Entradas, bytes ocupados, aciertos y fallos de la caché de renders."""
+    return _cache.estadisticas()
@@ -0,0 +1,223 @@
+"""Tasa de sismos en el tiempo: ventanas móviles y detección de anomalías.
+
+El catálogo se agrupa una sola vez en una matriz densa día × departamento
+con la cantidad de sismos y la energía liberada, más sus sumas acumuladas a
+lo largo de los días. El conteo (o la energía) de cualquier ventana de
+``w`` días que termina en cada día sale de restar dos filas de los
+acumulados, así que cambiar el largo de la ventana o el departamento no
+vuelve a recorrer los sismos.
+
+La energía se estima con la relación de Gutenberg y Richter (1956),
+``log10 E = 1.5 M + 4.8`` (E en joules).
+
+Una ventana es anómala si su conteo es muy improbable para un proceso de
+Poisson con la tasa de fondo del departamento, medida en los ``fondo`` días
+anteriores a la ventana. Usar la tasa reciente y no la de todo el periodo
+evita que los cambios en la cobertura de la red sismológica entre 1960 y
+2023 parezcan enjambres. Las ventanas anómalas consecutivas se unen en un
+episodio (enjambre o secuencia). Con el catálogo sin réplicas (ver
+:mod:`sismos.desagrupamiento`) quedan los aumentos de tasa que no se
+explican por las réplicas de un sismo mayor.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from sismos.cubo import FUERA_DE_PERU
+from sismos.gutenberg_richter import TODO_EL_CATALOGO
+
+
+SEGUNDOS_POR_DIA = 86400
+FONDO_DIAS = 5 * 365
+UMBRAL_P = 1e-3
+MIN_SISMOS = 5
+
+
+def energia_joules(magnitudes):
+    """Energía liberada (J) por sismo según ``log10 E = 1.5 M + 4.8``."""
+    return 10 ** (1.5 * np.asarray(magnitudes, dtype="float64") + 4.8)
+
+
+def _acumular(matriz):
+    """Sumas de prefijos a lo largo de los días, con una fila de ceros al inicio."""
+    acumulado = np.zeros((matriz.shape[0] + 1, matriz.shape[1]), dtype=matriz.dtype)
+    np.cumsum(matriz, axis=0, out=acumulado[1:])
+    return acumulado
+
+
+class SerieDiaria:
+    """Sismos y energía por día y por grupo (departamentos, fuera de Perú y el total)."""
+
+    def __init__(self, inicio, grupos, conteos, energia):
+        self.inicio = np.datetime64(inicio, "D")
+        self.grupos = list(grupos)
+        self.posicion = {grupo: i for i, grupo in enumerate(self.grupos)}
+        self.conteos = conteos
+        self.energia = energia
+        self._acumulado_conteos = _acumular(conteos.astype("int64"))
+        self._acumulado_energia = _acumular(energia)
+
+    @classmethod
+    def construir(cls, tiempos, magnitudes, codigos, departamentos):
+        """Agrupa los sismos por día y departamento.
+
+        ``tiempos`` en segundos desde 1970; ``codigos`` es la posición en
+        ``departamentos`` (-1 fuera de Perú).
+        """
+        dias = np.floor_divide(np.asarray(tiempos, dtype="int64"), SEGUNDOS_POR_DIA)
+        primero = int(dias.min()) if len(dias) else 0
+        cantidad = int(dias.max()) - primero + 1 if len(dias) else 1
+        columnas = len(departamentos) + 1
+        codigos = np.asarray(codigos)
+        plano = (dias - primero) * columnas + np.where(codigos < 0, len(departamentos), codigos)
+        forma = (cantidad, columnas)
+        conteos = np.bincount(plano, minlength=cantidad * columnas).reshape(forma)
+        energia = np.bincount(plano, weights=energia_joules(magnitudes), minlength=cantidad * columnas).reshape(forma)
+        conteos = np.column_stack([conteos, conteos.sum(axis=1)]).astype("int32")
+        energia = np.column_stack([energia, energia.sum(axis=1)])
+        grupos = list(departamentos) + [FUERA_DE_PERU, TODO_EL_CATALOGO]
+        return cls(np.datetime64(primero, "D"), grupos, conteos, energia)
+
+    def __len__(self):
+        return self.conteos.shape[0]
+
+    def dias(self, desde=0):
+        """Fechas de los días a partir de la posición ``desde``."""
+        return self.inicio + np.arange(desde, len(self))
+
+    def columnas(self, grupos=None):
+        """Posiciones y nombres de ``grupos`` (uno, una lista o todos si es ``None``)."""
+        if grupos is None:
+            return np.arange(len(self.grupos)), list(self.grupos)
+        grupos = [grupos] if isinstance(grupos, str) else list(grupos)
+        return np.array([self.posicion[grupo] for grupo in grupos], dtype="int64"), grupos
+
+    def suma(self, desde, hasta, grupos=None):
+        """Sismos y energía de los días ``[desde, hasta)`` de cada grupo.
+
+        ``desde`` y ``hasta`` son posiciones de días y pueden ser arreglos;
+        el resultado tiene su forma más un último eje por grupo.
+        """
+        columnas, _ = self.columnas(grupos)
+        desde, hasta = np.asarray(desde), np.asarray(hasta)
+        conteos = self._acumulado_conteos[hasta][..., columnas] - self._acumulado_conteos[desde][..., columnas]
+        energia = self._acumulado_energia[hasta][..., columnas] - self._acumulado_energia[desde][..., columnas]
+        # La resta de acumulados en float64 puede dar un cero negativo
+        return conteos, np.maximum(energia, 0.0)
+
+    def ventana_movil(self, ancho, grupos=None):
+        """Sismos y energía de la ventana de ``ancho`` días que termina en cada día.
+
+        Devuelve arreglos ``(días, grupos)``; los primeros ``ancho - 1`` días
+        no tienen una ventana completa y se omiten (la fila 0 corresponde al
+        día ``ancho - 1``, ver :meth:`dias`).
+        """
+        ancho = max(1, min(int(ancho), len(self)))
+        finales = np.arange(ancho, len(self) + 1)
+        return self.suma(finales - ancho, finales, grupos)
+
+
+def _p_poisson(observados, esperados):
+    """Probabilidad de ver ``observados`` sismos o más con media ``esperados``."""
+    from scipy.stats import poisson
+
+    return poisson.sf(observados - 1, esperados)
+
+
+def detectar_anomalias(serie, ancho, fondo=FONDO_DIAS, umbral=UMBRAL_P, minimo=MIN_SISMOS, grupos=None):
+    """Ventanas con una tasa muy por encima del fondo.
+
+    Para cada día ``t`` y grupo, ``k`` es la cantidad de sismos en los
+    ``ancho`` días que terminan en ``t`` y la tasa de fondo es la de los
+    ``fondo`` días anteriores a esa ventana. Se marca la ventana si
+    ``k >= minimo`` y ``P(X >= k) < umbral`` para ``X ~ Poisson(tasa · ancho)``.
+    Las ventanas con menos historia que ``min(fondo, ancho)`` días no se marcan.
+
+    Devuelve ``(ventanas, episodios)``. ``ventanas`` tiene una fila por día
+    y columnas ``(campo, grupo)`` con ``SISMOS``, ``ESPERADOS``, ``Z`` y
+    ``ANOMALA``; ``episodios`` tiene una fila por cada tramo de ventanas
+    anómalas consecutivas de un grupo.
+    """
+    _, nombres = serie.columnas(grupos)
+    ancho = max(1, min(int(ancho), len(serie)))
+    fondo = max(1, int(fondo))
+    finales = np.arange(ancho, len(serie) + 1)
+    observados, _ = serie.suma(finales - ancho, finales, grupos)
+    inicio_fondo = np.maximum(finales - ancho - fondo, 0)
+    en_fondo, _ = serie.suma(inicio_fondo, finales - ancho, grupos)
+    dias_fondo = (finales - ancho - inicio_fondo)[:, None]
+    # Sin sismos de fondo se supone medio sismo en el periodo, para no dividir por cero
+    esperados = np.maximum(en_fondo, 0.5) / np.maximum(dias_fondo, 1) * ancho
+    z = (observados - esperados) / np.sqrt(esperados)
+
+    p = np.ones(observados.shape)
+    candidatas = (observados >= minimo) & (observados > esperados) & (dias_fondo >= min(fondo, ancho))
+    p[candidatas] = _p_poisson(observados[candidatas], esperados[candidatas])
+    anomalas = candidatas & (p < umbral)
+
+    dias = serie.dias(ancho - 1)
+    ventanas = pd.concat({
+        "SISMOS": pd.DataFrame(observados, index=dias, columns=nombres),
+        "ESPERADOS": pd.DataFrame(esperados, index=dias, columns=nombres),
+        "Z": pd.DataFrame(z, index=dias, columns=nombres),
+        "ANOMALA": pd.DataFrame(anomalas, index=dias, columns=nombres),
+    }, axis=1)
+    return ventanas, _episodios(serie, nombres, ancho, anomalas, z, p)
+
+
+def _episodios(serie, nombres, ancho, anomalas, z, p):
+    """Une las ventanas anómalas consecutivas de cada grupo en episodios.
+
+    La fila ``i`` de ``anomalas``, ``z`` y ``p`` es la ventana que termina
+    en el día ``i + ancho - 1``; un tramo de filas ``[i, f)`` cubre los días
+    ``[i, f - 1 + ancho)``.
+    """
+    bordes = np.diff(np.pad(anomalas.T.astype("int8"), ((0, 0), (1, 1))), axis=1)
+    grupo, inicio = np.nonzero(bordes == 1)
+    _, final = np.nonzero(bordes == -1)
+    desde, hasta = inicio, final - 1 + ancho
+    conteos, energia = serie.suma(desde, hasta, nombres)
+    filas = np.arange(len(grupo))
+    # Máximo de Z y mínimo de P de cada tramo, recorriendo las columnas una tras otra
+    filas_por_grupo = z.shape[0]
+    tramos = np.column_stack([grupo * filas_por_grupo + inicio, grupo * filas_por_grupo + final]).ravel()
+    z_max = np.maximum.reduceat(np.append(z.T.ravel(), 0.0), tramos)[::2] if len(tramos) else np.empty(0)
+    p_min = np.minimum.reduceat(np.append(p.T.ravel(), 1.0), tramos)[::2] if len(tramos) else np.empty(0)
+    return pd.DataFrame({
+        "NOMBDEP": np.asarray(nombres, dtype=object)[grupo],
+        "DESDE": serie.inicio + desde,
+        "HASTA": serie.inicio + hasta - 1,
+        "DIAS": hasta - desde,
+        "SISMOS": conteos[filas, grupo],
+        "ENERGIA_J": energia[filas, grupo],
+        "Z_MAX": z_max,
+        "P_MIN": p_min,
+    }).sort_values(["DESDE", "NOMBDEP"], ignore_index=True)
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def cargar_serie(sin_replicas=False):
+    """Serie diaria del catálogo actual, construida una vez por versión de los datos.
+
+    Con ``sin_replicas`` se cuentan solo los sismos principales.
+    """
+    from sismos.enriquecido import catalogo_con_departamento
+
+    catalogo, nombres, version, _ = catalogo_con_departamento()
+    if sin_replicas:
+        from sismos.desagrupamiento import quitar_replicas
+
+        catalogo = quitar_replicas(catalogo)
+    with _lock:
+        serie = _cache.get((version, sin_replicas))
+        if serie is None:
+            serie = SerieDiaria.construir(catalogo["TIEMPO"].to_numpy(), catalogo["MAGNITUD"].to_numpy(),
+                                          catalogo["CODDEP"].to_numpy(), nombres)
+            for clave in [clave for clave in _cache if clave[0] != version]:
+                del _cache[clave]
+            _cache[(version, sin_replicas)] = serie
+        return serie
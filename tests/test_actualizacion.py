@@ -0,0 +1,115 @@
+"""Sismos agregados al final del CSV comparados con reconstruir todo desde cero.
+
+Cubre los caminos incrementales de :mod:`sismos.actualizacion`: el catálogo,
+los índices de rangos, el archivo enriquecido y los cubos.
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sismos import catalogo, cubo, enriquecido, indice
+from sismos.actualizacion import agregar_delta
+from sismos.consultas import COLUMNAS, COLUMNAS_PERU
+
+
+# cargar_cubos lee el catálogo de la ruta por defecto; las pruebas lo redirigen con monkeypatch
+catalogo_con_departamento = enriquecido.catalogo_con_departamento
+
+@pytest.fixture
+def cachés_vacías(monkeypatch, tmp_path):
+    """Deja vacías las cachés de proceso y guarda los archivos enriquecidos en ``tmp_path``."""
+
+    def vaciar(directorio):
+        for modulo in (catalogo, enriquecido, cubo, indice):
+            monkeypatch.setattr(modulo, "_cache", {})
+        monkeypatch.setattr(enriquecido, "_codificados", {})
+        monkeypatch.setattr(enriquecido, "DIRECTORIO_PROCESADOS", str(tmp_path / directorio))
+
+    vaciar("procesados")
+    return vaciar
+
+
+@pytest.fixture(params=["desde_2021", "ultimos_300"])
+def csv_dividido(request, tmp_path):
+    """``(catálogo anterior, sismos nuevos)`` como CSV con el formato del original.
+
+    ``desde_2021`` corta en el primer sismo de 2021 (el CSV está ordenado por
+    ID y casi por fecha), así que los nuevos amplían el eje de años;
+    ``ultimos_300`` agrega sismos de 2023 que caben en los ejes anteriores.
+    """
+    with open(catalogo.RUTA_CSV, "rb") as archivo:
+        lineas = archivo.readlines()
+    if request.param == "desde_2021":
+        primero = next(i for i, linea in enumerate(lineas[1:], start=1) if linea.split(b",")[1] >= b'"20210101"')
+    else:
+        primero = len(lineas) - 300
+    ruta, delta = tmp_path / "sismos.csv", tmp_path / "nuevos.csv"
+    ruta.write_bytes(b"".join(lineas[:primero]))
+    delta.write_bytes(lineas[0] + b"".join(lineas[primero:]))
+    return str(ruta), str(delta), request.param == "desde_2021"
+
+
+def cargar_todo(ruta, monkeypatch):
+    """Catálogos, índices y cubos de ``ruta`` tal como los piden las páginas."""
+    monkeypatch.setattr(enriquecido, "catalogo_con_departamento", functools.partial(catalogo_con_departamento, ruta))
+    datos = catalogo.cargar_catalogo(ruta)
+    codificado, _, _, base = enriquecido.catalogo_con_departamento()
+    peru = enriquecido.cargar_enriquecido(ruta)
+    return {
+        "catalogo": datos,
+        "codificado": codificado,
+        "base": base,
+        "enriquecido": peru,
+        "indices": [
+            indice.indice_para(datos, COLUMNAS),
+            indice.indice_para(codificado, ["CODDEP"] + COLUMNAS),
+            indice.indice_para(peru, COLUMNAS_PERU),
+        ],
+        "cubos": cubo.cargar_cubos(),
+    }
+
+
+def test_agregar_igual_que_reconstruir(cachés_vacías, csv_dividido, monkeypatch):
+    ruta, delta, amplia = csv_dividido
+    antes = cargar_todo(ruta, monkeypatch)
+    assert agregar_delta(delta, ruta) > 0
+
+    agregados = []
+    original = cubo.CuboConteos.agregado
+
+    def agregado(self, valores):
+        agregados.append(self)
+        return original(self, valores)
+
+    monkeypatch.setattr(cubo.CuboConteos, "agregado", agregado)
+    # Los índices de los catálogos extendidos se registran al cargarlos, sin reconstruirlos
+    extendido = catalogo.cargar_catalogo(ruta)
+    assert (id(extendido), tuple(COLUMNAS)) in indice._cache
+    assert (id(catalogo_con_departamento(ruta)[0]), ("CODDEP", *COLUMNAS)) in indice._cache
+    assert (id(enriquecido.cargar_enriquecido(ruta)), tuple(COLUMNAS_PERU)) in indice._cache
+    despues = cargar_todo(ruta, monkeypatch)
+    assert despues["base"][1] == len(antes["catalogo"])
+    assert len(enriquecido._leer_manifiesto(enriquecido.ruta_enriquecido(ruta))["segmentos"]) == 2
+    assert len(agregados) == len(antes["cubos"])
+
+    cachés_vacías("reconstruidos")
+    nuevo = cargar_todo(ruta, monkeypatch)
+    assert nuevo["base"] is None
+    for clave in ("catalogo", "codificado", "enriquecido"):
+        pd.testing.assert_frame_equal(despues[clave], nuevo[clave])
+    for extendido, reconstruido in zip(despues["indices"], nuevo["indices"]):
+        assert extendido.filas == reconstruido.filas
+        for columna in reconstruido.orden:
+            np.testing.assert_array_equal(extendido.orden[columna], reconstruido.orden[columna])
+            np.testing.assert_array_equal(extendido.ordenados[columna], reconstruido.ordenados[columna])
+    for nombre, reconstruido in nuevo["cubos"].items():
+        extendido = despues["cubos"][nombre]
+        for eje_extendido, eje_reconstruido in zip(extendido.ejes, reconstruido.ejes):
+            np.testing.assert_array_equal(eje_extendido.etiquetas, eje_reconstruido.etiquetas)
+        np.testing.assert_array_equal(extendido.conteo, reconstruido.conteo)
+        np.testing.assert_array_equal(extendido.acumulado, reconstruido.acumulado)
+        # Cubre los dos caminos de agregado: con ejes ampliados y sumando prefijos
+        ampliados = [len(eje) != len(previo) for eje, previo in zip(extendido.ejes, antes["cubos"][nombre].ejes)]
+        assert ampliados[extendido.posicion["AÑO"]] if amplia else not any(ampliados)
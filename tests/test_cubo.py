@@ -0,0 +1,96 @@
+"""Cubos de conteos de :mod:`sismos.cubo` comparados con ``value_counts``."""
+import numpy as np
+import pandas as pd
+
+from sismos.cubo import FUERA_DE_PERU, construir_cubos
+
+
+DEPARTAMENTOS = ["AREQUIPA", "LIMA", "TACNA"]
+
+
+def catalogo_sintetico(cantidad, semilla):
+    """Catálogo con las columnas de los cubos y un código de departamento por sismo."""
+    rng = np.random.default_rng(semilla)
+    catalogo = pd.DataFrame({
+        "AÑO": rng.integers(1960, 2024, cantidad).astype("int16"),
+        "MES": rng.integers(1, 13, cantidad).astype("int8"),
+        "MAGNITUD": np.round(3.0 + rng.exponential(0.6, cantidad), 1).astype("float32"),
+        "PROFUNDIDAD": np.round(rng.gamma(1.5, 60.0, cantidad)).astype("float32"),
+    })
+    codigos = rng.integers(-1, len(DEPARTAMENTOS), cantidad).astype("int16")
+    return catalogo, codigos
+
+
+def con_nombres(catalogo, codigos):
+    """``catalogo`` con ``NOMBDEP`` como texto, para contar con pandas."""
+    nombres = np.append(DEPARTAMENTOS, FUERA_DE_PERU)[np.where(codigos < 0, len(DEPARTAMENTOS), codigos)]
+    return catalogo.assign(NOMBDEP=nombres)
+
+
+def filtros_al_azar(rng):
+    """Filtros por rangos (y por lista de departamentos) como los de las páginas."""
+    filtros = {}
+    if rng.random() < 0.5:
+        filtros["NOMBDEP"] = list(rng.choice(DEPARTAMENTOS + [FUERA_DE_PERU], rng.integers(1, 4), replace=False))
+    if rng.random() < 0.5:
+        desde = int(rng.integers(1955, 2024))
+        filtros["AÑO"] = (desde, None if rng.random() < 0.2 else desde + int(rng.integers(0, 30)))
+    if rng.random() < 0.5:
+        desde = int(rng.integers(1, 13))
+        filtros["MES"] = (desde, int(rng.integers(desde, 13)))
+    if rng.random() < 0.5:
+        minimo = round(float(rng.uniform(2.5, 6.0)), 1)
+        filtros["MAGNITUD"] = (None if rng.random() < 0.2 else minimo, round(minimo + float(rng.uniform(0, 3)), 1))
+    if rng.random() < 0.5:
+        filtros["PROFUNDIDAD"] = (float(rng.integers(0, 100)), None if rng.random() < 0.3 else float(rng.integers(100, 400)))
+    return filtros
+
+
+def value_counts(datos, eje, filtros):
+    """Conteo con máscaras de pandas; los extremos se comparan con el tipo de la columna."""
+    cumple = pd.Series(True, index=datos.index)
+    for columna, filtro in filtros.items():
+        if columna == "NOMBDEP":
+            cumple &= datos[columna].isin(filtro)
+            continue
+        tipo = datos[columna].dtype.type
+        minimo, maximo = filtro
+        if minimo is not None:
+            cumple &= datos[columna] >= tipo(minimo)
+        if maximo is not None:
+            cumple &= datos[columna] <= tipo(maximo)
+    conteo = datos.loc[cumple, eje].value_counts().sort_index()
+    if eje == "MAGNITUD":
+        conteo.index = np.round(conteo.index.to_numpy().astype("float64"), 1)
+    return conteo
+
+
+def test_histogramas_iguales_que_value_counts():
+    catalogo, codigos = catalogo_sintetico(5000, 1)
+    cubos = construir_cubos(catalogo, codigos, DEPARTAMENTOS)
+    datos = con_nombres(catalogo, codigos)
+    rng = np.random.default_rng(2)
+    for _ in range(300):
+        filtros = filtros_al_azar(rng)
+        for cubo in cubos.values():
+            if not set(filtros) <= set(cubo.posicion):
+                continue
+            for eje in cubo.posicion:
+                assert cubo.histograma(eje, filtros).to_dict() == value_counts(datos, eje, filtros).to_dict()
+            assert cubo.total(filtros) == value_counts(datos, "AÑO", filtros).sum()
+
+
+def test_valores_faltantes_no_se_cuentan():
+    catalogo, codigos = catalogo_sintetico(2000, 0)
+    catalogo.loc[[3, 10], "PROFUNDIDAD"] = np.nan
+    catalogo.loc[[10, 20], "MAGNITUD"] = np.nan
+    cubos = construir_cubos(catalogo, codigos, DEPARTAMENTOS)
+
+    profundidad = cubos["profundidad"].histograma("PROFUNDIDAD")
+    esperado = catalogo["PROFUNDIDAD"].value_counts().sort_index()
+    np.testing.assert_array_equal(profundidad.index.to_numpy(), esperado.index.to_numpy())
+    np.testing.assert_array_equal(profundidad.to_numpy(), esperado.to_numpy())
+    assert cubos["magnitud"].total() == catalogo["MAGNITUD"].notna().sum()
+    datos = con_nombres(catalogo, codigos)
+    lima = cubos["magnitud"].total({"NOMBDEP": ["LIMA"], "MAGNITUD": (5.0, None)})
+    assert lima == ((datos["NOMBDEP"] == "LIMA") & (datos["MAGNITUD"] >= 5.0)).sum()
@@ -0,0 +1,20 @@
+"""Asignación de departamentos de :mod:`sismos.departamentos` en los límites."""
+import numpy as np
+import shapely
+
+from sismos.departamentos import SIN_DEPARTAMENTO, AsignadorDepartamentos
+
+
+def test_limite_compartido_se_queda_con_el_primer_par():
+    asignador = AsignadorDepartamentos.desde_geojson()
+    # Los vértices de los polígonos están sobre los límites entre departamentos
+    vertices = np.concatenate([shapely.get_coordinates(geometria) for geometria in asignador.geometrias])
+    lon, lat = np.append(vertices[:, 0], -90.0), np.append(vertices[:, 1], 0.0)
+    posiciones, codigos = asignador.cruzar(lon, lat)
+    assert len(posiciones) > len(np.unique(posiciones))
+
+    esperado = np.full(len(lon), SIN_DEPARTAMENTO)
+    for posicion, codigo in reversed(list(zip(posiciones, codigos))):
+        esperado[posicion] = codigo
+    np.testing.assert_array_equal(asignador.asignar(lon, lat), esperado)
+    assert esperado[-1] == SIN_DEPARTAMENTO
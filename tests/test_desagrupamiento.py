@@ -0,0 +1,64 @@
+"""Comparación de :func:`sismos.desagrupamiento.marcar_replicas` con el recorrido O(n²)."""
+import numpy as np
+import pytest
+
+from sismos.desagrupamiento import RADIO_TIERRA_KM, marcar_replicas, ventana_gardner_knopoff
+
+
+def replicas_fuerza_bruta(dias, latitudes, longitudes, magnitudes):
+    """Gardner–Knopoff recorriendo los sismos uno por uno contra todos."""
+    dias = np.asarray(dias, dtype="float64")
+    magnitudes = np.asarray(magnitudes, dtype="float64")
+    latitud, longitud = np.radians(latitudes), np.radians(longitudes)
+    distancia, duracion = ventana_gardner_knopoff(magnitudes)
+    replicas = np.zeros(len(dias), dtype=bool)
+    orden = np.lexsort((dias, -magnitudes))
+    for posicion, i in enumerate(orden):
+        if replicas[i]:
+            continue
+        siguientes = orden[posicion + 1:]
+        # Haversine
+        a = (np.sin((latitud[siguientes] - latitud[i]) / 2) ** 2
+             + np.cos(latitud[i]) * np.cos(latitud[siguientes]) * np.sin((longitud[siguientes] - longitud[i]) / 2) ** 2)
+        arco = 2 * RADIO_TIERRA_KM * np.arcsin(np.minimum(np.sqrt(a), 1.0))
+        dentro = (arco <= distancia[i]) & (np.abs(dias[siguientes] - dias[i]) <= duracion[i])
+        replicas[siguientes[dentro]] = True
+    return replicas
+
+
+def catalogo_sintetico(cantidad, semilla):
+    """Sismos de fondo más secuencias de réplicas alrededor de algunos sismos grandes."""
+    rng = np.random.default_rng(semilla)
+    dias = rng.uniform(0, 20000, cantidad)
+    latitudes = rng.uniform(-20, 0, cantidad)
+    longitudes = rng.uniform(-82, -68, cantidad)
+    magnitudes = np.round(3.0 + rng.exponential(0.45, cantidad), 1)
+    principales = rng.choice(cantidad, 15, replace=False)
+    magnitudes[principales] = np.round(rng.uniform(6.0, 9.6, 15), 1)
+    for i in principales:
+        replicas = rng.choice(cantidad, 25, replace=False)
+        dias[replicas] = dias[i] + rng.exponential(30, 25)
+        latitudes[replicas] = latitudes[i] + rng.normal(0, 0.3, 25)
+        longitudes[replicas] = longitudes[i] + rng.normal(0, 0.3, 25)
+    return dias, latitudes, longitudes, magnitudes
+
+
+def test_replica_mayor_que_m6_de_un_sismo_mayor_que_m9():
+    # Sobre M6.5, T/L decrece: el M9.5 queda en un grupo menor que su réplica M6.4
+    dias = [0.0, 10.0, 5.0]
+    latitudes = [-38.2, -38.2 + 25 / 111.2, -38.0]
+    longitudes = [-73.0, -73.0, -73.1]
+    magnitudes = [9.5, 6.4, 4.0]
+    esperado = replicas_fuerza_bruta(dias, latitudes, longitudes, magnitudes)
+    assert esperado.tolist() == [False, True, True]
+    assert marcar_replicas(dias, latitudes, longitudes, magnitudes).tolist() == esperado.tolist()
+
+
+@pytest.mark.parametrize("semilla", [0, 1, 2])
+def test_igual_que_fuerza_bruta(semilla):
+    datos = catalogo_sintetico(3000, semilla)
+    np.testing.assert_array_equal(marcar_replicas(*datos), replicas_fuerza_bruta(*datos))
+
+
+def test_catalogo_vacio():
+    assert marcar_replicas([], [], [], []).tolist() == []
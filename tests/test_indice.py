@@ -0,0 +1,74 @@
+"""Índice de rangos de :mod:`sismos.indice` comparado con las máscaras de pandas."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from sismos.indice import IndiceRangos
+
+
+DEPARTAMENTOS = ["AREQUIPA", "ICA", "LIMA", "TACNA"]
+COLUMNAS = ["NOMBDEP", "AÑO", "MES", "MAGNITUD", "PROFUNDIDAD"]
+
+
+def catalogo_sintetico(cantidad, semilla):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        "NOMBDEP": pd.Categorical(rng.choice(DEPARTAMENTOS, cantidad), categories=DEPARTAMENTOS),
+        "AÑO": rng.integers(1960, 2024, cantidad).astype("int16"),
+        "MES": rng.integers(1, 13, cantidad).astype("int8"),
+        "MAGNITUD": np.round(3.0 + rng.exponential(0.6, cantidad), 1).astype("float32"),
+        "PROFUNDIDAD": np.round(rng.gamma(1.5, 60.0, cantidad)).astype("float32"),
+    })
+
+
+def filtros_al_azar(rng):
+    """Filtros como los de las páginas: rangos, listas y extremos abiertos."""
+    filtros = {}
+    if rng.random() < 0.5:
+        filtros["NOMBDEP"] = list(rng.choice(DEPARTAMENTOS + ["CUSCO"], rng.integers(1, 4), replace=False))
+    if rng.random() < 0.5:
+        desde = int(rng.integers(1955, 2024))
+        filtros["AÑO"] = (desde, desde + int(rng.integers(0, 30)))
+    if rng.random() < 0.5:
+        filtros["MES"] = [int(mes) for mes in rng.choice(np.arange(1, 13), rng.integers(1, 6), replace=False)]
+    if rng.random() < 0.5:
+        minimo = round(float(rng.uniform(2.5, 6.0)), 1)
+        filtros["MAGNITUD"] = (minimo if rng.random() < 0.8 else None, round(minimo + float(rng.uniform(0, 3)), 1))
+    if rng.random() < 0.5:
+        filtros["PROFUNDIDAD"] = (float(rng.integers(0, 100)), None if rng.random() < 0.3 else float(rng.integers(100, 400)))
+    return filtros
+
+
+def mascara(datos, filtros):
+    """Cadena de máscaras de pandas equivalente a los filtros."""
+    cumple = pd.Series(True, index=datos.index)
+    for columna, filtro in filtros.items():
+        if isinstance(filtro, tuple):
+            minimo, maximo = filtro
+            if minimo is not None:
+                cumple &= datos[columna] >= minimo
+            if maximo is not None:
+                cumple &= datos[columna] <= maximo
+        else:
+            cumple &= datos[columna].isin(filtro)
+    return cumple
+
+
+def test_filtros_iguales_que_mascaras():
+    datos = catalogo_sintetico(5000, 0)
+    indice = IndiceRangos(datos, COLUMNAS)
+    rng = np.random.default_rng(1)
+    for _ in range(1000):
+        filtros = filtros_al_azar(rng)
+        np.testing.assert_array_equal(indice.posiciones(filtros), np.flatnonzero(mascara(datos, filtros)))
+
+
+@pytest.mark.parametrize("agregadas", [0, 1, 700])
+def test_extendido_igual_que_reconstruido(agregadas):
+    datos = catalogo_sintetico(3000 + agregadas, 2)
+    extendido = IndiceRangos(datos.iloc[:3000], COLUMNAS).extendido(datos)
+    nuevo = IndiceRangos(datos, COLUMNAS)
+    assert extendido.filas == nuevo.filas
+    for columna in COLUMNAS:
+        np.testing.assert_array_equal(extendido.orden[columna], nuevo.orden[columna])
+        np.testing.assert_array_equal(extendido.ordenados[columna], nuevo.ordenados[columna])